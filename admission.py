@@ -0,0 +1,163 @@
+"""Controle de admissão das capturas pela profundidade das filas do Celery."""
+import math
+import time
+from typing import List, Optional, Tuple
+
+import redis
+
+# Filas por custo: capturas só do viewport e capturas de página inteira/scroll
+QUEUE_CHEAP = "screenshots.cheap"
+QUEUE_HEAVY = "screenshots.heavy"
+
+# Prioridades aceitas pela API e o valor usado no Celery (no Redis, 0 é a maior)
+PRIORITIES = {"high": 0, "normal": 3, "low": 6}
+
+# Degraus de prioridade do transporte Redis e separador do nome das listas
+PRIORITY_STEPS = [0, 3, 6, 9]
+PRIORITY_SEP = ":"
+
+# Atualiza a média móvel exponencial da duração das tarefas
+_RECORD_DURATION = """
+local current = tonumber(redis.call('get', KEYS[1]))
+local sample = tonumber(ARGV[1])
+if current then
+    sample = current + tonumber(ARGV[2]) * (sample - current)
+end
+redis.call('set', KEYS[1], sample)
+return tostring(sample)
+"""
+
+
+def cost_queue(full_page: bool, scroll_page_flag: bool) -> str:
+    """Fila da captura pelo custo: página inteira ou scroll vão para a pesada."""
+    return QUEUE_HEAVY if full_page or scroll_page_flag else QUEUE_CHEAP
+
+
+def priority_lists(queue: str, priority: int) -> List[str]:
+    """
+    Listas do Redis com as tarefas da fila que rodam antes da prioridade dada.
+
+    O transporte Redis do Celery guarda cada degrau de prioridade em uma lista
+    própria (``fila`` para 0 e ``fila:N`` para os demais).
+    """
+    return [
+        queue if step == 0 else f"{queue}{PRIORITY_SEP}{step}"
+        for step in PRIORITY_STEPS
+        if step <= priority
+    ]
+
+
+class Rejection(Exception):
+    """Requisição recusada pelo controle de admissão."""
+
+    def __init__(self, status_code: int, retry_after: int, detail: str) -> None:
+        super().__init__(detail)
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.detail = detail
+
+
+class AdmissionController:
+    """
+    Decide se uma captura pode entrar na fila.
+
+    Estima a espera como tarefas à frente × duração média / vagas dos workers
+    que consomem a fila. Acima de ``max_wait`` a requisição recebe 429; com
+    ``max_depth`` tarefas à frente, 503. Os workers informam suas vagas a cada
+    heartbeat e a duração de cada captura.
+    """
+
+    def __init__(
+        self,
+        client: redis.Redis,
+        max_depth: int,
+        max_wait: float,
+        default_duration: float,
+        default_slots: int,
+        prefix: str = "screenshot:admission:"
+    ) -> None:
+        self.client = client
+        self.max_depth = max_depth
+        self.max_wait = max_wait
+        self.default_duration = default_duration
+        self.default_slots = default_slots
+        self.prefix = prefix
+        self._record_duration = client.register_script(_RECORD_DURATION)
+
+    def _duration_key(self, queue: str) -> str:
+        return f"{self.prefix}duration:{queue}"
+
+    def _workers_key(self, queue: str) -> str:
+        return f"{self.prefix}workers:{queue}"
+
+    def record_duration(self, queue: str, seconds: float, weight: float = 0.2) -> None:
+        """Inclui a duração de uma captura na média da fila."""
+        self._record_duration(
+            keys=[self._duration_key(queue)],
+            args=[seconds, weight],
+            client=self.client
+        )
+
+    def register_worker(self, worker: str, queues: List[str], slots: int, ttl: int) -> None:
+        """Anuncia as vagas de um worker nas filas que ele consome por ``ttl`` segundos."""
+        expires = time.time() + ttl
+        pipe = self.client.pipeline()
+        for queue in queues:
+            key = self._workers_key(queue)
+            pipe.zremrangebyscore(key, "-inf", time.time())
+            pipe.zadd(key, {f"{worker}|{slots}": expires})
+            pipe.expire(key, ttl)
+        pipe.execute()
+
+    def stats(self, queue: str, priority: int) -> Tuple[int, float, int]:
+        """
+        Lê o estado da fila.
+
+        Returns:
+            Tuple[int, float, int]: Tarefas à frente, duração média e vagas
+        """
+        pipe = self.client.pipeline()
+        for name in priority_lists(queue, priority):
+            pipe.llen(name)
+        pipe.get(self._duration_key(queue))
+        pipe.zrangebyscore(self._workers_key(queue), time.time(), "+inf")
+        *lengths, duration, workers = pipe.execute()
+        slots = sum(int(member.rsplit("|", 1)[1]) for member in workers)
+        return (
+            sum(lengths),
+            float(duration) if duration else self.default_duration,
+            slots or self.default_slots,
+        )
+
+    def estimated_wait(self, queue: str, priority: int, extra: int = 0) -> float:
+        """Segundos estimados até uma nova tarefa começar a rodar."""
+        depth, duration, slots = self.stats(queue, priority)
+        return (depth + extra) * duration / max(slots, 1)
+
+    def check(self, queue: str, priority: int, tasks: int = 1) -> Optional[Rejection]:
+        """
+        Verifica se ``tasks`` novas tarefas podem entrar na fila.
+
+        Returns:
+            Optional[Rejection]: Motivo da recusa, ou None se admitidas
+        """
+        depth, duration, slots = self.stats(queue, priority)
+        if depth + tasks > self.max_depth:
+            retry_after = (depth + tasks - self.max_depth) * duration / max(slots, 1)
+            return Rejection(
+                503,
+                _retry_after(retry_after),
+                "Serviço sobrecarregado, tente novamente mais tarde"
+            )
+        wait = (depth + tasks - 1) * duration / max(slots, 1)
+        if wait > self.max_wait:
+            return Rejection(
+                429,
+                _retry_after(wait - self.max_wait),
+                f"Fila cheia: espera estimada de {int(wait)}s"
+            )
+        return None
+
+
+def _retry_after(seconds: float) -> int:
+    return min(max(math.ceil(seconds), 1), 300)
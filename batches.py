@@ -0,0 +1,166 @@
+"""Estado dos lotes de capturas e empacotamento dos resultados."""
+import json
+import os
+import time
+import uuid
+import zipfile
+from typing import Callable, Dict, Iterator, List, Optional
+
+import redis
+
+# Situações possíveis de um item do lote
+ITEM_PENDING = "pending"
+ITEM_COMPLETED = "completed"
+ITEM_FAILED = "failed"
+
+
+class BatchStore:
+    """
+    Guarda no Redis as URLs, opções e o resultado de cada item de um lote.
+
+    Cada lote usa três chaves com a mesma validade: um hash com os metadados,
+    uma lista com as URLs (na ordem enviada) e um hash índice -> resultado.
+    Itens sem resultado estão pendentes.
+    """
+
+    def __init__(
+        self,
+        client: redis.Redis,
+        ttl: int,
+        prefix: str = "screenshot:batch:"
+    ) -> None:
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def _keys(self, batch_id: str) -> Dict[str, str]:
+        base = f"{self.prefix}{batch_id}"
+        return {"meta": base, "urls": f"{base}:urls", "items": f"{base}:items"}
+
+    def create(self, urls: List[str], options: dict) -> str:
+        """
+        Registra um lote novo.
+
+        Returns:
+            str: ID do lote
+        """
+        batch_id = str(uuid.uuid4())
+        keys = self._keys(batch_id)
+        pipe = self.client.pipeline()
+        pipe.hset(keys["meta"], mapping={
+            "total": len(urls),
+            "options": json.dumps(options),
+            "created_at": time.time(),
+        })
+        pipe.rpush(keys["urls"], *urls)
+        for key in keys.values():
+            pipe.expire(key, self.ttl)
+        pipe.execute()
+        return batch_id
+
+    def set_item(
+        self,
+        batch_id: str,
+        index: int,
+        status: str,
+        name: Optional[str] = None,
+        error: Optional[str] = None
+    ) -> None:
+        """Grava o resultado de um item do lote."""
+        result = {"status": status}
+        if name:
+            result["name"] = name
+        if error:
+            result["error"] = error
+        key = self._keys(batch_id)["items"]
+        pipe = self.client.pipeline()
+        pipe.hset(key, str(index), json.dumps(result))
+        pipe.expire(key, self.ttl)
+        pipe.execute()
+
+    def get_meta(self, batch_id: str) -> Optional[dict]:
+        """Retorna total, opções e data de criação do lote, ou None se não existir."""
+        meta = self.client.hgetall(self._keys(batch_id)["meta"])
+        if not meta:
+            return None
+        return {
+            "total": int(meta["total"]),
+            "options": json.loads(meta["options"]),
+            "created_at": float(meta["created_at"]),
+        }
+
+    def get_items(self, batch_id: str) -> List[dict]:
+        """
+        Lista os itens do lote na ordem em que foram enviados.
+
+        Returns:
+            List[dict]: ``index``, ``url``, ``status`` e ``name`` (nome do
+            objeto no armazenamento) ou ``error``
+        """
+        keys = self._keys(batch_id)
+        pipe = self.client.pipeline()
+        pipe.lrange(keys["urls"], 0, -1)
+        pipe.hgetall(keys["items"])
+        urls, results = pipe.execute()
+        items = []
+        for index, url in enumerate(urls):
+            result = json.loads(results.get(str(index), "{}"))
+            items.append({
+                "index": index,
+                "url": url,
+                "status": result.get("status", ITEM_PENDING),
+                **{k: v for k, v in result.items() if k != "status"},
+            })
+        return items
+
+
+def summarize(items: List[dict]) -> dict:
+    """Conta os itens do lote por situação."""
+    counts = {ITEM_PENDING: 0, ITEM_COMPLETED: 0, ITEM_FAILED: 0}
+    for item in items:
+        counts[item["status"]] += 1
+    return counts
+
+
+class _ZipStream:
+    """Destino de escrita do zipfile que acumula os bytes até serem lidos."""
+
+    def __init__(self) -> None:
+        self._chunks: List[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def iter_zip(items: List[dict], read: Callable[[str], bytes]) -> Iterator[bytes]:
+    """
+    Gera um arquivo ZIP com as imagens concluídas, em partes.
+
+    O ZIP é escrito sem seek (com descritores de dados), então cada imagem é
+    lida (por ``read``, a partir do nome do objeto) e enviada sem montar o
+    arquivo inteiro em memória. As imagens já são comprimidas e vão
+    armazenadas sem nova compressão.
+    """
+    stream = _ZipStream()
+    with zipfile.ZipFile(stream, mode="w", compression=zipfile.ZIP_STORED) as archive:
+        for item in items:
+            if item["status"] != ITEM_COMPLETED:
+                continue
+            name = item["name"]
+            extension = os.path.splitext(name)[1]
+            try:
+                data = read(name)
+            except FileNotFoundError:
+                continue
+            archive.writestr(f"{item['index']:04d}{extension}", data)
+            yield stream.drain()
+    yield stream.drain()
@@ -0,0 +1 @@
+"""Benchmarks offline da API: site de fixtures local e gerador de carga."""
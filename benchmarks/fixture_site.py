@@ -0,0 +1,199 @@
+"""
+Site local com páginas sintéticas que exercitam o pipeline de captura.
+
+Páginas disponíveis:
+
+- ``/lazy?sections=N``: página longa com imagens ``loading="lazy"``
+- ``/gallery?images=N``: galeria com muitas imagens carregadas de uma vez
+- ``/slow-idle?requests=N&interval=MS``: faz requisições em sequência e demora
+  a deixar a rede quieta
+- ``/infinite``: acrescenta conteúdo sempre que o scroll chega ao fim
+
+As imagens (``/img/<n>.png?delay=MS``) e os dados (``/api/data?delay=MS``)
+aceitam um atraso para simular uma origem lenta.
+"""
+import io
+import json
+import threading
+import time
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Optional
+from urllib.parse import parse_qs, urlsplit
+
+from PIL import Image
+
+# Atraso padrão das imagens em milissegundos
+IMAGE_DELAY = 50
+
+_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{title}</title>
+<style>body{{margin:0;font-family:sans-serif}} section{{height:900px;border-bottom:1px solid #ccc}}
+.grid{{display:flex;flex-wrap:wrap}} .grid img{{width:240px;height:160px}}</style>
+</head><body>{body}</body></html>"""
+
+
+@lru_cache(maxsize=256)
+def render_image(number: int, width: int = 480, height: int = 320) -> bytes:
+    """PNG de uma cor derivada do número (memorizado)."""
+    color = ((number * 67) % 256, (number * 131) % 256, (number * 29) % 256)
+    output = io.BytesIO()
+    Image.new("RGB", (width, height), color).save(output, format="PNG")
+    return output.getvalue()
+
+
+def _int(query: Dict[str, list], name: str, default: int) -> int:
+    try:
+        return int(query.get(name, [default])[0])
+    except ValueError:
+        return default
+
+
+def lazy_page(query: Dict[str, list]) -> str:
+    sections = _int(query, "sections", 40)
+    delay = _int(query, "delay", IMAGE_DELAY)
+    body = "".join(
+        f'<section><h2>Seção {n}</h2>'
+        f'<img loading="lazy" width="480" height="320" src="/img/{n}.png?delay={delay}"></section>'
+        for n in range(sections)
+    )
+    return _PAGE.format(title="Lazy", body=body)
+
+
+def gallery_page(query: Dict[str, list]) -> str:
+    images = _int(query, "images", 60)
+    delay = _int(query, "delay", IMAGE_DELAY)
+    body = '<div class="grid">' + "".join(
+        f'<img src="/img/{n}.png?delay={delay}">' for n in range(images)
+    ) + "</div>"
+    return _PAGE.format(title="Galeria", body=body)
+
+
+def slow_idle_page(query: Dict[str, list]) -> str:
+    requests = _int(query, "requests", 10)
+    interval = _int(query, "interval", 300)
+    script = f"""<script>
+(async () => {{
+  for (let n = 0; n < {requests}; n++) {{
+    const data = await (await fetch('/api/data?delay={interval}&n=' + n)).json();
+    document.getElementById('log').textContent += data.n + ' ';
+  }}
+}})();
+</script>"""
+    return _PAGE.format(title="Rede lenta", body='<p id="log"></p>' + script)
+
+
+def infinite_page(query: Dict[str, list]) -> str:
+    delay = _int(query, "delay", IMAGE_DELAY)
+    script = f"""<script>
+let next = 0;
+function more() {{
+  for (let i = 0; i < 3; i++, next++) {{
+    const section = document.createElement('section');
+    section.innerHTML = '<h2>Item ' + next + '</h2><img src="/img/' + (next % 200) + '.png?delay={delay}">';
+    document.body.appendChild(section);
+  }}
+}}
+more();
+window.addEventListener('scroll', () => {{
+  if (window.innerHeight + window.scrollY >= document.body.scrollHeight - 200) more();
+}});
+</script>"""
+    return _PAGE.format(title="Scroll infinito", body=script)
+
+
+PAGES: Dict[str, Callable[[Dict[str, list]], str]] = {
+    "/lazy": lazy_page,
+    "/gallery": gallery_page,
+    "/slow-idle": slow_idle_page,
+    "/infinite": infinite_page,
+}
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    """Responde as páginas, imagens e dados sintéticos."""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+    def _send(self, status: int, content_type: str, body: bytes, cache: bool = False) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "public, max-age=3600" if cache else "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        parts = urlsplit(self.path)
+        query = parse_qs(parts.query)
+        delay = _int(query, "delay", 0)
+
+        if parts.path in PAGES:
+            self._send(200, "text/html; charset=utf-8", PAGES[parts.path](query).encode())
+        elif parts.path.startswith("/img/") and parts.path.endswith(".png"):
+            try:
+                number = int(parts.path[5:-4])
+            except ValueError:
+                self._send(404, "text/plain", b"not found")
+                return
+            time.sleep(delay / 1000)
+            self._send(200, "image/png", render_image(number), cache=True)
+        elif parts.path == "/api/data":
+            time.sleep(delay / 1000)
+            body = json.dumps({"n": query.get("n", ["0"])[0]}).encode()
+            self._send(200, "application/json", body)
+        else:
+            self._send(404, "text/plain", b"not found")
+
+
+class FixtureSite:
+    """
+    Servidor HTTP do site de fixtures em uma thread.
+
+    Uso::
+
+        with FixtureSite() as site:
+            site.url("/gallery?images=30")
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0) -> None:
+        self.server = ThreadingHTTPServer((host, port), FixtureHandler)
+        self.server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def url(self, path: str) -> str:
+        return self.base_url + path
+
+    def start(self) -> "FixtureSite":
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self) -> "FixtureSite":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Sobe o site de fixtures dos benchmarks")
+    parser.add_argument("--port", type=int, default=8081)
+    args = parser.parse_args()
+    site = FixtureSite(port=args.port)
+    print(f"Site de fixtures em {site.base_url}: {', '.join(PAGES)}")
+    site.server.serve_forever()
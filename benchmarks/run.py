@@ -0,0 +1,374 @@
+"""
+Gerador de carga da API contra o site de fixtures local.
+
+A API roda no próprio processo (ASGI via httpx) com o Redis trocado pelo
+fakeredis e o cache em um diretório temporário; nada externo é necessário
+além do Chromium do Playwright. Cada cenário é medido separadamente:
+
+- ``cache_hit``: imagens servidas do cache
+- ``cold``: renderizações novas pelo modo ``sync=true`` (``no_cache``)
+- ``batch``: lotes do envio até a conclusão, com as partes executadas por
+  um worker local no mesmo processo
+
+Com ``--engine synthetic`` o navegador é trocado por um motor que devolve
+uma imagem fixa após ``--synthetic-delay``, medindo só o custo da API
+(codificação, cache, Redis).
+
+Uso::
+
+    python -m benchmarks.run --concurrency 8 --requests 200 --output bench.json
+    python -m benchmarks.run --baseline benchmarks/baseline.json --tolerance 0.2
+"""
+import argparse
+import asyncio
+import io
+import json
+import logging
+import platform
+import sys
+import tempfile
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import fakeredis
+import httpx
+from PIL import Image
+
+import main
+from admission import AdmissionController
+from batches import BatchStore
+from cache_index import CacheIndex
+from memory_cache import MemoryCache
+from politeness import HostScheduler
+from popularity import PopularityTracker
+from storage import LocalStorage
+
+from benchmarks.fixture_site import FixtureSite
+
+# Páginas usadas nas renderizações, alternadas entre as requisições
+FIXTURE_PAGES = ("/lazy?sections=20", "/gallery?images=40", "/slow-idle?requests=5", "/infinite?delay=50")
+
+# Métricas comparadas com a linha de base; nas latências, maior é pior
+LATENCY_METRICS = ("p50", "p95", "p99")
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Percentil pelo método do posto mais próximo (0 sem amostras)."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(int(-(-pct * len(ordered) // 100)), 1)
+    return ordered[rank - 1]
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> dict:
+    """Resumo de um cenário: percentis em milissegundos e vazão por segundo."""
+    return {
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "p50": round(percentile(latencies, 50) * 1000, 2),
+        "p95": round(percentile(latencies, 95) * 1000, 2),
+        "p99": round(percentile(latencies, 99) * 1000, 2),
+        "mean": round(sum(latencies) / len(latencies) * 1000, 2) if latencies else 0.0,
+        "max": round(max(latencies, default=0) * 1000, 2),
+        "throughput": round(len(latencies) / elapsed, 2) if elapsed > 0 else 0.0,
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> List[str]:
+    """
+    Compara os resultados com a linha de base.
+
+    Returns:
+        List[str]: Regressões encontradas (latência ou vazão pior que a base
+        além da tolerância, ou erros onde a base não tinha)
+    """
+    regressions = []
+    for name, base in baseline.get("scenarios", {}).items():
+        current = results.get("scenarios", {}).get(name)
+        if current is None:
+            continue
+        for metric in LATENCY_METRICS:
+            if base.get(metric) and current[metric] > base[metric] * (1 + tolerance):
+                regressions.append(
+                    f"{name}.{metric}: {current[metric]}ms (base {base[metric]}ms)"
+                )
+        if base.get("throughput") and current["throughput"] < base["throughput"] * (1 - tolerance):
+            regressions.append(
+                f"{name}.throughput: {current['throughput']}/s (base {base['throughput']}/s)"
+            )
+        if current["errors"] > base.get("errors", 0):
+            regressions.append(f"{name}.errors: {current['errors']} (base {base.get('errors', 0)})")
+    return regressions
+
+
+def install_stand_ins(cache_dir: str, host_limits: bool) -> fakeredis.FakeRedis:
+    """Troca o Redis e o armazenamento da API por versões locais."""
+    server = fakeredis.FakeServer()
+    client = fakeredis.FakeRedis(server=server, decode_responses=True)
+    main.redis_client = client
+    main.async_redis_client = fakeredis.aioredis.FakeRedis(server=server, decode_responses=True)
+    main.CACHE_DIR = cache_dir
+    main.storage = LocalStorage(cache_dir)
+    main.cache_index = CacheIndex(client, main.storage, main.MAX_CACHE_SIZE, main.CACHE_EXPIRY)
+    main.batch_store = BatchStore(client, main.BATCH_TTL)
+    main.admission = AdmissionController(
+        client,
+        main.ADMISSION_MAX_DEPTH,
+        main.ADMISSION_MAX_WAIT,
+        main.ADMISSION_DEFAULT_DURATION,
+        main.RENDER_MAX_PAGES
+    )
+    # Todas as fixtures vêm do mesmo host; por padrão os limites por host
+    # ficam desligados para medir só o pipeline
+    main.host_scheduler = HostScheduler(
+        client,
+        main.HOST_MAX_CONCURRENCY if host_limits else 0,
+        main.HOST_MIN_INTERVAL if host_limits else 0,
+        burst=main.HOST_BURST
+    )
+    main.memory_cache = MemoryCache(
+        main.MEMORY_CACHE_MAX_SIZE, main.MEMORY_CACHE_MAX_ENTRY, main.MEMORY_CACHE_TTL
+    )
+    main.popularity = PopularityTracker(
+        client, main.POPULARITY_HALF_LIFE, main.POPULARITY_MAX_ENTRIES
+    )
+    # Sem broker: tarefas que cairiam na fila contam como erro do cenário
+    main.capture_screenshot_task.apply_async = lambda *args, **kwargs: None
+    return client
+
+
+class SyntheticEngine:
+    """Motor que devolve uma imagem fixa após um atraso, sem navegador."""
+
+    def __init__(self, delay: float, max_pages: int) -> None:
+        self.delay = delay
+        self.max_pages = max_pages
+        self.active_pages = 0
+        self.pool = type("Pool", (), {"active_contexts": 0})()
+        self._executor = ThreadPoolExecutor(max_pages)
+
+    def _image(self, context_options: Optional[dict]) -> bytes:
+        viewport = (context_options or {}).get("viewport", {"width": 1280, "height": 720})
+        output = io.BytesIO()
+        Image.new("RGB", (viewport["width"], viewport["height"]), "white").save(output, format="PNG")
+        return output.getvalue()
+
+    async def render(self, pipeline, context_options=None, timeout=None, **kwargs) -> bytes:
+        await asyncio.sleep(self.delay)
+        return await asyncio.to_thread(self._image, context_options)
+
+    def submit(self, pipeline, context_options=None, timeout=None, **kwargs) -> Future:
+        def run() -> bytes:
+            time.sleep(self.delay)
+            return self._image(context_options)
+        return self._executor.submit(run)
+
+    async def stop(self) -> None:
+        self._executor.shutdown(wait=False)
+
+
+async def start_engines(engine: str, concurrency: int, synthetic_delay: float) -> None:
+    """Prepara o navegador da API (modo sync) e o do worker local."""
+    main.SYNC_MAX_CONCURRENCY = concurrency
+    main.SYNC_DEADLINE = max(main.RENDER_TIMEOUT, main.SYNC_DEADLINE)
+    main.sync_semaphore = asyncio.Semaphore(concurrency)
+    if engine == "synthetic":
+        main.api_render_engine = SyntheticEngine(synthetic_delay, concurrency)
+        main.render_engine = SyntheticEngine(synthetic_delay, main.RENDER_MAX_PAGES)
+        return
+    await main.start_api_render_engine()
+    if main.api_render_engine is None:
+        raise RuntimeError("Não foi possível iniciar o Chromium do Playwright")
+
+
+async def stop_engines() -> None:
+    if main.api_render_engine is not None:
+        await main.api_render_engine.stop()
+        main.api_render_engine = None
+    if isinstance(main.render_engine, SyntheticEngine):
+        await main.render_engine.stop()
+    elif main.render_engine is not None:
+        main.render_engine.stop_background()
+    main.render_engine = None
+
+
+async def drive(
+    total: int,
+    concurrency: int,
+    request: Callable[[int], Awaitable[bool]]
+) -> dict:
+    """Executa ``total`` chamadas com ``concurrency`` simultâneas e resume."""
+    latencies: List[float] = []
+    errors = 0
+    counter = iter(range(total))
+
+    async def user() -> None:
+        nonlocal errors
+        for n in counter:
+            started = time.perf_counter()
+            try:
+                ok = await request(n)
+            except Exception:
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - started)
+            else:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(user() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+def is_image(response: httpx.Response) -> bool:
+    return response.status_code == 200 and response.headers["content-type"].startswith("image/")
+
+
+async def bench_cache_hit(client: httpx.AsyncClient, site: FixtureSite, args) -> dict:
+    params = {"url": site.url("/gallery?images=20"), "sync": True}
+    # Primeira captura preenche o cache
+    warmup = await client.get("/screenshot", params=params)
+    if not is_image(warmup):
+        raise RuntimeError(f"Falha ao preparar o cache: {warmup.status_code} {warmup.text[:200]}")
+    params = {"url": params["url"]}
+
+    async def request(n: int) -> bool:
+        return is_image(await client.get("/screenshot", params=params))
+
+    return await drive(args.requests, args.concurrency, request)
+
+
+async def bench_cold(client: httpx.AsyncClient, site: FixtureSite, args) -> dict:
+    async def request(n: int) -> bool:
+        page = FIXTURE_PAGES[n % len(FIXTURE_PAGES)]
+        response = await client.get("/screenshot", params={
+            "url": site.url(page),
+            "sync": True,
+            "no_cache": True,
+        })
+        return is_image(response)
+
+    return await drive(args.cold_requests, args.concurrency, request)
+
+
+async def bench_batch(client: httpx.AsyncClient, site: FixtureSite, args) -> dict:
+    worker = ThreadPoolExecutor(max_workers=args.concurrency)
+    # O worker local executa as partes do lote como o Celery faria
+    main.capture_batch_task.apply_async = lambda args, **options: worker.submit(
+        main.capture_batch_task, *args
+    )
+
+    async def request(n: int) -> bool:
+        urls = [
+            site.url(f"{FIXTURE_PAGES[i % len(FIXTURE_PAGES)]}&batch={n}-{i}")
+            for i in range(args.batch_size)
+        ]
+        response = await client.post("/screenshots/batch", json={"urls": urls})
+        if response.status_code != 202:
+            return False
+        batch_id = response.json()["batch_id"]
+        while True:
+            progress = (await client.get(f"/screenshots/batch/{batch_id}")).json()
+            if progress["status"] == "completed":
+                return progress["failed"] == 0
+            await asyncio.sleep(0.05)
+
+    try:
+        result = await drive(args.batches, args.concurrency, request)
+    finally:
+        worker.shutdown(wait=False)
+    result["batch_size"] = args.batch_size
+    return result
+
+
+SCENARIOS = {
+    "cache_hit": bench_cache_hit,
+    "cold": bench_cold,
+    "batch": bench_batch,
+}
+
+
+async def run(args) -> dict:
+    results = {
+        "meta": {
+            "engine": args.engine,
+            "concurrency": args.concurrency,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+        },
+        "scenarios": {},
+    }
+    with tempfile.TemporaryDirectory() as cache_dir, FixtureSite() as site:
+        install_stand_ins(cache_dir, args.host_limits)
+        await start_engines(args.engine, args.concurrency, args.synthetic_delay)
+        try:
+            transport = httpx.ASGITransport(app=main.app)
+            async with httpx.AsyncClient(
+                transport=transport, base_url="http://bench", timeout=None
+            ) as client:
+                for name in args.scenarios:
+                    print(f"Executando {name}...", file=sys.stderr)
+                    results["scenarios"][name] = await SCENARIOS[name](client, site, args)
+        finally:
+            await stop_engines()
+    return results
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmarks offline da API de screenshots")
+    parser.add_argument("--engine", choices=("playwright", "synthetic"), default="playwright")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS),
+                        type=lambda value: [s for s in value.split(",") if s])
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=200, help="Requisições do cenário cache_hit")
+    parser.add_argument("--cold-requests", type=int, default=20, help="Renderizações do cenário cold")
+    parser.add_argument("--batches", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--synthetic-delay", type=float, default=0.2,
+                        help="Duração de cada renderização do motor sintético em segundos")
+    parser.add_argument("--host-limits", action="store_true",
+                        help="Mantém os limites por host (todas as fixtures usam o mesmo host)")
+    parser.add_argument("--output", help="Arquivo JSON com os resultados")
+    parser.add_argument("--baseline", help="Linha de base JSON para detectar regressões")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Piora relativa aceita em relação à linha de base")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="Grava os resultados como nova linha de base")
+    args = parser.parse_args(argv)
+    unknown = set(args.scenarios) - SCENARIOS.keys()
+    if unknown:
+        parser.error(f"Cenários desconhecidos: {', '.join(sorted(unknown))}")
+    return args
+
+
+def main_cli(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    # Uma linha de log por requisição distorce as medições
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    results = asyncio.run(run(args))
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+
+    if args.baseline and args.save_baseline:
+        with open(args.baseline, "w") as f:
+            f.write(output + "\n")
+    elif args.baseline:
+        with open(args.baseline) as f:
+            baseline: Dict = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"Regressão: {regression}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
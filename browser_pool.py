@@ -0,0 +1,145 @@
+"""Pool de navegadores Chromium persistente."""
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, List, Optional
+
+from playwright.async_api import Browser, BrowserContext, Playwright, async_playwright
+
+logger = logging.getLogger(__name__)
+
+
+class _BrowserGeneration:
+    """Um navegador lançado e a contagem de contextos que ele serviu."""
+
+    def __init__(self, browser: Browser) -> None:
+        self.browser = browser
+        self.launched_at = time.monotonic()
+        self.served = 0
+        self.active = 0
+
+
+class BrowserPool:
+    """
+    Mantém um navegador Chromium vivo entre capturas.
+
+    Cada captura recebe um ``BrowserContext`` novo e isolado (cookies, cache e
+    storage próprios). O navegador é relançado se cair e reciclado depois de
+    ``max_contexts`` contextos servidos ou ``max_age`` segundos de vida. Na
+    reciclagem o navegador antigo só é fechado quando seus contextos ativos
+    terminam, então capturas simultâneas não são interrompidas.
+    """
+
+    def __init__(self, max_contexts: int = 100, max_age: int = 3600) -> None:
+        self.max_contexts = max_contexts
+        self.max_age = max_age
+        self._playwright: Optional[Playwright] = None
+        self._current: Optional[_BrowserGeneration] = None
+        self._retired: List[_BrowserGeneration] = []
+        self._lock = asyncio.Lock()
+
+    @property
+    def active_contexts(self) -> int:
+        """Número de contextos abertos em todos os navegadores do pool."""
+        generations = self._retired + ([self._current] if self._current else [])
+        return sum(g.active for g in generations)
+
+    async def start(self) -> None:
+        """Inicia o Playwright e lança o navegador."""
+        async with self._lock:
+            await self._ensure_browser()
+
+    async def stop(self) -> None:
+        """Fecha os navegadores e encerra o Playwright."""
+        async with self._lock:
+            for generation in self._retired:
+                await self._close(generation)
+            self._retired.clear()
+            if self._current is not None:
+                await self._close(self._current)
+                self._current = None
+            if self._playwright is not None:
+                try:
+                    await self._playwright.stop()
+                except Exception as e:
+                    logger.warning(f"Erro ao encerrar o Playwright: {e}")
+                self._playwright = None
+
+    async def _launch(self) -> _BrowserGeneration:
+        if self._playwright is None:
+            self._playwright = await async_playwright().start()
+        browser = await self._playwright.chromium.launch(headless=True)
+        logger.info(f"Navegador lançado (versão {browser.version})")
+        return _BrowserGeneration(browser)
+
+    async def _close(self, generation: _BrowserGeneration) -> None:
+        try:
+            await generation.browser.close()
+        except Exception as e:
+            logger.warning(f"Erro ao fechar o navegador: {e}")
+
+    def _should_recycle(self, generation: _BrowserGeneration) -> bool:
+        if generation.served >= self.max_contexts:
+            return True
+        return time.monotonic() - generation.launched_at >= self.max_age
+
+    async def _retire(self, generation: _BrowserGeneration) -> None:
+        if generation.active == 0:
+            await self._close(generation)
+        else:
+            self._retired.append(generation)
+
+    async def _ensure_browser(self) -> _BrowserGeneration:
+        current = self._current
+        if current is not None and not current.browser.is_connected():
+            logger.warning("Navegador desconectado, relançando")
+            self._current = None
+            await self._retire(current)
+        elif current is not None and self._should_recycle(current):
+            logger.info(f"Reciclando navegador após {current.served} contextos")
+            self._current = None
+            await self._retire(current)
+        if self._current is None:
+            self._current = await self._launch()
+        return self._current
+
+    async def _release(self, generation: _BrowserGeneration) -> None:
+        generation.active -= 1
+        if generation in self._retired and generation.active == 0:
+            self._retired.remove(generation)
+            await self._close(generation)
+
+    @asynccontextmanager
+    async def new_context(self, **kwargs: Any) -> AsyncIterator[BrowserContext]:
+        """
+        Abre um contexto isolado no navegador do pool.
+
+        Args:
+            **kwargs: Argumentos repassados para ``browser.new_context``
+
+        Yields:
+            BrowserContext: Contexto novo, fechado ao sair do bloco
+        """
+        async with self._lock:
+            generation = await self._ensure_browser()
+            try:
+                context = await generation.browser.new_context(**kwargs)
+            except Exception as e:
+                # O navegador pode ter caído entre a checagem e o uso
+                logger.warning(f"Falha ao criar contexto ({e}), relançando")
+                self._current = None
+                await self._retire(generation)
+                generation = await self._ensure_browser()
+                context = await generation.browser.new_context(**kwargs)
+            generation.served += 1
+            generation.active += 1
+
+        try:
+            yield context
+        finally:
+            try:
+                await context.close()
+            except Exception as e:
+                logger.warning(f"Erro ao fechar o contexto: {e}")
+            await self._release(generation)
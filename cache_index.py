@@ -0,0 +1,374 @@
+"""Índice do cache de screenshots mantido no Redis e blobs por conteúdo."""
+import hashlib
+import logging
+import os
+import time
+from typing import Dict, List, NamedTuple, Optional
+
+import redis
+
+from storage import Storage
+
+logger = logging.getLogger(__name__)
+
+# Retira uma entrada do índice e solta sua referência ao blob; devolve o hash
+# do blob quando ele fica sem referências (o tamanho sai do total)
+_RELEASE = """
+local function release(name)
+    local size = redis.call('hget', KEYS[1], name)
+    local digest = redis.call('hget', KEYS[5], name)
+    redis.call('hdel', KEYS[1], name)
+    redis.call('zrem', KEYS[2], name)
+    redis.call('zrem', KEYS[3], name)
+    redis.call('hdel', KEYS[5], name)
+    redis.call('hdel', KEYS[7], name)
+    if not digest then
+        return false
+    end
+    if redis.call('hincrby', KEYS[6], digest, -1) > 0 then
+        return false
+    end
+    redis.call('hdel', KEYS[6], digest)
+    if size then
+        redis.call('decrby', KEYS[4], size)
+    end
+    return digest
+end
+"""
+
+# Remove uma entrada (se ainda apontar para o blob informado, quando houver)
+_REMOVE_ENTRY = _RELEASE + """
+if ARGV[2] ~= '' and redis.call('hget', KEYS[5], ARGV[1]) ~= ARGV[2] then
+    return {}
+end
+local digest = release(ARGV[1])
+if digest then
+    return {ARGV[1], digest}
+end
+return {}
+"""
+
+# Aponta uma entrada para um blob; o total só cresce quando o blob ganha a
+# primeira referência e só diminui quando o blob antigo perde a última
+_ADD_ENTRY = """
+local old = redis.call('hget', KEYS[5], ARGV[1])
+local orphan = {}
+if old ~= ARGV[5] then
+    if redis.call('hincrby', KEYS[6], ARGV[5], 1) == 1 then
+        redis.call('incrby', KEYS[4], ARGV[2])
+    end
+    if old then
+        local size = redis.call('hget', KEYS[1], ARGV[1])
+        if redis.call('hincrby', KEYS[6], old, -1) <= 0 then
+            redis.call('hdel', KEYS[6], old)
+            if size then
+                redis.call('decrby', KEYS[4], size)
+            end
+            orphan = {ARGV[1], old}
+        end
+    end
+end
+redis.call('hset', KEYS[1], ARGV[1], ARGV[2])
+redis.call('zadd', KEYS[2], ARGV[3], ARGV[1])
+redis.call('zadd', KEYS[3], ARGV[4], ARGV[1])
+redis.call('hset', KEYS[5], ARGV[1], ARGV[5])
+if ARGV[6] ~= '' then
+    redis.call('hset', KEYS[7], ARGV[1], ARGV[6])
+else
+    redis.call('hdel', KEYS[7], ARGV[1])
+end
+return orphan
+"""
+
+# Retira do índice as N entradas acessadas há mais tempo; devolve o número
+# de entradas seguido dos pares (nome, hash) dos blobs sem referências
+_POP_LRU = _RELEASE + """
+local victims = redis.call('zpopmin', KEYS[3], ARGV[1])
+local result = {#victims / 2}
+for i = 1, #victims, 2 do
+    local digest = release(victims[i])
+    if digest then
+        table.insert(result, victims[i])
+        table.insert(result, digest)
+    end
+end
+return result
+"""
+
+# Retira do índice até N entradas modificadas antes do limite informado, no
+# mesmo formato de _POP_LRU
+_POP_EXPIRED = _RELEASE + """
+local expired = redis.call('zrangebyscore', KEYS[2], '-inf', ARGV[1], 'LIMIT', 0, ARGV[2])
+local result = {#expired}
+for _, name in ipairs(expired) do
+    local digest = release(name)
+    if digest then
+        table.insert(result, name)
+        table.insert(result, digest)
+    end
+end
+return result
+"""
+
+# Recalcula as referências e o total a partir das entradas, atomicamente,
+# para não perder referências de capturas registradas durante a execução
+_RECOUNT = """
+local entries = redis.call('hgetall', KEYS[5])
+local refs = {}
+local total = 0
+for i = 1, #entries, 2 do
+    local digest = entries[i + 1]
+    if not refs[digest] then
+        refs[digest] = 0
+        total = total + tonumber(redis.call('hget', KEYS[1], entries[i]) or 0)
+    end
+    refs[digest] = refs[digest] + 1
+end
+redis.call('del', KEYS[6])
+for digest, count in pairs(refs) do
+    redis.call('hset', KEYS[6], digest, count)
+end
+redis.call('set', KEYS[4], total)
+return total
+"""
+
+
+class CacheEntry(NamedTuple):
+    """Entrada do cache resolvida para o blob que guarda o conteúdo."""
+    name: str
+    blob: str
+    size: int
+    mtime: float
+    digest: str
+    phash: str
+
+
+def blob_name(digest: str, name: str) -> str:
+    """Nome do blob de um conteúdo: o SHA-256 com a extensão da entrada."""
+    return digest + os.path.splitext(name)[1]
+
+
+class CacheIndex:
+    """
+    Índice das entradas do cache: tamanho, mtime, último acesso, hash do
+    conteúdo e hash perceptual.
+
+    As entradas (``<chave>.png``, ``<chave>_q80.jpg``...) não guardam bytes:
+    apontam para blobs nomeados pelo SHA-256 do conteúdo, com contagem de
+    referências. Capturas idênticas de URLs ou renderizações diferentes
+    ocupam um só blob, contado uma vez no total; o blob é removido quando a
+    última entrada que o usa sai do índice.
+
+    Mantém o tamanho total em um contador, então verificar o limite custa uma
+    leitura. Os conjuntos ordenados por mtime e por acesso permitem expirar e
+    remover entradas LRU com custo O(log n) por entrada, sem varrer o
+    armazenamento.
+    """
+
+    def __init__(
+        self,
+        client: redis.Redis,
+        storage: Storage,
+        max_size: int,
+        expiry: int,
+        prefix: str = "screenshot:cache:"
+    ) -> None:
+        self.client = client
+        self.storage = storage
+        self.max_size = max_size
+        self.expiry = expiry
+        self._keys = [
+            f"{prefix}sizes",
+            f"{prefix}mtimes",
+            f"{prefix}access",
+            f"{prefix}total",
+            f"{prefix}etags",
+            f"{prefix}refs",
+            f"{prefix}phashes",
+        ]
+        self._add = client.register_script(_ADD_ENTRY)
+        self._remove = client.register_script(_REMOVE_ENTRY)
+        self._pop_lru = client.register_script(_POP_LRU)
+        self._pop_expired = client.register_script(_POP_EXPIRED)
+        self._recount = client.register_script(_RECOUNT)
+
+    def store(
+        self,
+        name: str,
+        data: bytes,
+        mtime: Optional[float] = None,
+        phash: Optional[str] = None
+    ) -> CacheEntry:
+        """
+        Grava o conteúdo e aponta a entrada para ele.
+
+        O blob é gravado mesmo que já exista: uma remoção simultânea (a
+        última entrada que o usava saiu do índice) pode apagá-lo entre a
+        consulta e o registro. Depois do registro o blob tem uma referência
+        e é conferido de novo.
+
+        Args:
+            name: Nome da entrada
+            data: Conteúdo da imagem
+            mtime: Data da captura (padrão: agora)
+            phash: Hash perceptual da captura
+
+        Returns:
+            CacheEntry: Entrada registrada
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        blob = blob_name(digest, name)
+        self.storage.write(blob, data)
+        mtime = mtime or time.time()
+        self.add(name, len(data), digest, mtime, phash)
+        if self.storage.stat(blob) is None:
+            self.storage.write(blob, data)
+        return CacheEntry(name, blob, len(data), mtime, digest, phash or "")
+
+    def add(
+        self,
+        name: str,
+        size: int,
+        digest: str,
+        mtime: Optional[float] = None,
+        phash: Optional[str] = None
+    ) -> None:
+        """
+        Aponta uma entrada para um blob já gravado.
+
+        Se a entrada apontava para outro blob e ele ficou sem referências,
+        o blob antigo é removido do armazenamento.
+
+        Args:
+            name: Nome da entrada
+            size: Tamanho do blob em bytes
+            digest: SHA-256 do conteúdo (nome do blob e ETag das respostas)
+            mtime: Data de modificação (padrão: agora)
+            phash: Hash perceptual da captura
+        """
+        now = time.time()
+        orphan = self._add(
+            keys=self._keys,
+            args=[name, size, mtime or now, now, digest, phash or ""],
+            client=self.client
+        )
+        self._delete_blobs(orphan)
+
+    def lookup(self, name: str) -> Optional[CacheEntry]:
+        """Resolve uma entrada para o seu blob, ou None se ela não existir."""
+        pipe = self.client.pipeline(transaction=False)
+        pipe.hget(self._keys[0], name)
+        pipe.zscore(self._keys[1], name)
+        pipe.hget(self._keys[4], name)
+        pipe.hget(self._keys[6], name)
+        size, mtime, digest, phash = pipe.execute()
+        if size is None or mtime is None or not digest:
+            return None
+        return CacheEntry(name, blob_name(digest, name), int(size), mtime, digest, phash or "")
+
+    def touch(self, name: str) -> None:
+        """Atualiza o último acesso de uma entrada existente."""
+        self.client.zadd(self._keys[2], {name: time.time()}, xx=True)
+
+    def remove(self, name: str, digest: Optional[str] = None) -> None:
+        """
+        Remove uma entrada do índice e o blob, se ela era a última referência.
+
+        Com ``digest``, só remove se a entrada ainda apontar para esse blob.
+        """
+        orphan = self._remove(keys=self._keys, args=[name, digest or ""], client=self.client)
+        self._delete_blobs(orphan)
+
+    def total_size(self) -> int:
+        """Tamanho total dos blobs referenciados em bytes."""
+        return int(self.client.get(self._keys[3]) or 0)
+
+    def _delete_blobs(self, pairs: List[str]) -> None:
+        # Pares (nome da entrada, hash) devolvidos pelos scripts; pula os
+        # blobs que voltaram a ter referência desde então
+        for name, digest in zip(pairs[::2], pairs[1::2]):
+            if self.client.hexists(self._keys[5], digest):
+                continue
+            blob = blob_name(digest, name)
+            try:
+                self.storage.delete(blob)
+            except OSError as e:
+                logger.warning(f"Erro ao remover {blob} do cache: {e}")
+
+    def evict_expired(self, batch_size: int = 500) -> int:
+        """
+        Remove as entradas mais antigas que a validade do cache.
+
+        Returns:
+            int: Número de entradas removidas
+        """
+        cutoff = time.time() - self.expiry
+        removed = 0
+        while True:
+            count, *orphans = self._pop_expired(
+                keys=self._keys,
+                args=[cutoff, batch_size],
+                client=self.client
+            )
+            self._delete_blobs(orphans)
+            removed += count
+            if count < batch_size:
+                return removed
+
+    def evict_to_fit(self, low_watermark: float = 0.8, batch_size: int = 50) -> int:
+        """
+        Remove entradas LRU se o cache passar do limite de tamanho.
+
+        Remove até o total ficar abaixo de ``low_watermark`` do limite.
+
+        Returns:
+            int: Número de entradas removidas
+        """
+        if self.total_size() <= self.max_size:
+            return 0
+        removed = 0
+        while self.total_size() > self.max_size * low_watermark:
+            count, *orphans = self._pop_lru(keys=self._keys, args=[batch_size], client=self.client)
+            if not count:
+                break
+            self._delete_blobs(orphans)
+            removed += count
+        return removed
+
+    def reconcile(self, grace: float = 3600) -> dict:
+        """
+        Corrige o índice comparando-o com os blobs do armazenamento.
+
+        Remove entradas cujo blob sumiu, recalcula as referências e o total
+        (em um script, sem perder referências gravadas nesse meio tempo) e
+        apaga blobs sem referências com mais de ``grace`` segundos, para não
+        pegar um blob gravado por uma captura que ainda vai registrá-lo. O
+        índice é lido antes da listagem, então blobs de entradas novas já
+        estão gravados quando o armazenamento é percorrido.
+
+        Returns:
+            dict: Contagem de entradas removidas e de blobs órfãos apagados
+        """
+        entries = dict(self.client.hscan_iter(self._keys[4]))
+        blobs = {stored.name: stored for stored in self.storage.iter_objects()}
+
+        removed = 0
+        for name, digest in entries.items():
+            if blob_name(digest, name) not in blobs:
+                self.remove(name, digest)
+                removed += 1
+
+        self._recount(keys=self._keys, client=self.client)
+
+        referenced = {blob_name(digest, name) for name, digest in entries.items()}
+        cutoff = time.time() - grace
+        orphaned = 0
+        for name, stored in blobs.items():
+            if name in referenced or stored.mtime >= cutoff:
+                continue
+            # Uma captura pode ter passado a usar o blob depois da leitura
+            if self.client.hexists(self._keys[5], os.path.splitext(name)[0]):
+                continue
+            self.storage.delete(name)
+            orphaned += 1
+        return {"removed": removed, "orphaned": orphaned}
@@ -0,0 +1,102 @@
+"""Chaves canônicas de cache para capturas e suas variantes."""
+import hashlib
+import json
+from typing import Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from imaging import FORMAT_EXTENSIONS
+
+# Incrementar quando o formato da chave mudar, invalidando o cache antigo
+CACHE_KEY_VERSION = 2
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_url(url: str) -> str:
+    """
+    Normaliza a URL para que endereços equivalentes gerem a mesma chave.
+
+    Coloca esquema e host em minúsculas, remove a porta padrão e o fragmento,
+    usa "/" como caminho vazio e ordena os parâmetros da query string.
+
+    Args:
+        url: URL informada na requisição
+
+    Returns:
+        str: URL normalizada
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != _DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    if parts.username:
+        userinfo = parts.username
+        if parts.password:
+            userinfo += f":{parts.password}"
+        host = f"{userinfo}@{host}"
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, host, parts.path or "/", query, ""))
+
+
+def render_key(
+    url: str,
+    view: str,
+    full_page: bool,
+    wait_time: int,
+    wait_until: str,
+    wait_for_images_flag: bool,
+    scroll_page_flag: bool,
+    block: str = ""
+) -> str:
+    """
+    Gera a chave da captura mestre a partir dos parâmetros que afetam a imagem.
+
+    A qualidade não entra na chave: ela só afeta a codificação das variantes
+    derivadas da captura mestre. ``block`` é o token da política de bloqueio
+    de requisições, que muda o conteúdo renderizado.
+
+    Returns:
+        str: Hash hexadecimal que identifica a renderização
+    """
+    params = {
+        "version": CACHE_KEY_VERSION,
+        "url": normalize_url(url),
+        "view": view,
+        "full_page": full_page,
+        "wait_time": wait_time,
+        "wait_until": wait_until,
+        "wait_for_images": wait_for_images_flag,
+        "scroll_page": scroll_page_flag,
+        "block": block,
+    }
+    canonical = json.dumps(params, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def master_name(key: str) -> str:
+    """Nome do arquivo da captura mestre (PNG sem perdas)."""
+    return f"{key}.png"
+
+
+def variant_name(
+    key: str,
+    quality: int,
+    fmt: str = "jpeg",
+    width: Optional[int] = None,
+    height: Optional[int] = None,
+    fit: str = "contain"
+) -> str:
+    """
+    Nome do arquivo de uma variante derivada da captura mestre.
+
+    Ex.: ``{key}_q80.jpg`` (JPEG no tamanho original) ou
+    ``{key}_q75_320x0_contain.webp``. PNG não tem qualidade; um PNG no tamanho
+    original é a própria captura mestre.
+    """
+    parts = [key]
+    if fmt != "png":
+        parts.append(f"q{quality}")
+    if width or height:
+        parts.append(f"{width or 0}x{height or 0}_{fit}")
+    return "_".join(parts) + "." + FORMAT_EXTENSIONS[fmt]
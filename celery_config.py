@@ -3,6 +3,8 @@
 from dotenv import load_dotenv
 import logging
 
+from admission import PRIORITY_SEP, PRIORITY_STEPS, QUEUE_CHEAP, QUEUE_HEAVY
+
 # Configuração de logging
 logging.basicConfig(
     level=logging.INFO,
@@ -44,22 +46,40 @@
     
     # Configurações de tarefas
     task_track_started=True,
+    # Limites de tempo (ignorados pelo pool de threads; nele vale RENDER_TIMEOUT)
     task_time_limit=180,  # 3 minutos máximo por tarefa
     task_soft_time_limit=150,  # 2.5 minutos soft limit
     task_default_retry_delay=30,  # 30 segundos entre retries
     task_max_retries=3,  # Máximo de 3 tentativas
     
+    # Filas por custo e prioridades (no transporte Redis, 0 é a maior)
+    task_routes={
+        'main.capture_screenshot_task': {'queue': QUEUE_CHEAP},
+        'main.capture_batch_task': {'queue': QUEUE_HEAVY},
+    },
+    task_default_priority=3,
+    
     # Configurações de worker
-    worker_max_tasks_per_child=30,  # Reinicia o worker após 30 tarefas
-    worker_prefetch_multiplier=1,  # Processa uma tarefa por vez
-    worker_concurrency=1,  # Apenas 1 worker para economizar memória
+    # Pool de threads: cada thread aguarda uma página no motor de renderização,
+    # que roda todas no mesmo event loop e no mesmo navegador
+    worker_pool=os.getenv('WORKER_POOL', 'threads'),
+    worker_concurrency=int(os.getenv('RENDER_MAX_PAGES', 4)),
+    worker_prefetch_multiplier=1,  # Não reserva tarefas além das vagas de página
+    # Reinicia o processo do worker após N tarefas (só vale para o pool prefork;
+    # o pool de navegadores recicla o Chromium por número de contextos ou idade)
+    worker_max_tasks_per_child=int(os.getenv('WORKER_MAX_TASKS_PER_CHILD', 500)),
     
     # Configurações de broker
-    broker_pool_limit=1,  # Limita conexões com Redis
+    broker_pool_limit=int(os.getenv('BROKER_POOL_LIMIT', 10)),  # Conexões com o broker reutilizadas por processo (publicação pelas threads da API)
     broker_heartbeat=10,  # Reduz frequência de heartbeat
     broker_connection_retry=True,  # Tenta reconectar se perder conexão
     broker_connection_retry_on_startup=True,  # Tenta reconectar na inicialização
     broker_connection_max_retries=10,  # Número máximo de tentativas de reconexão
+    broker_transport_options={
+        'priority_steps': PRIORITY_STEPS,
+        'sep': PRIORITY_SEP,
+        'queue_order_strategy': 'priority',
+    },
     
     # Configurações de segurança
     task_acks_late=True,  # Confirma tarefas apenas após conclusão
@@ -78,12 +98,108 @@
     }
 )
 
+# Tarefas periódicas (executadas pelo Celery beat)
+celery_app.conf.beat_schedule = {
+    # Remove entradas expiradas e aplica o limite de tamanho pelo índice
+    'evict-cache': {
+        'task': 'main.evict_cache_task',
+        'schedule': int(os.getenv('CACHE_EVICT_INTERVAL', 300)),
+    },
+    # Corrige o índice do cache comparando-o com o armazenamento
+    'reconcile-cache-index': {
+        'task': 'main.reconcile_cache_index_task',
+        'schedule': int(os.getenv('CACHE_RECONCILE_INTERVAL', 3600)),
+    },
+    # Recaptura as imagens mais acessadas e a lista de aquecimento antes de vencerem
+    'warm-cache': {
+        'task': 'main.warm_cache_task',
+        'schedule': int(os.getenv('WARM_INTERVAL', 300)),
+    },
+}
+
 # Configurações de cache
 CACHE_DIR = os.getenv('CACHE_DIR', '/tmp/screenshot_cache')
 os.makedirs(CACHE_DIR, exist_ok=True)
 
+# Armazenamento das capturas
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'local')  # local (CACHE_DIR) ou s3
+STORAGE_S3_BUCKET = os.getenv('STORAGE_S3_BUCKET')  # Bucket das capturas (obrigatório com s3)
+STORAGE_S3_PREFIX = os.getenv('STORAGE_S3_PREFIX', '')  # Prefixo das chaves no bucket
+STORAGE_S3_ENDPOINT_URL = os.getenv('STORAGE_S3_ENDPOINT_URL')  # Endpoint de serviços compatíveis (MinIO, R2)
+
 # Limite de cache para 1GB (considerando outros serviços)
 MAX_CACHE_SIZE = 1024 * 1024 * 1024  # 1GB em bytes
 CACHE_EXPIRY = 24 * 60 * 60  # 24 horas em segundos
+CACHE_STALE_TTL = int(os.getenv('CACHE_STALE_TTL', 24 * 60 * 60))  # Tempo após a validade em que a imagem ainda é servida (e revalidada)
+
+# Camada em memória da API para as imagens mais acessadas
+MEMORY_CACHE_MAX_SIZE = int(os.getenv('MEMORY_CACHE_MAX_SIZE', 128 * 1024 * 1024))  # Orçamento em bytes (0 desativa)
+MEMORY_CACHE_MAX_ENTRY = int(os.getenv('MEMORY_CACHE_MAX_ENTRY', 2 * 1024 * 1024))  # Maior imagem guardada em memória
+MEMORY_CACHE_TTL = float(os.getenv('MEMORY_CACHE_TTL', 60))  # Segundos até a memória conferir de novo o disco
+
+# Aquecimento do cache pela popularidade das imagens
+POPULARITY_HALF_LIFE = float(os.getenv('POPULARITY_HALF_LIFE', 6 * 60 * 60))  # Segundos até um acesso valer metade
+POPULARITY_MAX_ENTRIES = int(os.getenv('POPULARITY_MAX_ENTRIES', 10000))  # Imagens acompanhadas (as menos acessadas saem)
+WARM_TOP_N = int(os.getenv('WARM_TOP_N', 100))  # Imagens mais acessadas mantidas aquecidas (0 desativa)
+WARM_MIN_HITS = float(os.getenv('WARM_MIN_HITS', 2))  # Acessos recentes mínimos para uma imagem ser aquecida
+WARM_LEAD = int(os.getenv('WARM_LEAD', 30 * 60))  # Segundos antes do vencimento em que a imagem é recapturada
+WARM_LIST_FILE = os.getenv('WARM_LIST_FILE')  # JSON com URLs e parâmetros sempre aquecidos
+WARM_MAX_TASKS = int(os.getenv('WARM_MAX_TASKS', 20))  # Recapturas enfileiradas por execução
+WARM_MAX_WAIT = float(os.getenv('WARM_MAX_WAIT', 5))  # Espera estimada da fila acima da qual o aquecimento pausa
+
+logger.info(f"Cache configurado em {CACHE_DIR} com limite de {MAX_CACHE_SIZE/1024/1024}MB")
+
+# Configurações do pool de navegadores
+BROWSER_MAX_CONTEXTS = int(os.getenv('BROWSER_MAX_CONTEXTS', 100))  # Contextos antes de reciclar
+BROWSER_MAX_AGE = int(os.getenv('BROWSER_MAX_AGE', 3600))  # Idade máxima do navegador em segundos
+
+# Configurações do motor de renderização
+RENDER_MAX_PAGES = int(os.getenv('RENDER_MAX_PAGES', 4))  # Páginas simultâneas por worker
+RENDER_MEMORY_LIMIT = int(os.getenv('RENDER_MEMORY_LIMIT', 1536 * 1024 * 1024))  # Não abre páginas acima disso (0 desativa)
+RENDER_TIMEOUT = int(os.getenv('RENDER_TIMEOUT', 150))  # Tempo máximo por captura em segundos
+INFLIGHT_TTL = int(os.getenv('INFLIGHT_TTL', 900))  # Validade da reserva de renderização em andamento
+
+# Configurações de prontidão da página (scroll e espera por imagens)
+READINESS_BUDGET = float(os.getenv('READINESS_BUDGET', 20))  # Tempo máximo de scroll + imagens por captura
+READINESS_STEP_TIMEOUT = float(os.getenv('READINESS_STEP_TIMEOUT', 2))  # Espera máxima por passo de scroll
+READINESS_IMAGE_TIMEOUT = float(os.getenv('READINESS_IMAGE_TIMEOUT', 5))  # Espera máxima por imagem
+READINESS_MAX_HEIGHT = int(os.getenv('READINESS_MAX_HEIGHT', 30000))  # Altura a partir da qual o scroll para
+
+# Captura da página inteira em faixas da altura do viewport
+FULLPAGE_TILED = os.getenv('FULLPAGE_TILED', 'true').lower() == 'true'  # false usa um único bitmap do Chromium
+FULLPAGE_MAX_HEIGHT = int(os.getenv('FULLPAGE_MAX_HEIGHT', 30000))  # Altura máxima capturada em pixels CSS (0 não limita)
+FULLPAGE_MAX_TILES = int(os.getenv('FULLPAGE_MAX_TILES', 0))  # Faixas máximas por captura (0 não limita)
+
+# Codificação das variantes (formato e tamanho)
+IMAGE_ENCODE_WORKERS = int(os.getenv('IMAGE_ENCODE_WORKERS', os.cpu_count() or 2))  # Codificações simultâneas por processo
+IMAGE_MAX_DIMENSION = int(os.getenv('IMAGE_MAX_DIMENSION', 4096))  # Maior largura/altura pedida em pixels
+IMAGE_MAX_PIXELS = int(os.getenv('IMAGE_MAX_PIXELS', 40_000_000))  # Acima disso a captura é lida em faixas e a variante reduzida (0 não limita)
+
+# Bloqueio de requisições e cache de subrecursos (CSS, JS, fontes e imagens)
+BLOCK_PROFILE = os.getenv('BLOCK_PROFILE', 'none')  # Perfil de bloqueio padrão das capturas
+BLOCK_TRACKER_DOMAINS_FILE = os.getenv('BLOCK_TRACKER_DOMAINS_FILE')  # Domínios extras de rastreadores, um por linha
+SUBRESOURCE_CACHE_DIR = os.getenv('SUBRESOURCE_CACHE_DIR', '/tmp/screenshot_subresources')
+SUBRESOURCE_CACHE_MAX_SIZE = int(os.getenv('SUBRESOURCE_CACHE_MAX_SIZE', 256 * 1024 * 1024))  # 0 desativa
+SUBRESOURCE_CACHE_MAX_ENTRY = int(os.getenv('SUBRESOURCE_CACHE_MAX_ENTRY', 10 * 1024 * 1024))  # Maior resposta guardada
+
+# Controle de admissão (profundidade das filas e espera estimada)
+WORKER_QUEUES = os.getenv('WORKER_QUEUES', f'{QUEUE_CHEAP},{QUEUE_HEAVY},celery').split(',')  # Filas consumidas pelo worker
+ADMISSION_MAX_DEPTH = int(os.getenv('ADMISSION_MAX_DEPTH', 1000))  # Tarefas à frente acima das quais responde 503
+ADMISSION_MAX_WAIT = float(os.getenv('ADMISSION_MAX_WAIT', 120))  # Espera estimada acima da qual responde 429
+ADMISSION_DEFAULT_DURATION = float(os.getenv('ADMISSION_DEFAULT_DURATION', 10))  # Duração assumida antes de haver medições
+
+# Limites por host para não sobrecarregar as origens
+HOST_MAX_CONCURRENCY = int(os.getenv('HOST_MAX_CONCURRENCY', 2))  # Capturas simultâneas por host (0 não limita)
+HOST_MIN_INTERVAL = float(os.getenv('HOST_MIN_INTERVAL', 1))  # Segundos entre o início de capturas do mesmo host (0 não espaça)
+HOST_BURST = int(os.getenv('HOST_BURST', 2))  # Capturas que podem começar juntas antes do espaçamento valer
+HOST_LIMITS = os.getenv('HOST_LIMITS')  # JSON com limites por host, ex.: {"example.com": {"max_concurrency": 1}}
+HOST_BUSY_DELAY = float(os.getenv('HOST_BUSY_DELAY', 5))  # Espera antes de tentar de novo um host sem vagas
+HOST_MAX_DEFERRALS = int(os.getenv('HOST_MAX_DEFERRALS', 30))  # Adiamentos antes de desistir da captura
+
+# Métricas Prometheus
+METRICS_WORKER_PORT = int(os.getenv('METRICS_WORKER_PORT', 9808))  # Porta do exportador do worker (0 desativa)
 
-logger.info(f"Cache configurado em {CACHE_DIR} com limite de {MAX_CACHE_SIZE/1024/1024}MB") 
\ No newline at end of file
+# Configurações de lotes
+BATCH_MAX_URLS = int(os.getenv('BATCH_MAX_URLS', 500))  # URLs por lote
+BATCH_CHUNK_SIZE = int(os.getenv('BATCH_CHUNK_SIZE', 10))  # URLs por tarefa do worker
+BATCH_TTL = int(os.getenv('BATCH_TTL', 3600))  # Validade do estado do lote em segundos
@@ -0,0 +1,29 @@
+"""Configuração do gunicorn para a API (``gunicorn -c gunicorn.conf.py main:app``)."""
+import os
+
+# Cada worker é um processo com o próprio event loop do uvicorn (e, a partir
+# da primeira captura com sync=true, o próprio Chromium)
+worker_class = "uvicorn.workers.UvicornWorker"
+workers = int(os.getenv('WEB_CONCURRENCY', os.cpu_count() or 2))  # Processos da API
+bind = os.getenv('API_BIND', '0.0.0.0:8000')  # Endereço de escuta
+
+# Long-polls e SSE seguram a requisição por até SSE_MAX_DURATION; o timeout
+# do gunicorn só vale para workers travados (sem heartbeat), não para
+# requisições lentas
+timeout = int(os.getenv('API_TIMEOUT', 120))  # Segundos sem heartbeat até reiniciar o worker
+graceful_timeout = int(os.getenv('API_GRACEFUL_TIMEOUT', 30))  # Espera pelas requisições no desligamento
+keepalive = int(os.getenv('API_KEEPALIVE', 5))  # Segundos com a conexão ociosa aberta
+
+# Recicla os workers aos poucos (jitter evita reiniciar todos juntos)
+max_requests = int(os.getenv('API_MAX_REQUESTS', 10000))  # Requisições por worker (0 desativa)
+max_requests_jitter = int(os.getenv('API_MAX_REQUESTS_JITTER', 1000))
+
+accesslog = '-'
+errorlog = '-'
+
+
+def child_exit(server, worker):
+    """Descarta as métricas do worker encerrado no modo multiprocesso do Prometheus."""
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,245 @@
+"""Respostas HTTP para arquivos do cache com validação condicional e Range."""
+import os
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Dict, Optional, Tuple
+
+import anyio
+from fastapi import Request
+from fastapi.responses import FileResponse, Response
+from starlette.types import Receive, Scope, Send
+
+
+def etag_matches(header: str, etag: str) -> bool:
+    """
+    Verifica se o ETag consta no cabeçalho If-None-Match ou If-Range.
+
+    Args:
+        header: Valor do cabeçalho (lista separada por vírgulas ou "*")
+        etag: ETag forte da representação, entre aspas
+
+    Returns:
+        bool: True se algum valor corresponder
+    """
+    if header.strip() == "*":
+        return True
+    candidates = [value.strip() for value in header.split(",")]
+    # If-None-Match usa comparação fraca: W/"x" corresponde a "x"
+    return any(value.removeprefix("W/") == etag for value in candidates)
+
+
+def is_not_modified(request: Request, etag: str, mtime: float) -> bool:
+    """
+    Indica se o cliente já tem a versão atual (resposta 304).
+
+    If-None-Match tem precedência; If-Modified-Since só é usado sem ele.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag_matches(if_none_match, etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return int(mtime) <= since
+    return False
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Interpreta um cabeçalho Range com um único intervalo de bytes.
+
+    Args:
+        header: Valor do cabeçalho, ex.: "bytes=0-1023", "bytes=500-", "bytes=-500"
+        size: Tamanho do arquivo em bytes
+
+    Returns:
+        Optional[Tuple[int, int]]: Início e fim (inclusivos), ou None se o
+        cabeçalho for inválido ou tiver vários intervalos (serve o arquivo todo)
+
+    Raises:
+        ValueError: Se o intervalo não puder ser atendido (resposta 416)
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    start_text, sep, end_text = (part.strip() for part in spec.partition("-"))
+    valid = all(text.isdigit() or not text for text in (start_text, end_text))
+    if not sep or not valid or not (start_text or end_text):
+        return None
+    if size == 0:
+        raise ValueError("Arquivo vazio")
+    if not start_text:
+        # Sufixo: os últimos N bytes
+        length = int(end_text)
+        if length == 0:
+            raise ValueError("Intervalo vazio")
+        return max(size - length, 0), size - 1
+    start = int(start_text)
+    end = int(end_text) if end_text else size - 1
+    if start >= size:
+        raise ValueError("Intervalo fora do arquivo")
+    if start > end:
+        return None
+    return start, min(end, size - 1)
+
+
+class FileRangeResponse(Response):
+    """Transmite um intervalo de bytes de um arquivo em blocos."""
+
+    chunk_size = 64 * 1024
+
+    def __init__(
+        self,
+        path: str,
+        start: int,
+        end: int,
+        headers: Dict[str, str],
+        media_type: str
+    ) -> None:
+        self.path = path
+        self.start = start
+        self.end = end
+        self.status_code = 206
+        self.media_type = media_type
+        self.background = None
+        self.init_headers(headers)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({
+            "type": "http.response.start",
+            "status": self.status_code,
+            "headers": self.raw_headers,
+        })
+        remaining = self.end - self.start + 1
+        async with await anyio.open_file(self.path, mode="rb") as file:
+            await file.seek(self.start)
+            while remaining > 0:
+                chunk = await file.read(min(self.chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({
+                    "type": "http.response.body",
+                    "body": chunk,
+                    "more_body": remaining > 0,
+                })
+        if remaining > 0:
+            # O arquivo encolheu durante o envio; encerra o corpo
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+def _cache_headers(
+    etag: str,
+    mtime: float,
+    max_age: float,
+    extra_headers: Optional[Dict[str, str]]
+) -> Dict[str, str]:
+    return {
+        "ETag": etag,
+        "Last-Modified": formatdate(mtime, usegmt=True),
+        "Cache-Control": f"public, max-age={max(int(max_age), 0)}",
+        "Accept-Ranges": "bytes",
+        **(extra_headers or {}),
+    }
+
+
+def cached_file_response(
+    request: Request,
+    path: str,
+    media_type: str,
+    etag: str,
+    stat: os.stat_result,
+    max_age: int,
+    extra_headers: Optional[Dict[str, str]] = None,
+    mtime: Optional[float] = None
+) -> Response:
+    """
+    Responde com um arquivo do cache sem carregá-lo em memória.
+
+    Envia ETag, Last-Modified e Cache-Control; responde 304 para requisições
+    condicionais satisfeitas e 206 para Range. O corpo completo usa
+    ``FileResponse``, que delega ao servidor (``pathsend``) quando suportado.
+
+    Args:
+        request: Requisição recebida
+        path: Caminho do arquivo
+        media_type: Tipo MIME da imagem
+        etag: ETag forte derivado do conteúdo, entre aspas
+        stat: Resultado de ``os.stat`` do arquivo
+        max_age: Segundos restantes de validade para o Cache-Control
+        extra_headers: Cabeçalhos adicionais da resposta
+        mtime: Data usada em Last-Modified, se diferente da do arquivo
+
+    Returns:
+        Response: Resposta 200, 206, 304 ou 416
+    """
+    mtime = stat.st_mtime if mtime is None else mtime
+    headers = _cache_headers(etag, mtime, max_age, extra_headers)
+    if is_not_modified(request, etag, mtime):
+        return Response(status_code=304, headers=headers)
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    # If-Range exige comparação forte; datas e ETags fracos servem o arquivo todo
+    if range_header and (if_range is None or if_range.strip() == etag):
+        try:
+            byte_range = parse_range(range_header, stat.st_size)
+        except ValueError:
+            headers["Content-Range"] = f"bytes */{stat.st_size}"
+            return Response(status_code=416, headers=headers)
+        if byte_range is not None:
+            start, end = byte_range
+            headers["Content-Range"] = f"bytes {start}-{end}/{stat.st_size}"
+            headers["Content-Length"] = str(end - start + 1)
+            return FileRangeResponse(path, start, end, headers, media_type)
+
+    return FileResponse(path, media_type=media_type, headers=headers, stat_result=stat)
+
+
+def not_modified_response(
+    etag: str,
+    mtime: float,
+    max_age: float,
+    extra_headers: Optional[Dict[str, str]] = None
+) -> Response:
+    """Resposta 304 com os mesmos cabeçalhos de cache da imagem."""
+    return Response(status_code=304, headers=_cache_headers(etag, mtime, max_age, extra_headers))
+
+
+def cached_bytes_response(
+    request: Request,
+    body: bytes,
+    media_type: str,
+    etag: str,
+    mtime: float,
+    max_age: float,
+    extra_headers: Optional[Dict[str, str]] = None
+) -> Response:
+    """
+    Equivalente a ``cached_file_response`` para uma imagem já em memória.
+
+    Returns:
+        Response: Resposta 200, 206, 304 ou 416
+    """
+    headers = _cache_headers(etag, mtime, max_age, extra_headers)
+    if is_not_modified(request, etag, mtime):
+        return Response(status_code=304, headers=headers)
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (if_range is None or if_range.strip() == etag):
+        try:
+            byte_range = parse_range(range_header, len(body))
+        except ValueError:
+            headers["Content-Range"] = f"bytes */{len(body)}"
+            return Response(status_code=416, headers=headers)
+        if byte_range is not None:
+            start, end = byte_range
+            headers["Content-Range"] = f"bytes {start}-{end}/{len(body)}"
+            return Response(
+                body[start:end + 1], status_code=206, headers=headers, media_type=media_type
+            )
+
+    return Response(body, headers=headers, media_type=media_type)
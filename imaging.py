@@ -0,0 +1,398 @@
+"""Codificação das variantes derivadas da captura mestre."""
+import io
+import math
+import struct
+import zlib
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+from PIL import Image
+
+try:
+    # Registra o formato AVIF no Pillow (dependência opcional)
+    import pillow_avif  # noqa: F401
+except ImportError:
+    pass
+
+# Extensão de arquivo e tipo MIME de cada formato de saída
+FORMAT_EXTENSIONS = {"jpeg": "jpg", "webp": "webp", "avif": "avif", "png": "png"}
+MEDIA_TYPES = {
+    "jpg": "image/jpeg",
+    "webp": "image/webp",
+    "avif": "image/avif",
+    "png": "image/png",
+}
+
+# Modos de redimensionamento quando largura e altura são informadas
+FIT_MODES = ("contain", "cover", "fill")
+
+# Linhas decodificadas por vez ao percorrer a captura mestre em faixas
+STRIP_ROWS = 256
+
+# Largura da miniatura em tons de cinza de onde sai o hash perceptual
+_HASH_WIDTH = 72
+
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+class _Unstreamable(Exception):
+    """PNG que não dá para decodificar em faixas sem o Pillow."""
+
+
+def is_format_supported(fmt: str) -> bool:
+    """Indica se o Pillow instalado consegue gravar o formato."""
+    Image.init()
+    return fmt in FORMAT_EXTENSIONS and fmt.upper() in Image.SAVE
+
+
+def _geometry(
+    size: Tuple[int, int],
+    width: Optional[int],
+    height: Optional[int],
+    fit: str
+) -> Tuple[Tuple[int, int, int, int], Tuple[int, int]]:
+    """Recorte da imagem de origem e tamanho final de ``resize``."""
+    source_width, source_height = size
+    box = (0, 0, source_width, source_height)
+    if not width and not height:
+        return box, size
+    if not height:
+        height = max(round(source_height * width / source_width), 1)
+        fit = "contain"
+    elif not width:
+        width = max(round(source_width * height / source_height), 1)
+        fit = "contain"
+
+    if fit == "fill":
+        return box, (width, height)
+
+    if fit == "cover":
+        scale = min(max(width / source_width, height / source_height), 1.0)
+        crop_width = min(round(width / scale), source_width)
+        crop_height = min(round(height / scale), source_height)
+        left = (source_width - crop_width) // 2
+        box = (left, 0, left + crop_width, crop_height)
+        return box, (min(width, crop_width), min(height, crop_height))
+
+    scale = min(width / source_width, height / source_height, 1.0)
+    return box, (max(round(source_width * scale), 1), max(round(source_height * scale), 1))
+
+
+def _cap_pixels(size: Tuple[int, int], max_pixels: int) -> Tuple[int, int]:
+    """Reduz o tamanho, mantendo a proporção, até caber em ``max_pixels``."""
+    width, height = size
+    if not max_pixels or width * height <= max_pixels:
+        return size
+    factor = math.sqrt(max_pixels / (width * height))
+    return max(int(width * factor), 1), max(int(height * factor), 1)
+
+
+def resize(
+    image: Image.Image,
+    width: Optional[int],
+    height: Optional[int],
+    fit: str = "contain"
+) -> Image.Image:
+    """
+    Redimensiona a imagem para a largura e/ou altura pedidas.
+
+    Com só uma dimensão, a outra segue a proporção. Com as duas, ``contain``
+    cabe a imagem inteira na caixa, ``cover`` preenche a caixa cortando o
+    excesso (ancorado no topo, onde fica o conteúdo da página) e ``fill``
+    distorce para o tamanho exato. A imagem nunca é ampliada, exceto em ``fill``.
+    """
+    box, target = _geometry(image.size, width, height, fit)
+    if box != (0, 0, *image.size):
+        image = image.crop(box)
+    return image.resize(target, Image.LANCZOS) if target != image.size else image
+
+
+def image_size(data: bytes) -> Tuple[int, int]:
+    """Largura e altura da imagem, lidas do cabeçalho sem decodificar os pixels."""
+    if data[:8] == _PNG_SIGNATURE and data[12:16] == b"IHDR":
+        return struct.unpack(">II", data[16:24])
+    with Image.open(io.BytesIO(data)) as image:
+        return image.size
+
+
+def _stream_strips(data: bytes, rows: int) -> Iterator[Image.Image]:
+    """
+    Decodifica faixas de um PNG RGB de 8 bits sem filtros, como os do
+    ``PNGStreamWriter``, guardando só uma faixa descomprimida por vez.
+
+    Raises:
+        _Unstreamable: Em outro tipo de PNG (o erro pode surgir no meio,
+            na primeira linha com filtro)
+    """
+    if data[:8] != _PNG_SIGNATURE:
+        raise _Unstreamable()
+    width, height, depth, color, _, _, interlace = struct.unpack(">IIBBBBB", data[16:29])
+    if (depth, color, interlace) != (8, 2, 0):
+        raise _Unstreamable()
+    stride = width * 3 + 1
+    decompressor = zlib.decompressobj()
+    pending = bytearray()
+    emitted = 0
+
+    def take(count: int) -> Image.Image:
+        raw = bytes(pending[:count * stride])
+        del pending[:count * stride]
+        if any(raw[::stride]):
+            raise _Unstreamable()
+        pixels = b"".join(raw[row * stride + 1:(row + 1) * stride] for row in range(count))
+        return Image.frombytes("RGB", (width, count), pixels)
+
+    offset = 8
+    while offset < len(data) and emitted < height:
+        length, kind = struct.unpack(">I4s", data[offset:offset + 8])
+        chunk = data[offset + 8:offset + 8 + length]
+        offset += length + 12
+        if kind != b"IDAT":
+            continue
+        while emitted < height:
+            # Limita a saída: faixas brancas comprimem mais de mil vezes
+            output = decompressor.decompress(chunk, stride * rows)
+            pending += output
+            chunk = decompressor.unconsumed_tail
+            while emitted < height and len(pending) >= stride * min(rows, height - emitted):
+                count = min(rows, height - emitted)
+                yield take(count)
+                emitted += count
+            # Saída menor que o limite: o bloco foi todo descomprimido
+            if not chunk and len(output) < stride * rows:
+                break
+    if emitted < height:
+        raise _Unstreamable()
+
+
+def _decoded_strips(data: bytes, rows: int) -> Iterator[Image.Image]:
+    """Faixas de uma imagem decodificada inteira pelo Pillow."""
+    with Image.open(io.BytesIO(data)) as image:
+        image.load()
+        for top in range(0, image.height, rows):
+            yield image.crop((0, top, image.width, min(top + rows, image.height)))
+
+
+def _from_strips(data: bytes, consume: Callable[[Tuple[int, int], Iterator[Image.Image]], Image.Image]):
+    """
+    Aplica ``consume`` às faixas da imagem: em streaming nos PNGs montados
+    pelo ``PNGStreamWriter``, decodificando a imagem inteira nos demais.
+    """
+    size = image_size(data)
+    try:
+        return consume(size, _stream_strips(data, STRIP_ROWS))
+    except _Unstreamable:
+        return consume(size, _decoded_strips(data, STRIP_ROWS))
+
+
+def _scale_strips(
+    strips: Iterator[Image.Image],
+    box: Tuple[int, int, int, int],
+    target: Tuple[int, int],
+    mode: str
+) -> Image.Image:
+    """Monta o recorte ``box`` no tamanho ``target`` redimensionando faixa a faixa."""
+    left, top, right, bottom = box
+    scale = target[1] / (bottom - top)
+    canvas = Image.new(mode, target, "white")
+    y = 0
+    for strip in strips:
+        strip_top, y = y, y + strip.height
+        if strip_top >= bottom:
+            break
+        start, end = max(strip_top, top), min(y, bottom)
+        first, last = round((start - top) * scale), round((end - top) * scale)
+        if end <= start or last <= first:
+            continue
+        # Linhas da faixa que correspondem exatamente às linhas de destino,
+        # para não deixar emendas entre as faixas
+        source_top = min(max(first / scale + top - strip_top, 0), strip.height)
+        source_bottom = min(max(last / scale + top - strip_top, 0), strip.height)
+        if source_bottom <= source_top:
+            continue
+        if strip.mode != mode:
+            strip = strip.convert(mode)
+        part = strip.resize(
+            (target[0], last - first),
+            Image.LANCZOS,
+            box=(left, source_top, right, source_bottom)
+        )
+        canvas.paste(part, (0, first))
+    return canvas
+
+
+def encode_rendition(
+    master: bytes,
+    quality: int = 80,
+    fmt: str = "jpeg",
+    width: Optional[int] = None,
+    height: Optional[int] = None,
+    fit: str = "contain",
+    max_pixels: int = 0
+) -> bytes:
+    """
+    Gera uma variante da captura mestre (PNG) no formato e tamanho pedidos.
+
+    Capturas com mais de ``max_pixels`` pixels não são decodificadas
+    inteiras: a variante é montada faixa a faixa e, se ainda passar do
+    limite, reduzida (mantendo a proporção) até caber nele.
+
+    Args:
+        master: Bytes da captura mestre
+        quality: Qualidade (1-100), ignorada em PNG
+        fmt: Formato de saída ("jpeg", "webp", "avif" ou "png")
+        width: Largura máxima em pixels
+        height: Altura máxima em pixels
+        fit: Modo de redimensionamento ("contain", "cover" ou "fill")
+        max_pixels: Pixels máximos decodificados e da variante (0 não limita)
+
+    Returns:
+        bytes: Imagem codificada
+
+    Raises:
+        Image.DecompressionBombError: Se a captura for grande demais para o
+            Pillow e não puder ser lida em faixas
+    """
+    size = image_size(master)
+    if max_pixels and size[0] * size[1] > max_pixels:
+        box, target = _geometry(size, width, height, fit)
+        target = _cap_pixels(target, max_pixels)
+        image = _from_strips(master, lambda _, strips: _scale_strips(strips, box, target, "RGB"))
+        return _encode(image, quality, fmt)
+    with Image.open(io.BytesIO(master)) as image:
+        return _encode(resize(image, width, height, fit), quality, fmt)
+
+
+def _encode(image: Image.Image, quality: int, fmt: str) -> bytes:
+    output = io.BytesIO()
+    if fmt == "png":
+        image.save(output, format="PNG")
+    elif fmt == "jpeg":
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        image.save(output, format="JPEG", quality=quality)
+    else:
+        image.save(output, format=fmt.upper(), quality=quality)
+    return output.getvalue()
+
+
+def perceptual_hash(data: bytes) -> str:
+    """
+    Hash perceptual (dHash de 64 bits) de uma imagem, em 16 dígitos hex.
+
+    A imagem é reduzida a 9x8 em tons de cinza e cada bit diz se um pixel é
+    mais claro que o vizinho da direita. Recompressões, pequenas diferenças
+    de renderização e cursores piscando mudam poucos bits; uma mudança de
+    conteúdo muda muitos. Compare com ``hash_distance``.
+
+    A redução passa por uma miniatura montada faixa a faixa, então capturas
+    em faixas não são decodificadas inteiras.
+
+    Raises:
+        Image.DecompressionBombError: Como em ``encode_rendition``
+    """
+    def thumbnail(size, strips):
+        height = max(round(size[1] * _HASH_WIDTH / size[0]), 8)
+        return _scale_strips(strips, (0, 0, *size), (_HASH_WIDTH, height), "L")
+
+    small = _from_strips(data, thumbnail).resize((9, 8), Image.BILINEAR)
+    pixels = list(small.getdata())
+    bits = 0
+    for row in range(8):
+        for column in range(8):
+            left = pixels[row * 9 + column]
+            right = pixels[row * 9 + column + 1]
+            bits = (bits << 1) | (left > right)
+    return f"{bits:016x}"
+
+
+def hash_distance(a: str, b: str) -> int:
+    """
+    Distância de Hamming entre dois hashes perceptuais.
+
+    Raises:
+        ValueError: Se algum dos hashes não for hexadecimal
+    """
+    return bin(int(a, 16) ^ int(b, 16)).count("1")
+
+
+class PNGStreamWriter:
+    """
+    Monta um PNG RGB a partir de faixas horizontais, uma de cada vez.
+
+    Cada faixa é decodificada, comprimida e descartada, então a memória fica
+    limitada a uma faixa mais o PNG comprimido, em vez do bitmap inteiro da
+    página. A altura final é declarada no início (o cabeçalho do PNG vem
+    antes dos pixels): faixas que passam dela são cortadas e, se faltarem
+    linhas ao final, elas são preenchidas de branco.
+    """
+
+    # Tamanho a partir do qual os dados comprimidos viram um bloco IDAT
+    chunk_size = 256 * 1024
+
+    def __init__(self, width: int, height: int, compress_level: int = 6) -> None:
+        self.width = width
+        self.height = height
+        self.rows = 0
+        self._output = io.BytesIO()
+        self._pending = bytearray()
+        self._compressor = zlib.compressobj(compress_level)
+        self._output.write(b"\x89PNG\r\n\x1a\n")
+        # Profundidade 8, RGB, sem entrelaçamento
+        self._chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+
+    def _chunk(self, kind: bytes, data: bytes) -> None:
+        self._output.write(struct.pack(">I", len(data)))
+        self._output.write(kind)
+        self._output.write(data)
+        self._output.write(struct.pack(">I", zlib.crc32(kind + data)))
+
+    def _write_rows(self, raw: bytes, count: int) -> None:
+        stride = self.width * 3
+        # Cada linha começa pelo byte do filtro (0: nenhum)
+        scanlines = b"".join(
+            b"\x00" + raw[row * stride:(row + 1) * stride] for row in range(count)
+        )
+        self._pending += self._compressor.compress(scanlines)
+        self.rows += count
+        if len(self._pending) >= self.chunk_size:
+            self._chunk(b"IDAT", bytes(self._pending))
+            self._pending.clear()
+
+    def add_tile(self, tile: bytes) -> int:
+        """
+        Acrescenta uma faixa (PNG ou outro formato do Pillow) abaixo das anteriores.
+
+        Returns:
+            int: Linhas aproveitadas da faixa
+        """
+        with Image.open(io.BytesIO(tile)) as image:
+            image = image.convert("RGB")
+            if image.width != self.width:
+                row = Image.new("RGB", (self.width, image.height), "white")
+                row.paste(image, (0, 0))
+                image = row
+            count = min(image.height, self.height - self.rows)
+            if count > 0:
+                self._write_rows(image.tobytes(), count)
+        return max(count, 0)
+
+    def close(self, text: Optional[Dict[str, str]] = None) -> bytes:
+        """
+        Completa a altura declarada e finaliza o PNG.
+
+        Args:
+            text: Metadados gravados em blocos ``tEXt``
+
+        Returns:
+            bytes: PNG completo
+        """
+        while self.rows < self.height:
+            count = min(self.height - self.rows, 256)
+            self._write_rows(b"\xff" * (self.width * 3 * count), count)
+        self._pending += self._compressor.flush()
+        self._chunk(b"IDAT", bytes(self._pending))
+        self._pending.clear()
+        for keyword, value in (text or {}).items():
+            self._chunk(b"tEXt", keyword.encode("latin-1") + b"\x00" + value.encode("latin-1"))
+        self._chunk(b"IEND", b"")
+        return self._output.getvalue()
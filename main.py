@@ -1,17 +1,68 @@
-from typing import Literal, Optional
-from fastapi import FastAPI, HTTPException, BackgroundTasks, Depends
-from fastapi.responses import Response, JSONResponse
-from playwright.async_api import async_playwright
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List, Literal, Optional, Tuple
+from fastapi import FastAPI, HTTPException, Depends, Request
+from pydantic import BaseModel, Field
+from fastapi.responses import Response, JSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
+import asyncio
+import functools
 import io
+import json
 import os
-import hashlib
+import re
 import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timedelta
-import aiofiles
-from celery_config import celery_app, CACHE_DIR
+from PIL import Image
+from celery import states
+from celery.exceptions import MaxRetriesExceededError
+from celery.signals import (
+    before_task_publish, heartbeat_sent, task_postrun, task_prerun, worker_init,
+    worker_process_init, worker_process_shutdown, worker_shutdown
+)
+from prometheus_client import CONTENT_TYPE_LATEST
+from celery_config import (
+    celery_app, CACHE_DIR, BROWSER_MAX_CONTEXTS, BROWSER_MAX_AGE,
+    RENDER_MAX_PAGES, RENDER_MEMORY_LIMIT, RENDER_TIMEOUT, INFLIGHT_TTL,
+    BATCH_MAX_URLS, BATCH_CHUNK_SIZE, BATCH_TTL, READINESS_BUDGET,
+    READINESS_STEP_TIMEOUT, READINESS_IMAGE_TIMEOUT, READINESS_MAX_HEIGHT,
+    BLOCK_PROFILE, BLOCK_TRACKER_DOMAINS_FILE, SUBRESOURCE_CACHE_DIR,
+    SUBRESOURCE_CACHE_MAX_SIZE, SUBRESOURCE_CACHE_MAX_ENTRY, IMAGE_ENCODE_WORKERS,
+    IMAGE_MAX_DIMENSION, IMAGE_MAX_PIXELS, WORKER_QUEUES, ADMISSION_MAX_DEPTH, ADMISSION_MAX_WAIT,
+    ADMISSION_DEFAULT_DURATION, HOST_MAX_CONCURRENCY, HOST_MIN_INTERVAL, HOST_BURST,
+    HOST_LIMITS, HOST_BUSY_DELAY, HOST_MAX_DEFERRALS, METRICS_WORKER_PORT, CACHE_STALE_TTL,
+    MEMORY_CACHE_MAX_SIZE, MEMORY_CACHE_MAX_ENTRY, MEMORY_CACHE_TTL, STORAGE_BACKEND,
+    STORAGE_S3_BUCKET, STORAGE_S3_PREFIX, STORAGE_S3_ENDPOINT_URL, FULLPAGE_TILED,
+    FULLPAGE_MAX_HEIGHT, FULLPAGE_MAX_TILES, POPULARITY_HALF_LIFE, POPULARITY_MAX_ENTRIES,
+    WARM_TOP_N, WARM_MIN_HITS, WARM_LEAD, WARM_LIST_FILE, WARM_MAX_TASKS, WARM_MAX_WAIT
+)
+from render_engine import RenderEngine
+import readiness
+from readiness import CaptureBudget, NetworkMonitor
+from resource_policy import BlockPolicy, load_tracker_domains, resolve_block_policy
+from subresource_cache import SubresourceCache
+from admission import PRIORITIES, QUEUE_CHEAP, QUEUE_HEAVY, AdmissionController, cost_queue
+import metrics
+from politeness import HostScheduler, HostThrottled, origin_host, parse_host_limits
+from viewports import Viewport, group_by_scale, parse_view, parse_views
+from cache_keys import master_name, render_key, variant_name
+from imaging import (
+    MEDIA_TYPES, PNGStreamWriter, encode_rendition, hash_distance, is_format_supported,
+    perceptual_hash
+)
+from cache_index import CacheEntry, CacheIndex
+from storage import create_storage
+from batches import BatchStore, ITEM_COMPLETED, ITEM_FAILED, iter_zip, summarize
+from http_cache import (
+    cached_bytes_response, cached_file_response, is_not_modified, not_modified_response
+)
+from memory_cache import CachedImage, MemoryCache
+from popularity import PopularityTracker
 import shutil
 import logging
 import redis
+import redis.asyncio as aioredis
 from redis.exceptions import RedisError
 
 # Configuração de logging
@@ -21,18 +72,50 @@
 )
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Inicia e encerra o navegador e a medição do event loop com a aplicação."""
+    if SYNC_PRELAUNCH:
+        await start_api_render_engine()
+    monitor = asyncio.create_task(metrics.monitor_event_loop(LOOP_LAG_INTERVAL))
+    try:
+        yield
+    finally:
+        monitor.cancel()
+        await stop_api_render_engine()
+
 # Exporta a app FastAPI e o celery_app
 app = FastAPI(
     title="Screenshot API",
     description="API para capturar screenshots de websites",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
-# Configurações de viewport para diferentes dispositivos
-VIEWPORT_CONFIGS = {
-    "desktop": {"width": 1920, "height": 1080},
-    "mobile": {"width": 375, "height": 812}
-}
+# Visualizações por requisição no parâmetro ``views``
+VIEWS_MAX = int(os.getenv('VIEWS_MAX', 6))
+
+# Bits diferentes até os quais duas capturas contam como iguais no ``since``
+PHASH_MAX_DISTANCE = int(os.getenv('PHASH_MAX_DISTANCE', 4))
+
+# Tempo máximo do long-poll de status e da conexão SSE, em segundos
+STATUS_MAX_WAIT = int(os.getenv('STATUS_MAX_WAIT', 60))
+SSE_MAX_DURATION = int(os.getenv('SSE_MAX_DURATION', 300))
+SSE_KEEPALIVE_INTERVAL = 15
+
+# Captura síncrona na API (sync=true): capturas simultâneas e prazo em segundos
+SYNC_MAX_CONCURRENCY = int(os.getenv('SYNC_MAX_CONCURRENCY', 2))
+SYNC_DEADLINE = float(os.getenv('SYNC_DEADLINE', 10))
+SYNC_PRELAUNCH = os.getenv('SYNC_PRELAUNCH', 'false').lower() == 'true'
+
+# E/S da API fora do event loop: conexões do pool Redis assíncrono (cada
+# long-poll ou SSE aberto ocupa uma para o pub/sub) e threads para o Redis
+# síncrono, o armazenamento e a publicação de tarefas
+REDIS_MAX_CONNECTIONS = int(os.getenv('REDIS_MAX_CONNECTIONS', 200))
+API_IO_WORKERS = int(os.getenv('API_IO_WORKERS', 16))
+
+# Intervalo da medição do atraso do event loop, em segundos
+LOOP_LAG_INTERVAL = float(os.getenv('LOOP_LAG_INTERVAL', 0.5))
 
 # Configurações de cache
 CACHE_EXPIRY = 24 * 60 * 60  # 24 horas em segundos
@@ -47,43 +130,698 @@
     decode_responses=True
 )
 
-def get_cache_path(url: str, view: str, full_page: bool) -> str:
-    """Gera um caminho único para o cache baseado nos parâmetros."""
-    cache_key = f"{url}_{view}_{full_page}"
-    return os.path.join(CACHE_DIR, hashlib.md5(cache_key.encode()).hexdigest() + ".jpg")
+# Cliente Redis assíncrono da API (health check, reservas e pub/sub de
+# conclusão de tarefas). O pool é compartilhado e limitado: esgotado, a
+# requisição espera até 5s por uma conexão livre em vez de abrir outra
+async_redis_pool = aioredis.BlockingConnectionPool(
+    host=os.getenv('REDIS_HOST', 'localhost'),
+    port=int(os.getenv('REDIS_PORT', 6379)),
+    username=os.getenv('REDIS_USER', 'default'),
+    password=os.getenv('REDIS_PASSWORD', 'ABF93E2D72196575E616CB41A49EE'),
+    max_connections=REDIS_MAX_CONNECTIONS,
+    timeout=5,
+    decode_responses=True
+)
+async_redis_client = aioredis.Redis(connection_pool=async_redis_pool)
+
+# Threads da API para chamadas bloqueantes; o limite impede que um Redis ou
+# armazenamento lento acumule threads
+io_pool = ThreadPoolExecutor(max_workers=API_IO_WORKERS, thread_name_prefix="api-io")
+
+async def run_io(func, *args, **kwargs):
+    """Executa uma chamada bloqueante no ``io_pool``, fora do event loop."""
+    return await asyncio.get_running_loop().run_in_executor(
+        io_pool, functools.partial(func, *args, **kwargs)
+    )
+
+# Canal de pub/sub em que o worker anuncia a conclusão de cada tarefa
+TASK_EVENTS_PREFIX = "screenshot:task:"
+
+# Estado dos lotes de capturas
+batch_store = BatchStore(redis_client, BATCH_TTL)
 
-async def cleanup_old_cache():
-    """Limpa arquivos de cache antigos."""
+# Armazenamento das capturas (disco local ou S3); as tarefas devolvem nomes
+# de objeto, não caminhos, então API e workers não precisam dividir o disco
+storage = create_storage(
+    STORAGE_BACKEND,
+    CACHE_DIR,
+    bucket=STORAGE_S3_BUCKET,
+    prefix=STORAGE_S3_PREFIX,
+    endpoint_url=STORAGE_S3_ENDPOINT_URL
+)
+
+# Índice do cache (tamanho, mtime, último acesso e blob de cada objeto); os
+# objetos ficam até o fim da janela em que ainda podem ser servidos vencidos
+cache_index = CacheIndex(redis_client, storage, MAX_CACHE_SIZE, CACHE_EXPIRY + CACHE_STALE_TTL)
+
+# Imagens mais acessadas em memória, na frente do cache em disco
+memory_cache = MemoryCache(MEMORY_CACHE_MAX_SIZE, MEMORY_CACHE_MAX_ENTRY, MEMORY_CACHE_TTL)
+
+# Acessos por imagem, com decaimento, para recapturar as populares antes de vencerem
+popularity = PopularityTracker(redis_client, POPULARITY_HALF_LIFE, POPULARITY_MAX_ENTRIES)
+
+# Controle de admissão pela profundidade das filas
+admission = AdmissionController(
+    redis_client,
+    ADMISSION_MAX_DEPTH,
+    ADMISSION_MAX_WAIT,
+    ADMISSION_DEFAULT_DURATION,
+    RENDER_MAX_PAGES
+)
+
+# Limites de concorrência e espaçamento por host
+host_scheduler = HostScheduler(
+    redis_client,
+    HOST_MAX_CONCURRENCY,
+    HOST_MIN_INTERVAL,
+    burst=HOST_BURST,
+    lease_ttl=RENDER_TIMEOUT + 30,
+    busy_delay=HOST_BUSY_DELAY,
+    overrides=parse_host_limits(HOST_LIMITS)
+)
+
+# Pool que codifica e redimensiona as variantes, limitando o uso de CPU
+encode_pool = ThreadPoolExecutor(
+    max_workers=IMAGE_ENCODE_WORKERS,
+    thread_name_prefix="encode"
+)
+
+# Domínios de rastreadores bloqueados pelas políticas de bloqueio
+TRACKER_DOMAINS = load_tracker_domains(BLOCK_TRACKER_DOMAINS_FILE)
+
+# Tipos de recurso estáticos guardados no cache de subrecursos do worker
+CACHEABLE_RESOURCE_TYPES = {"stylesheet", "script", "font", "image"}
+
+# Cache de CSS, JS, fontes e imagens compartilhado pelas capturas do worker
+subresource_cache = SubresourceCache(
+    SUBRESOURCE_CACHE_DIR,
+    SUBRESOURCE_CACHE_MAX_SIZE,
+    SUBRESOURCE_CACHE_MAX_ENTRY
+)
+
+def touch_cache_file(name: str) -> None:
+    """Marca o acesso a um objeto do cache para a remoção LRU."""
     try:
-        current_time = time.time()
-        for filename in os.listdir(CACHE_DIR):
-            filepath = os.path.join(CACHE_DIR, filename)
-            if os.path.getmtime(filepath) < current_time - CACHE_EXPIRY:
-                os.remove(filepath)
-    except Exception as e:
-        print(f"Erro ao limpar cache: {e}")
-
-async def check_cache_size():
-    """Verifica e limpa o cache se exceder o tamanho máximo."""
-    try:
-        total_size = sum(os.path.getsize(os.path.join(CACHE_DIR, f)) 
-                        for f in os.listdir(CACHE_DIR))
-        if total_size > MAX_CACHE_SIZE:
-            # Remove os arquivos mais antigos primeiro
-            files = [(f, os.path.getmtime(os.path.join(CACHE_DIR, f))) 
-                    for f in os.listdir(CACHE_DIR)]
-            files.sort(key=lambda x: x[1])
-            for f, _ in files:
-                if total_size <= MAX_CACHE_SIZE * 0.8:  # Limpa até 80% do limite
-                    break
-                filepath = os.path.join(CACHE_DIR, f)
-                total_size -= os.path.getsize(filepath)
-                os.remove(filepath)
+        cache_index.touch(name)
+    except RedisError as e:
+        logger.warning(f"Erro ao atualizar acesso de {name}: {e}")
+
+def write_cache_file(
+    name: str,
+    data: bytes,
+    mtime: Optional[float] = None,
+    phash: Optional[str] = None
+) -> CacheEntry:
+    """
+    Grava um objeto no cache.
+    
+    O conteúdo vai para um blob nomeado pelo seu hash (reaproveitado se
+    outra entrada já tiver os mesmos bytes) e a entrada passa a apontar
+    para ele.
+    """
+    started = time.monotonic()
+    entry = cache_index.store(name, data, mtime, phash)
+    metrics.observe_phase("cache_write", time.monotonic() - started)
+    return entry
+
+def get_media_type(name: str) -> str:
+    """Tipo MIME de um objeto do cache a partir da extensão."""
+    extension = os.path.splitext(name)[1].lstrip(".")
+    return MEDIA_TYPES.get(extension, "application/octet-stream")
+
+def find_cached_file(name: str) -> Optional[CacheEntry]:
+    """Resolve um objeto do cache para o seu blob, ou None se não existir."""
+    try:
+        return cache_index.lookup(name)
+    except RedisError as e:
+        logger.warning(f"Erro ao consultar {name} no índice do cache: {e}")
+        return None
+
+def get_cached_file(name: str) -> CacheEntry:
+    """
+    Resolve um objeto do cache para o seu blob.
+    
+    Raises:
+        FileNotFoundError: Se o objeto não existir
+    """
+    entry = find_cached_file(name)
+    if entry is None:
+        raise FileNotFoundError(name)
+    return entry
+
+def read_cached_file(name: str) -> bytes:
+    """
+    Conteúdo de um objeto do cache.
+    
+    Raises:
+        FileNotFoundError: Se o objeto não existir
+    """
+    return storage.read(get_cached_file(name).blob)
+
+def unchanged_since(since: Optional[str], phash: str) -> bool:
+    """Indica se a imagem é perceptualmente igual à do hash ``since``."""
+    return bool(since and phash) and hash_distance(since, phash) <= PHASH_MAX_DISTANCE
+
+async def serve_cached_file(
+    request: Request,
+    name: str,
+    max_age: int = CACHE_EXPIRY,
+    cache_status: Optional[str] = None,
+    since: Optional[str] = None
+) -> Response:
+    """
+    Responde com um objeto do cache, com ETag, Last-Modified e Cache-Control
+    ligados à validade do cache, 304 condicional e Range.
+    
+    No armazenamento local o arquivo é enviado em streaming; nos demais
+    backends o objeto é lido para a memória (exceto em respostas 304).
+    Informa a idade da imagem em ``Age``, o resultado em ``X-Cache`` (``HIT``
+    dentro de ``max_age``, ``STALE`` depois dele, ou ``cache_status`` se
+    dado) e o hash perceptual em ``X-Perceptual-Hash``. Se a imagem for
+    perceptualmente igual à do hash ``since``, responde 304 sem corpo.
+    """
+    entry = await run_io(get_cached_file, name)
+    etag = f'"{entry.digest}"'
+    age = max(time.time() - entry.mtime, 0)
+    if cache_status is None:
+        cache_status = "STALE" if age >= max_age else "HIT"
+    media_type = get_media_type(name)
+    extra_headers = {"Age": str(int(age)), "X-Cache": cache_status}
+    if entry.phash:
+        extra_headers["X-Perceptual-Hash"] = entry.phash
+    if unchanged_since(since, entry.phash):
+        return not_modified_response(etag, entry.mtime, max_age - age, extra_headers)
+    path = storage.local_path(entry.blob)
+    if path is not None:
+        stat = await run_io(os.stat, path)
+        response = cached_file_response(
+            request, path, media_type, etag, stat, max_age - age, extra_headers, entry.mtime
+        )
+    else:
+        body = b""
+        if not is_not_modified(request, etag, entry.mtime):
+            body = await run_io(storage.read, entry.blob)
+        response = cached_bytes_response(
+            request, body, media_type, etag, entry.mtime, max_age - age, extra_headers
+        )
+    metrics.BYTES_SERVED.inc(int(response.headers.get("content-length", 0)))
+    return response
+
+def serve_memory_image(
+    request: Request,
+    image: CachedImage,
+    max_age: int,
+    since: Optional[str] = None
+) -> Response:
+    """Responde com uma imagem da camada em memória, sem acessar o armazenamento."""
+    age = max(time.time() - image.mtime, 0)
+    extra_headers = {"Age": str(int(age)), "X-Cache": "HIT"}
+    if image.phash:
+        extra_headers["X-Perceptual-Hash"] = image.phash
+    if unchanged_since(since, image.phash):
+        return not_modified_response(image.etag, image.mtime, max_age - age, extra_headers)
+    response = cached_bytes_response(
+        request, image.body, image.media_type, image.etag, image.mtime, max_age - age,
+        extra_headers=extra_headers
+    )
+    metrics.BYTES_SERVED.inc(len(response.body))
+    return response
+
+def promote_to_memory(key: str, name: str) -> bool:
+    """
+    Copia uma imagem do armazenamento para a camada em memória.
+    
+    O objeto só é lido se a política de admissão aceitá-lo.
+    
+    Returns:
+        bool: True se a imagem ficou em memória
+    """
+    entry = find_cached_file(name)
+    if entry is None or not memory_cache.admits(name, entry.size):
+        return False
+    try:
+        body = storage.read(entry.blob)
+    except OSError:
+        return False
+    return memory_cache.put(
+        name, body, f'"{entry.digest}"', entry.mtime, get_media_type(name),
+        group=key, phash=entry.phash
+    )
+
+def is_fresh(entry: Optional[CacheEntry], max_age: float = CACHE_EXPIRY) -> bool:
+    """Retorna True se o objeto existir e tiver menos de ``max_age`` segundos."""
+    return entry is not None and time.time() - entry.mtime < max_age
+
+def write_variant(
+    master: bytes,
+    name: str,
+    quality: int,
+    mtime: float,
+    phash: Optional[str] = None,
+    **rendition
+) -> bytes:
+    """
+    Gera e salva uma variante a partir da captura mestre.
+    
+    A codificação roda no ``encode_pool``. A variante recebe o mtime e o
+    hash perceptual da captura mestre, assim as duas expiram juntas.
+    
+    Returns:
+        bytes: Imagem da variante no formato pedido
+    """
+    started = time.monotonic()
+    variant = encode_pool.submit(
+        encode_rendition, master, quality, max_pixels=IMAGE_MAX_PIXELS, **rendition
+    ).result()
+    metrics.observe_phase("encode", time.monotonic() - started)
+    write_cache_file(name, variant, mtime, phash)
+    return variant
+
+def get_cached_variant(
+    key: str,
+    quality: int,
+    max_age: int = CACHE_EXPIRY,
+    stale_ttl: int = 0,
+    **rendition
+) -> Optional[str]:
+    """
+    Busca a variante no cache, derivando-a da captura mestre se preciso.
+    
+    Uma variante só é válida se não for mais antiga que a captura mestre;
+    caso contrário ela veio de uma renderização anterior. Imagens com mais de
+    ``max_age`` segundos ainda são devolvidas até ``stale_ttl`` segundos
+    depois (vencidas); quem chama decide se revalida. Cada busca é contada em
+    ``metrics.CACHE_LOOKUPS``.
+    
+    Returns:
+        Optional[str]: Nome do objeto da imagem, ou None se não houver
+        captura válida
+    """
+    window = max_age + stale_ttl
+    variant = variant_name(key, quality, **rendition)
+    master = find_cached_file(master_name(key))
+    if variant == master_name(key):
+        # PNG no tamanho original é a própria captura mestre
+        if not is_fresh(master, window):
+            metrics.count_lookup("miss")
+            return None
+        metrics.count_lookup("hit" if is_fresh(master, max_age) else "stale")
+        touch_cache_file(master.name)
+        return master.name
+    
+    cached = find_cached_file(variant)
+    if is_fresh(cached, window) and (master is None or cached.mtime >= master.mtime):
+        metrics.count_lookup("hit" if is_fresh(cached, max_age) else "stale")
+        touch_cache_file(variant)
+        return variant
+    
+    if not is_fresh(master, window):
+        metrics.count_lookup("miss")
+        return None
+    # Transcodifica sem abrir o navegador
+    metrics.count_lookup("derived" if is_fresh(master, max_age) else "stale")
+    touch_cache_file(master.name)
+    try:
+        data = storage.read(master.blob)
+    except FileNotFoundError:
+        # Removida entre a consulta e a leitura
+        return None
+    try:
+        write_variant(data, variant, quality, master.mtime, master.phash, **rendition)
+    except Image.DecompressionBombError as e:
+        logger.warning(f"Captura grande demais para gerar {variant}: {e}")
+        return master.name
+    return variant
+
+# Reserva de renderização em andamento (single-flight)
+INFLIGHT_PREFIX = "screenshot:inflight:"
+
+# Remove a reserva apenas se ela ainda pertencer à tarefa informada
+_release_inflight_script = redis_client.register_script("""
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+""")
+
+def get_inflight_key(key: str, quality: int, **rendition) -> str:
+    """Gera a chave Redis que identifica uma renderização em andamento."""
+    return INFLIGHT_PREFIX + variant_name(key, quality, **rendition)
+
+def claim_inflight(key: str, task_id: str) -> Optional[str]:
+    """
+    Reserva a renderização para a tarefa informada.
+    
+    Args:
+        key: Chave da renderização em andamento
+        task_id: ID da tarefa que fará a renderização
+        
+    Returns:
+        Optional[str]: ID da tarefa que já está renderizando os mesmos
+        parâmetros, ou None se a reserva foi obtida
+    """
+    try:
+        for _ in range(2):
+            if redis_client.set(key, task_id, nx=True, ex=INFLIGHT_TTL):
+                return None
+            existing = redis_client.get(key)
+            if existing is None:
+                # A reserva expirou entre o SET e o GET; tenta de novo
+                continue
+            if celery_app.AsyncResult(existing).ready():
+                # A tarefa terminou sem liberar a reserva
+                release_inflight(key, existing)
+                continue
+            return existing
+    except RedisError as e:
+        # Sem Redis não há deduplicação, mas a captura segue normalmente
+        logger.warning(f"Erro ao reservar renderização em andamento: {e}")
+    return None
+
+def release_inflight(key: str, task_id: str) -> None:
+    """Libera a reserva da renderização se ela pertencer à tarefa."""
+    try:
+        _release_inflight_script(keys=[key], args=[task_id], client=redis_client)
+    except RedisError as e:
+        logger.warning(f"Erro ao liberar renderização em andamento: {e}")
+
+async def is_inflight(key: str) -> bool:
+    """
+    Indica se já há uma renderização em andamento com a reserva ``key``.
+    
+    Se o Redis falhar, responde True: a requisição segue para a fila em vez
+    de falhar.
+    """
+    try:
+        return bool(await async_redis_client.exists(key))
+    except RedisError as e:
+        logger.warning(f"Erro ao consultar renderização em andamento: {e}")
+        return True
+
+@celery_app.task(name='main.evict_cache_task')
+def evict_cache_task() -> dict:
+    """Remove do cache as entradas expiradas e, se preciso, as menos acessadas."""
+    expired = cache_index.evict_expired()
+    evicted = cache_index.evict_to_fit()
+    return {"expired": expired, "evicted": evicted}
+
+@celery_app.task(name='main.reconcile_cache_index_task')
+def reconcile_cache_index_task() -> dict:
+    """Corrige o índice do cache comparando-o com os blobs do armazenamento."""
+    result = cache_index.reconcile()
+    logger.info(f"Índice do cache reconciliado: {result}")
+    return result
+
+def load_warm_list(path: Optional[str]) -> List[Tuple[str, dict]]:
+    """
+    Lê a lista de aquecimento: um JSON com uma lista de objetos com ``url`` e
+    os parâmetros de ``/screenshot`` (``view``, ``full_page``, ``format``...).
+    
+    O arquivo é lido a cada execução, então mudanças valem sem reiniciar.
+    Entradas inválidas são ignoradas com um aviso.
+    
+    Returns:
+        List[Tuple[str, dict]]: Nome da imagem e argumentos da tarefa de
+        captura de cada entrada
+    """
+    if not path:
+        return []
+    try:
+        with open(path) as f:
+            items = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Erro ao ler a lista de aquecimento {path}: {e}")
+        return []
+    candidates = []
+    for item in items if isinstance(items, list) else []:
+        try:
+            entry = WarmEntry.model_validate(item)
+            validate_url(entry.url)
+            view = validate_view(entry.view)
+            validate_rendition(entry.format, entry.width, entry.height)
+            block = get_block_token(entry.block_profile, entry.block_resources)
+        except (ValueError, HTTPException) as e:
+            logger.warning(f"Entrada inválida na lista de aquecimento: {item!r} ({e})")
+            continue
+        rendition = {
+            "fmt": entry.format, "width": entry.width, "height": entry.height, "fit": entry.fit
+        }
+        task_kwargs = capture_task_kwargs(
+            entry.url, view, entry.full_page, entry.wait_time, entry.quality,
+            entry.wait_until, entry.wait_for_images_flag, entry.scroll_page_flag,
+            block, rendition
+        )
+        # A reserva é o prefixo seguido do nome da variante
+        candidates.append((task_kwargs["inflight_key"][len(INFLIGHT_PREFIX):], task_kwargs))
+    return candidates
+
+@celery_app.task(name='main.warm_cache_task')
+def warm_cache_task() -> dict:
+    """
+    Recaptura antes de vencerem as imagens da lista de aquecimento e as
+    ``WARM_TOP_N`` mais acessadas.
+    
+    Imagens com menos de ``CACHE_EXPIRY - WARM_LEAD`` segundos são mantidas.
+    As recapturas passam por ``schedule_refresh`` (prioridade baixa, reserva
+    em andamento e controle de admissão) e têm orçamento: no máximo
+    ``WARM_MAX_TASKS`` por execução, e nenhuma enquanto a espera estimada da
+    fila passar de ``WARM_MAX_WAIT`` segundos, para não disputar os workers
+    com o tráfego ao vivo.
+    
+    Returns:
+        dict: Imagens recapturadas, ainda válidas e adiadas
+    """
+    candidates = load_warm_list(WARM_LIST_FILE)
+    try:
+        popularity.rescale()
+        candidates += [
+            (entry.name, entry.params) for entry in popularity.top(WARM_TOP_N, WARM_MIN_HITS)
+        ]
+    except RedisError as e:
+        logger.warning(f"Erro ao ler a popularidade das imagens: {e}")
+    
+    counts = {result: 0 for result in metrics.WARM_RESULTS}
+    seen = set()
+    for name, task_kwargs in candidates:
+        if name in seen:
+            continue
+        seen.add(name)
+        entry = find_cached_file(name)
+        if entry is not None and time.time() - entry.mtime < CACHE_EXPIRY - WARM_LEAD:
+            result = "fresh"
+        else:
+            queue = cost_queue(task_kwargs["full_page"], task_kwargs["scroll_page_flag"])
+            try:
+                busy = (
+                    counts["scheduled"] >= WARM_MAX_TASKS
+                    or admission.estimated_wait(queue, PRIORITIES["low"]) > WARM_MAX_WAIT
+                )
+            except RedisError:
+                busy = True
+            if not busy and schedule_refresh(queue, task_kwargs):
+                result = "scheduled"
+            else:
+                result = "deferred"
+        counts[result] += 1
+        metrics.CACHE_WARMING.labels(result=result).inc()
+    logger.info(f"Aquecimento do cache: {counts}")
+    return counts
+
+# Motor de renderização do worker (criado na inicialização do worker)
+render_engine: Optional[RenderEngine] = None
+
+# Navegador da API para o modo sync=true, lançado na primeira captura
+# síncrona (ou no startup, com SYNC_PRELAUNCH): cada worker do gunicorn tem o
+# seu, e sem uso de sync=true nenhum Chromium fica aberto na API
+api_render_engine: Optional[RenderEngine] = None
+sync_semaphore = asyncio.Semaphore(max(SYNC_MAX_CONCURRENCY, 0))
+_api_engine_lock: Optional[asyncio.Lock] = None
+# Após uma falha ao lançar, espera antes de tentar de novo
+_api_engine_retry_at = 0.0
+API_ENGINE_RETRY_INTERVAL = 60
+
+def get_render_engine() -> RenderEngine:
+    """Retorna o motor de renderização do processo, criando-o se necessário."""
+    global render_engine
+    if render_engine is None:
+        render_engine = RenderEngine(
+            max_pages=RENDER_MAX_PAGES,
+            memory_limit=RENDER_MEMORY_LIMIT,
+            max_contexts=BROWSER_MAX_CONTEXTS,
+            max_age=BROWSER_MAX_AGE
+        )
+    return render_engine
+
+def _start_render_engine() -> None:
+    try:
+        get_render_engine().start_background()
     except Exception as e:
-        print(f"Erro ao verificar tamanho do cache: {e}")
+        # A tarefa tenta novamente ao renderizar
+        logger.error(f"Erro ao iniciar o motor de renderização: {e}")
+
+@worker_init.connect
+def init_render_engine(sender=None, **kwargs) -> None:
+    """Lança o navegador ao iniciar um worker de threads ou solo."""
+    # No prefork o navegador é lançado em cada processo filho, nunca no pai
+    if "prefork" not in str(getattr(sender, "pool_cls", "")).lower():
+        _start_render_engine()
+    if METRICS_WORKER_PORT > 0:
+        metrics.start_exporter(METRICS_WORKER_PORT)
+
+@worker_process_init.connect
+def init_process_render_engine(**kwargs) -> None:
+    """Lança o navegador em cada processo filho do pool prefork."""
+    _start_render_engine()
+
+@before_task_publish.connect
+def stamp_enqueued_at(headers: Optional[dict] = None, **kwargs) -> None:
+    """Marca o momento do envio da tarefa para medir a espera na fila."""
+    if headers is not None:
+        headers["enqueued_at"] = time.time()
+
+@task_prerun.connect
+def observe_task_wait(task=None, **kwargs) -> None:
+    """Registra quanto a tarefa esperou na fila (sem contar o atraso pedido)."""
+    request = task.request
+    enqueued_at = request.get("enqueued_at")
+    if enqueued_at is None:
+        return
+    if request.eta:
+        # Tarefas adiadas só passam a esperar a partir do horário agendado
+        try:
+            enqueued_at = max(enqueued_at, datetime.fromisoformat(request.eta).timestamp())
+        except (TypeError, ValueError):
+            pass
+    queue = (request.delivery_info or {}).get("routing_key") or "celery"
+    metrics.TASK_WAIT_SECONDS.labels(queue=queue).observe(max(time.time() - enqueued_at, 0))
+
+@task_postrun.connect
+def publish_task_done(task_id: Optional[str] = None, state: Optional[str] = None, **kwargs) -> None:
+    """Anuncia a conclusão da tarefa para long-poll e SSE na API."""
+    # O sinal também vem em RETRY (hosts no limite reenfileiram a tarefa);
+    # só estados finais interessam. O resultado já está gravado no backend
+    if state not in states.READY_STATES:
+        return
+    try:
+        redis_client.publish(TASK_EVENTS_PREFIX + task_id, state or "")
+    except RedisError as e:
+        logger.warning(f"Erro ao publicar conclusão da tarefa {task_id}: {e}")
+
+@heartbeat_sent.connect
+def announce_worker_slots(sender=None, **kwargs) -> None:
+    """Informa ao controle de admissão as vagas deste worker a cada heartbeat."""
+    try:
+        admission.register_worker(sender.eventer.hostname, WORKER_QUEUES, RENDER_MAX_PAGES, ttl=30)
+    except RedisError as e:
+        logger.warning(f"Erro ao anunciar as vagas do worker: {e}")
+
+@worker_shutdown.connect
+@worker_process_shutdown.connect
+def shutdown_render_engine(**kwargs) -> None:
+    """Fecha o navegador quando o worker termina."""
+    if render_engine is not None:
+        render_engine.stop_background()
+
+def submit_capture(
+    url: str,
+    view: str,
+    full_page: bool,
+    wait_time: int,
+    wait_until: str,
+    wait_for_images_flag: bool,
+    scroll_page_flag: bool,
+    block: str = ""
+) -> Future:
+    """
+    Agenda a renderização de uma URL no motor do worker.
+    
+    Returns:
+        Future: Futuro com a captura mestre (PNG)
+    """
+    return get_render_engine().submit(
+        render_page,
+        context_options=parse_view(view)[1].context_options(),
+        timeout=RENDER_TIMEOUT,
+        submitted_at=time.monotonic(),
+        url=url,
+        full_page=full_page,
+        wait_time=wait_time,
+        wait_until=wait_until,
+        wait_for_images_flag=wait_for_images_flag,
+        scroll_page_flag=scroll_page_flag,
+        block=block
+    )
+
+def store_capture(key: str, master: bytes, quality: int, **rendition) -> str:
+    """
+    Salva a captura mestre e a variante pedida no cache.
+    
+    O hash perceptual é calculado uma vez, sobre a captura mestre, e vale
+    para todas as variantes dela.
+    
+    Returns:
+        str: Nome do objeto da variante, ou da captura mestre se ela for
+        grande demais para o Pillow
+    """
+    variant = variant_name(key, quality, **rendition)
+    try:
+        phash = encode_pool.submit(perceptual_hash, master).result()
+    except Image.DecompressionBombError as e:
+        logger.warning(f"Captura grande demais para o hash perceptual: {e}")
+        phash = None
+    stored = write_cache_file(master_name(key), master, phash=phash)
+    if variant != stored.name:
+        try:
+            write_variant(master, variant, quality, stored.mtime, phash, **rendition)
+        except Image.DecompressionBombError as e:
+            # Serve a captura mestre em vez de falhar a tarefa
+            logger.warning(f"Captura grande demais para gerar {variant}: {e}")
+            variant = stored.name
+    
+    # Libera espaço de forma incremental se o cache passou do limite
+    try:
+        cache_index.evict_to_fit()
+    except RedisError as e:
+        logger.warning(f"Erro ao liberar espaço no cache: {e}")
+    
+    return variant
 
-@celery_app.task(name='main.capture_screenshot_task')
+def acquire_host_slot(url: str) -> Optional[Tuple[str, str]]:
+    """
+    Reserva uma vaga no host da URL antes de renderizá-la.
+    
+    Returns:
+        Optional[Tuple[str, str]]: Host e reserva, ou None se o Redis falhar
+        (a captura segue sem limite)
+        
+    Raises:
+        HostThrottled: Se o host estiver no limite
+    """
+    host = origin_host(url)
+    try:
+        return host, host_scheduler.acquire(host)
+    except RedisError as e:
+        logger.warning(f"Erro ao reservar vaga do host {host}: {e}")
+        return None
+
+def release_host_slot(slot: Optional[Tuple[str, str]]) -> None:
+    """Libera a vaga reservada por ``acquire_host_slot``."""
+    if slot is None:
+        return
+    try:
+        host_scheduler.release(*slot)
+    except RedisError as e:
+        logger.warning(f"Erro ao liberar vaga do host {slot[0]}: {e}")
+
+def capture_error(error: Exception) -> str:
+    """Mensagem de erro devolvida pelas tarefas de captura."""
+    if isinstance(error, TimeoutError):
+        return f"Erro ao capturar screenshot: tempo limite de {RENDER_TIMEOUT}s excedido"
+    return f"Erro ao capturar screenshot: {str(error)}"
+
+@celery_app.task(bind=True, name='main.capture_screenshot_task')
 def capture_screenshot_task(
+    self,
     url: str,
     view: str,
     full_page: bool,
@@ -92,284 +830,926 @@ def capture_screenshot_task(
     wait_until: str,
     wait_for_images_flag: bool,
     scroll_page_flag: bool,
-    no_cache: bool = False
+    no_cache: bool = False,
+    inflight_key: Optional[str] = None,
+    block: str = "",
+    fmt: str = "jpeg",
+    width: Optional[int] = None,
+    height: Optional[int] = None,
+    fit: str = "contain"
 ) -> str:
-    """Tarefa Celery para capturar screenshot."""
+    """
+    Tarefa Celery para capturar screenshot.
+    
+    Se o host da URL estiver no limite, a tarefa volta para a fila com um
+    atraso em vez de ocupar a vaga do worker esperando; a reserva em
+    andamento continua válida, pois o ID da tarefa não muda.
+    """
+    rendition = {"fmt": fmt, "width": width, "height": height, "fit": fit}
+    slot = None
+    try:
+        slot = acquire_host_slot(url)
+    except HostThrottled as e:
+        if self.request.retries < HOST_MAX_DEFERRALS:
+            raise self.retry(countdown=e.delay, max_retries=HOST_MAX_DEFERRALS)
+        if inflight_key:
+            release_inflight(inflight_key, self.request.id)
+        return capture_error(e)
+    try:
+        key = render_key(
+            url, view, full_page, wait_time, wait_until,
+            wait_for_images_flag, scroll_page_flag, block
+        )
+        
+        # Se no_cache for True, remove a captura e a variante se existirem
+        if no_cache:
+            for name in (master_name(key), variant_name(key, quality, **rendition)):
+                cache_index.remove(name)
+        
+        # Renderiza no navegador compartilhado, junto com as demais tarefas
+        started = time.monotonic()
+        master = submit_capture(
+            url, view, full_page, wait_time, wait_until,
+            wait_for_images_flag, scroll_page_flag, block
+        ).result()
+        try:
+            admission.record_duration(
+                cost_queue(full_page, scroll_page_flag), time.monotonic() - started
+            )
+        except RedisError as e:
+            logger.warning(f"Erro ao registrar a duração da captura: {e}")
+        
+        return store_capture(key, master, quality, **rendition)
+            
+    except Exception as e:
+        return capture_error(e)
+    finally:
+        release_host_slot(slot)
+        # Libera a reserva para que novas requisições criem outra tarefa
+        if inflight_key:
+            release_inflight(inflight_key, self.request.id)
+
+@celery_app.task(bind=True, name='main.capture_views_task')
+def capture_views_task(
+    self,
+    url: str,
+    views: List[str],
+    full_page: bool,
+    wait_time: int,
+    quality: int,
+    wait_until: str,
+    wait_for_images_flag: bool,
+    scroll_page_flag: bool,
+    no_cache: bool = False,
+    inflight_key: Optional[str] = None,
+    block: str = "",
+    fmt: str = "jpeg",
+    width: Optional[int] = None,
+    height: Optional[int] = None,
+    fit: str = "contain"
+) -> dict:
+    """
+    Tarefa Celery que captura a URL em várias visualizações.
+    
+    Cada grupo de viewports com a mesma densidade de pixels usa uma
+    navegação (``render_views``); os grupos rodam em sequência, ocupando uma
+    única vaga do host. Cada visualização preenche a própria entrada do
+    cache, a mesma usada por ``/screenshot?view=``.
+    
+    Returns:
+        dict: Nome do objeto da variante de cada visualização, ou a
+        mensagem de erro das que falharam
+    """
+    rendition = {"fmt": fmt, "width": width, "height": height, "fit": fit}
+    slot = None
+    try:
+        slot = acquire_host_slot(url)
+    except HostThrottled as e:
+        if self.request.retries < HOST_MAX_DEFERRALS:
+            raise self.retry(countdown=e.delay, max_retries=HOST_MAX_DEFERRALS)
+        if inflight_key:
+            release_inflight(inflight_key, self.request.id)
+        return {view: capture_error(e) for view in views}
+    results = {}
+    try:
+        for group in group_by_scale([parse_view(view) for view in views]):
+            keys = [
+                render_key(
+                    url, name, full_page, wait_time, wait_until,
+                    wait_for_images_flag, scroll_page_flag, block
+                )
+                for name, _ in group
+            ]
+            if no_cache:
+                for key in keys:
+                    for name in (master_name(key), variant_name(key, quality, **rendition)):
+                        cache_index.remove(name)
+            try:
+                masters = get_render_engine().submit(
+                    render_views,
+                    context_options=group[0][1].context_options(),
+                    timeout=RENDER_TIMEOUT,
+                    submitted_at=time.monotonic(),
+                    url=url,
+                    viewports=[viewport for _, viewport in group],
+                    full_page=full_page,
+                    wait_time=wait_time,
+                    wait_until=wait_until,
+                    wait_for_images_flag=wait_for_images_flag,
+                    scroll_page_flag=scroll_page_flag,
+                    block=block
+                ).result()
+            except Exception as e:
+                results.update((name, capture_error(e)) for name, _ in group)
+                continue
+            for (name, _), key, master in zip(group, keys, masters):
+                try:
+                    results[name] = store_capture(key, master, quality, **rendition)
+                except Exception as e:
+                    results[name] = capture_error(e)
+        return results
+    finally:
+        release_host_slot(slot)
+        if inflight_key:
+            release_inflight(inflight_key, self.request.id)
+
+@celery_app.task(bind=True, name='main.capture_batch_task')
+def capture_batch_task(self, batch_id: str, items: List[List], options: dict) -> dict:
+    """
+    Tarefa Celery que captura uma parte de um lote no navegador compartilhado.
+    
+    Todas as URLs da parte são agendadas de uma vez e renderizadas em paralelo
+    pelo motor. A falha de um item é registrada nele e não afeta os demais.
+    Itens de hosts no limite são reenviados em uma nova tarefa com atraso,
+    sem segurar os demais.
+    
+    Args:
+        batch_id: ID do lote
+        items: Pares [índice, url] desta parte do lote
+        options: Parâmetros de captura comuns ao lote
+        
+    Returns:
+        dict: Quantidade de itens concluídos, com falha e adiados nesta parte
+    """
+    quality = options["quality"]
+    rendition = {
+        "fmt": options["format"],
+        "width": options["width"],
+        "height": options["height"],
+        "fit": options["fit"],
+    }
+    render_options = {
+        name: options[name] for name in (
+            "view", "full_page", "wait_time", "wait_until",
+            "wait_for_images_flag", "scroll_page_flag"
+        )
+    }
+    render_options["block"] = resolve_block_policy(
+        options["block_profile"], options["block_resources"]
+    ).token
+    
+    pending = []
+    deferred = []
+    delay = None
+    completed = failed = 0
+    for index, url in items:
+        key = render_key(url, **render_options)
+        if not options.get("no_cache"):
+            cached = get_cached_variant(key, quality, **rendition)
+            if cached is not None:
+                batch_store.set_item(batch_id, index, ITEM_COMPLETED, name=cached)
+                completed += 1
+                continue
+        try:
+            slot = acquire_host_slot(url)
+        except HostThrottled as e:
+            if self.request.retries < HOST_MAX_DEFERRALS:
+                deferred.append([index, url])
+                delay = e.delay if delay is None else min(delay, e.delay)
+            else:
+                batch_store.set_item(batch_id, index, ITEM_FAILED, error=capture_error(e))
+                failed += 1
+            continue
+        try:
+            future = submit_capture(url, **render_options)
+        except Exception as e:
+            release_host_slot(slot)
+            batch_store.set_item(batch_id, index, ITEM_FAILED, error=capture_error(e))
+            failed += 1
+            continue
+        pending.append((index, key, future, slot))
+    
+    for index, key, future, slot in pending:
+        try:
+            name = store_capture(key, future.result(), quality, **rendition)
+            batch_store.set_item(batch_id, index, ITEM_COMPLETED, name=name)
+            completed += 1
+        except Exception as e:
+            batch_store.set_item(batch_id, index, ITEM_FAILED, error=capture_error(e))
+            failed += 1
+        finally:
+            release_host_slot(slot)
+    
+    if deferred:
+        # Reenvia só os itens adiados, na mesma fila e prioridade da parte,
+        # depois de finalizar os já agendados
+        try:
+            self.retry(
+                args=(batch_id, deferred, options),
+                countdown=delay,
+                max_retries=HOST_MAX_DEFERRALS,
+                throw=False
+            )
+        except MaxRetriesExceededError as e:
+            for index, _ in deferred:
+                batch_store.set_item(batch_id, index, ITEM_FAILED, error=capture_error(e))
+            failed += len(deferred)
+            deferred = []
+    
+    return {"completed": completed, "failed": failed, "deferred": len(deferred)}
+
+def validate_url(url: str) -> None:
+    """
+    Valida se a URL fornecida é válida.
+    
+    Args:
+        url: URL a ser validada
+        
+    Raises:
+        HTTPException: Se a URL for inválida
+    """
+    if not url.startswith(("http://", "https://")):
+        raise HTTPException(status_code=400, detail="URL inválida. Deve começar com http:// ou https://")
+
+def validate_view(view: str) -> str:
+    """
+    Valida se o tipo de visualização é suportado.
+    
+    Args:
+        view: ``desktop``, ``mobile`` ou ``custom:LARGURAxALTURA[@ESCALAx]``
+        
+    Returns:
+        str: Nome canônico da visualização, usado na chave de cache
+        
+    Raises:
+        HTTPException: Se o tipo de visualização não for suportado
+    """
+    try:
+        return parse_view(view)[0]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def validate_rendition(fmt: str, width: Optional[int], height: Optional[int]) -> None:
+    """
+    Valida o formato e as dimensões da imagem de saída.
+    
+    Raises:
+        HTTPException: Se o formato não estiver disponível ou as dimensões
+            estiverem fora do limite
+    """
+    if not is_format_supported(fmt):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Formato '{fmt}' não disponível neste servidor"
+        )
+    for name, value in (("width", width), ("height", height)):
+        if value is not None and not 1 <= value <= IMAGE_MAX_DIMENSION:
+            raise HTTPException(
+                status_code=400,
+                detail=f"{name} deve estar entre 1 e {IMAGE_MAX_DIMENSION}"
+            )
+
+def admit(queue: str, priority: str, tasks: int = 1) -> None:
+    """
+    Aplica o controle de admissão antes de enfileirar capturas.
+    
+    Raises:
+        HTTPException: 429 se a espera estimada for longa demais, 503 se a
+            fila estiver cheia; ambos com Retry-After
+    """
+    rejection = admission.check(queue, PRIORITIES[priority], tasks)
+    if rejection is not None:
+        raise HTTPException(
+            status_code=rejection.status_code,
+            detail=rejection.detail,
+            headers={"Retry-After": str(rejection.retry_after)}
+        )
+
+def enqueue_task(task, task_kwargs: dict, queue: str, priority: str) -> Tuple[str, bool]:
+    """
+    Enfileira a tarefa, a não ser que outra já renderize os mesmos parâmetros.
+    
+    Reserva a renderização (``task_kwargs["inflight_key"]``), aplica o
+    controle de admissão e publica no broker, liberando a reserva se algo
+    falhar. Todas as etapas fazem E/S síncrona; a API chama pelo ``io_pool``.
+    
+    Returns:
+        Tuple[str, bool]: ID da tarefa e se ela foi criada agora (False
+        quando reaproveita a que já estava em andamento)
+    
+    Raises:
+        HTTPException: Se o controle de admissão recusar
+    """
+    inflight_key = task_kwargs["inflight_key"]
+    task_id = str(uuid.uuid4())
+    existing_task_id = claim_inflight(inflight_key, task_id)
+    if existing_task_id:
+        return existing_task_id, False
+    try:
+        # Recusa com 429/503 em vez de enfileirar trabalho que não será usado
+        admit(queue, priority)
+        task.apply_async(
+            kwargs=task_kwargs,
+            task_id=task_id,
+            queue=queue,
+            priority=PRIORITIES[priority]
+        )
+    except Exception:
+        release_inflight(inflight_key, task_id)
+        raise
+    return task_id, True
+
+def validate_freshness(max_age: int, stale_ttl: int) -> None:
+    """
+    Valida os limites de idade da imagem em cache pedidos na requisição.
+    
+    Raises:
+        HTTPException: Se ``max_age`` for negativo ou ``stale_ttl`` estiver
+            fora de 0 a ``CACHE_STALE_TTL``
+    """
+    if max_age < 0:
+        raise HTTPException(status_code=400, detail="max_age não pode ser negativo")
+    if not 0 <= stale_ttl <= CACHE_STALE_TTL:
+        raise HTTPException(
+            status_code=400,
+            detail=f"stale_ttl deve estar entre 0 e {CACHE_STALE_TTL}"
+        )
+
+def validate_since(since: Optional[str]) -> None:
+    """
+    Valida o hash perceptual informado em ``since``.
+    
+    Raises:
+        HTTPException: Se não tiver 16 dígitos hexadecimais
+    """
+    if since is not None and not re.fullmatch(r"[0-9a-fA-F]{16}", since):
+        raise HTTPException(
+            status_code=400,
+            detail="since deve ser um hash perceptual de 16 dígitos hexadecimais"
+        )
+
+def schedule_refresh(queue: str, task_kwargs: dict) -> Optional[str]:
+    """
+    Agenda em segundo plano a renovação de uma imagem servida vencida.
+    
+    Usa a reserva de renderização em andamento, então requisições simultâneas
+    pela mesma imagem geram uma única tarefa. A renovação entra com
+    prioridade baixa e é descartada se o controle de admissão recusar.
+    
+    Returns:
+        Optional[str]: ID da tarefa criada, ou None se já havia uma ou se
+        a renovação não foi enfileirada
+    """
+    inflight_key = task_kwargs["inflight_key"]
+    task_id = str(uuid.uuid4())
+    if claim_inflight(inflight_key, task_id):
+        return None
+    try:
+        if admission.check(queue, PRIORITIES["low"]) is not None:
+            release_inflight(inflight_key, task_id)
+            return None
+        capture_screenshot_task.apply_async(
+            kwargs=task_kwargs,
+            task_id=task_id,
+            queue=queue,
+            priority=PRIORITIES["low"]
+        )
+    except Exception as e:
+        release_inflight(inflight_key, task_id)
+        logger.warning(f"Erro ao agendar a renovação de {task_kwargs['url']}: {e}")
+        return None
+    return task_id
+
+def capture_task_kwargs(
+    url: str,
+    view: str,
+    full_page: bool,
+    wait_time: int,
+    quality: int,
+    wait_until: str,
+    wait_for_images_flag: bool,
+    scroll_page_flag: bool,
+    block: str,
+    rendition: dict,
+    no_cache: bool = False
+) -> dict:
+    """Argumentos de ``capture_screenshot_task``, com a reserva da renderização."""
+    key = render_key(
+        url, view, full_page, wait_time, wait_until,
+        wait_for_images_flag, scroll_page_flag, block
+    )
+    return {
+        "url": url,
+        "view": view,
+        "full_page": full_page,
+        "wait_time": wait_time,
+        "quality": quality,
+        "wait_until": wait_until,
+        "wait_for_images_flag": wait_for_images_flag,
+        "scroll_page_flag": scroll_page_flag,
+        "no_cache": no_cache,
+        "inflight_key": get_inflight_key(key, quality, **rendition),
+        "block": block,
+        **rendition
+    }
+
+def record_access(name: str, task_kwargs: dict) -> None:
+    """Registra o acesso a uma imagem com os parâmetros para recapturá-la."""
+    try:
+        popularity.record(name, {**task_kwargs, "no_cache": False})
+    except RedisError as e:
+        logger.warning(f"Erro ao registrar o acesso a {name}: {e}")
+
+def get_block_token(profile: str, extra_types: List[str]) -> str:
+    """
+    Valida o perfil e os tipos de recurso bloqueados e retorna o token da política.
+    
+    Raises:
+        HTTPException: Se o perfil ou algum tipo de recurso for inválido
+    """
     try:
-        import asyncio
-        from playwright.sync_api import sync_playwright
-        import time
-        
-        cache_path = get_cache_path(url, view, full_page)
-        
-        # Se no_cache for True, remove o arquivo de cache se existir
-        if no_cache and os.path.exists(cache_path):
-            os.remove(cache_path)
-        
-        # Usa a versão síncrona do Playwright para a tarefa Celery
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=True)
-            context = browser.new_context(viewport=VIEWPORT_CONFIGS[view])
-            page = context.new_page()
-            
-            try:
-                # Navega para a URL
-                response = page.goto(url, wait_until=wait_until)
-                if not response:
-                    raise Exception("Falha ao carregar a página")
-                
-                # Espera o tempo adicional se especificado
-                if wait_time > 0:
-                    page.wait_for_timeout(wait_time)
-                
-                # Rola a página se solicitado
-                if scroll_page_flag:
-                    total_height = page.evaluate("document.body.scrollHeight")
-                    viewport_height = page.evaluate("window.innerHeight")
-                    current_position = 0
-                    while current_position < total_height:
-                        page.evaluate(f"window.scrollTo(0, {current_position})")
-                        page.wait_for_timeout(500)
-                        current_position += viewport_height
-                    page.evaluate("window.scrollTo(0, 0)")
-                    page.wait_for_timeout(1000)
-                
-                # Espera imagens carregarem se solicitado
-                if wait_for_images_flag:
-                    # Espera por todas as imagens visíveis
-                    page.evaluate("""() => {
-                        return Promise.all(
-                            Array.from(document.images)
-                                .filter(img => !img.complete)
-                                .map(img => new Promise(resolve => {
-                                    img.onload = img.onerror = resolve;
-                                }))
-                        );
-                    }""")
-                    
-                    # Força carregamento de imagens lazy
-                    page.evaluate("""() => {
-                        const images = document.querySelectorAll('img[loading="lazy"]');
-                        images.forEach(img => {
-                            if (img.dataset.src) {
-                                img.src = img.dataset.src;
-                            }
-                            if (img.dataset.srcset) {
-                                img.srcset = img.dataset.srcset;
-                            }
-                        });
-                    }""")
-                    
-                    # Espera um pouco mais para garantir que as imagens carregaram
-                    page.wait_for_timeout(1000)
-                
-                # Captura o screenshot
-                screenshot_bytes = page.screenshot(
-                    type="jpeg",
-                    quality=quality,
-                    full_page=full_page
-                )
-                
-                # Salva o screenshot no cache
-                with open(cache_path, 'wb') as f:
-                    f.write(screenshot_bytes)
-                
-                return cache_path
-                
-            finally:
-                # Garante que o navegador seja fechado mesmo em caso de erro
-                try:
-                    page.close()
-                    context.close()
-                    browser.close()
-                except Exception as e:
-                    print(f"Erro ao fechar o navegador: {e}")
-            
-    except Exception as e:
-        return f"Erro ao capturar screenshot: {str(e)}"
+        return resolve_block_policy(profile, extra_types).token
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-def validate_url(url: str) -> None:
+async def wait_for_images(page, budget: CaptureBudget) -> None:
     """
-    Valida se a URL fornecida é válida.
+    Espera as imagens da página carregarem, forçando as lazy.
+    
+    Cada imagem espera no máximo READINESS_IMAGE_TIMEOUT e o total não passa
+    do orçamento restante da captura.
     
     Args:
-        url: URL a ser validada
-        
-    Raises:
-        HTTPException: Se a URL for inválida
+        page: Página do Playwright
+        budget: Orçamento de tempo da captura
     """
-    if not url.startswith(("http://", "https://")):
-        raise HTTPException(status_code=400, detail="URL inválida. Deve começar com http:// ou https://")
+    timeout = min(READINESS_IMAGE_TIMEOUT, budget.remaining())
+    pending = await readiness.wait_for_images(page, timeout)
+    if pending:
+        logger.info(f"Captura seguiu com {pending} imagem(ns) sem carregar")
 
-def validate_view(view: str) -> None:
+async def perform_page_scroll(page, budget: CaptureBudget, network: NetworkMonitor) -> None:
     """
-    Valida se o tipo de visualização é suportado.
+    Rola a página para carregar conteúdo lazy.
+    
+    Cada passo avança assim que as imagens expostas carregam ou a rede fica
+    quieta, em vez de esperar um tempo fixo.
+    
+    Args:
+        page: Página do Playwright
+        budget: Orçamento de tempo da captura
+        network: Monitor das requisições da página
+    """
+    result = await readiness.scroll_until_ready(
+        page,
+        budget,
+        network,
+        step_timeout=READINESS_STEP_TIMEOUT,
+        max_height=READINESS_MAX_HEIGHT
+    )
+    budget.timings["scroll_steps"] = result["steps"]
+    if result["infinite_scroll"]:
+        budget.timings["infinite_scroll"] = True
+
+# Largura e altura do documento e densidade de pixels da tela
+PAGE_GEOMETRY_SCRIPT = """() => {
+    const root = document.documentElement;
+    const body = document.body || root;
+    return [
+        Math.max(root.scrollWidth, body.scrollWidth, window.innerWidth),
+        Math.max(root.scrollHeight, body.scrollHeight, window.innerHeight),
+        window.devicePixelRatio || 1
+    ];
+}"""
+
+async def capture_full_page(page, budget: CaptureBudget) -> bytes:
+    """
+    Captura a página inteira em faixas da altura do viewport.
+    
+    O Chromium desenha uma faixa por vez (``clip`` sobre a página inteira) e
+    cada uma é acrescentada ao ``PNGStreamWriter`` e descartada, então o pico
+    de memória não cresce com a altura da página. Acima de
+    ``FULLPAGE_MAX_HEIGHT`` pixels ou ``FULLPAGE_MAX_TILES`` faixas a imagem
+    é cortada em vez de falhar; o PNG cortado traz a altura original no
+    bloco de texto ``Truncated``.
     
     Args:
-        view: Tipo de visualização a ser validado
+        page: Página do Playwright
+        budget: Orçamento da captura, onde ficam o número de faixas e o corte
         
-    Raises:
-        HTTPException: Se o tipo de visualização não for suportado
+    Returns:
+        bytes: Captura mestre em PNG
     """
-    if view not in VIEWPORT_CONFIGS:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Tipo de visualização inválido. Use 'desktop' ou 'mobile'"
+    width, page_height, scale = await page.evaluate(PAGE_GEOMETRY_SCRIPT)
+    tile_height = page.viewport_size["height"]
+    height = page_height
+    if FULLPAGE_MAX_HEIGHT > 0:
+        height = min(height, FULLPAGE_MAX_HEIGHT)
+    if FULLPAGE_MAX_TILES > 0:
+        height = min(height, FULLPAGE_MAX_TILES * tile_height)
+    truncated = height < page_height
+    
+    if height <= tile_height and not truncated:
+        # Cabe em uma faixa: o screenshot direto já é o resultado
+        return await page.screenshot(type="png", full_page=True)
+    
+    writer = PNGStreamWriter(round(width * scale), round(height * scale))
+    tiles = 0
+    for top in range(0, height, tile_height):
+        tile = await page.screenshot(
+            type="png",
+            full_page=True,
+            clip={"x": 0, "y": top, "width": width, "height": min(tile_height, height - top)}
         )
+        # A decodificação roda fora do event loop, que atende outras páginas
+        await asyncio.to_thread(writer.add_tile, tile)
+        tiles += 1
+    budget.timings["tiles"] = tiles
+    
+    text = None
+    if truncated:
+        budget.timings["truncated"] = True
+        metrics.TRUNCATED_CAPTURES.inc()
+        logger.warning(f"Captura cortada em {height}px de {page_height}px")
+        text = {"Truncated": str(page_height)}
+    return await asyncio.to_thread(writer.close, text)
 
-async def wait_for_images(page) -> None:
+async def handle_route(route, policy: BlockPolicy) -> None:
     """
-    Espera todas as imagens da página carregarem.
+    Intercepta uma requisição da página durante a captura.
+    
+    Aborta o que a política bloqueia e serve CSS, JS, fontes e imagens do
+    cache de subrecursos do worker, guardando as respostas que a origem
+    permite reutilizar.
     
     Args:
-        page: Página do Playwright
+        route: Rota do Playwright da requisição interceptada
+        policy: Política de bloqueio da captura
     """
-    # Espera por todas as imagens visíveis
-    await page.evaluate("""() => {
-        return Promise.all(
-            Array.from(document.images)
-                .filter(img => !img.complete)
-                .map(img => new Promise(resolve => {
-                    img.onload = img.onerror = resolve;
-                }))
-        );
-    }""")
-    
-    # Força o carregamento de imagens lazy
-    await page.evaluate("""() => {
-        const images = document.querySelectorAll('img[loading="lazy"]');
-        images.forEach(img => {
-            if (img.dataset.src) {
-                img.src = img.dataset.src;
-            }
-            if (img.dataset.srcset) {
-                img.srcset = img.dataset.srcset;
-            }
-        });
-    }""")
-    
-    # Espera novamente após forçar o carregamento
-    await page.evaluate("""() => {
-        return Promise.all(
-            Array.from(document.images)
-                .filter(img => !img.complete)
-                .map(img => new Promise(resolve => {
-                    img.onload = img.onerror = resolve;
-                }))
-        );
-    }""")
-
-async def perform_page_scroll(page) -> None:
+    request = route.request
+    is_main_document = request.is_navigation_request() and request.frame.parent_frame is None
+    if not is_main_document and policy.blocks(request.resource_type, request.url):
+        await route.abort("blockedbyclient")
+        return
+    
+    cacheable = (
+        SUBRESOURCE_CACHE_MAX_SIZE > 0
+        and request.method == "GET"
+        and request.resource_type in CACHEABLE_RESOURCE_TYPES
+        and "authorization" not in request.headers
+    )
+    if not cacheable:
+        await route.continue_()
+        return
+    
+    cached = await asyncio.to_thread(subresource_cache.get, request.url)
+    if cached is not None:
+        await route.fulfill(
+            status=cached["status"],
+            headers=cached["headers"],
+            body=cached["body"]
+        )
+        return
+    
+    try:
+        response = await route.fetch()
+        body = await response.body()
+    except Exception as e:
+        logger.debug(f"Erro ao buscar subrecurso {request.url}: {e}")
+        await route.abort("failed")
+        return
+    await route.fulfill(response=response, body=body)
+    await asyncio.to_thread(
+        subresource_cache.put, request.url, response.status, response.headers, body
+    )
+
+async def prepare_page(
+    page,
+    url: str,
+    wait_time: int = 0,
+    wait_until: str = "networkidle",
+    wait_for_images_flag: bool = True,
+    scroll_page_flag: bool = True,
+    block: str = "",
+    submitted_at: Optional[float] = None
+) -> CaptureBudget:
     """
-    Rola a página para carregar conteúdo lazy.
+    Navega até a URL e espera a página ficar pronta para a captura.
+    
+    O scroll e a espera por imagens compartilham o orçamento READINESS_BUDGET.
     
     Args:
         page: Página do Playwright
+        url: URL do site a ser capturado
+        wait_time: Tempo de espera em milissegundos após o carregamento da página
+        wait_until: Quando considerar a página carregada
+        wait_for_images_flag: Se True, espera todas as imagens carregarem
+        scroll_page_flag: Se True, rola a página para carregar conteúdo lazy
+        block: Token da política de bloqueio de requisições
+        submitted_at: ``time.monotonic()`` do agendamento, para medir a espera
+            por vaga e a abertura da página (fase ``browser``)
+        
+    Returns:
+        CaptureBudget: Orçamento restante, com os tempos de cada fase
+    """
+    browser_seconds = None if submitted_at is None else time.monotonic() - submitted_at
+    # Bloqueia recursos pela política e usa o cache de subrecursos do worker
+    policy = BlockPolicy.from_token(block, TRACKER_DOMAINS)
+    if policy or SUBRESOURCE_CACHE_MAX_SIZE > 0:
+        async def route_handler(route) -> None:
+            await handle_route(route, policy)
+        await page.route("**/*", route_handler)
+    
+    # Acompanha a rede desde a navegação para saber quando ela fica quieta
+    network = NetworkMonitor(page)
+    
+    # Navega para a URL e espera o carregamento
+    started = time.monotonic()
+    response = await page.goto(url, wait_until=wait_until)
+    if not response:
+        raise Exception("Falha ao carregar a página")
+    # O orçamento de prontidão começa a contar depois da navegação
+    budget = CaptureBudget(READINESS_BUDGET)
+    if browser_seconds is not None:
+        budget.timings["browser"] = round(browser_seconds, 3)
+    budget.timings["navigation"] = round(time.monotonic() - started, 3)
+    
+    # Espera o tempo adicional se especificado
+    if wait_time > 0:
+        async with budget.phase("wait_time"):
+            await page.wait_for_timeout(wait_time)
+    
+    # Rola a página se solicitado
+    if scroll_page_flag:
+        async with budget.phase("scroll"):
+            await perform_page_scroll(page, budget, network)
+    
+    # Espera imagens carregarem se solicitado
+    if wait_for_images_flag:
+        async with budget.phase("images"):
+            await wait_for_images(page, budget)
+    return budget
+
+async def take_screenshot(page, full_page: bool, budget: CaptureBudget) -> bytes:
+    """Captura o screenshot sem perdas (PNG); as variantes derivam dele."""
+    async with budget.phase("screenshot"):
+        if full_page and FULLPAGE_TILED:
+            return await capture_full_page(page, budget)
+        return await page.screenshot(
+            type="png",
+            full_page=full_page
+        )
+
+async def render_page(
+    page,
+    url: str,
+    full_page: bool = False,
+    wait_time: int = 0,
+    wait_until: str = "networkidle",
+    wait_for_images_flag: bool = True,
+    scroll_page_flag: bool = True,
+    block: str = "",
+    submitted_at: Optional[float] = None
+) -> bytes:
+    """
+    Pipeline de captura executado em uma página já aberta.
+    
+    Os tempos de cada fase são registrados no log e nas métricas ao final.
+    Os parâmetros são os de ``prepare_page``, mais ``full_page`` (se True,
+    captura a página inteira incluindo área de rolagem).
+        
+    Returns:
+        bytes: Captura mestre em formato PNG (sem perdas)
+    """
+    budget = await prepare_page(
+        page, url, wait_time, wait_until, wait_for_images_flag,
+        scroll_page_flag, block, submitted_at
+    )
+    master = await take_screenshot(page, full_page, budget)
+    logger.info(f"Tempos da captura de {url}: {budget.timings}")
+    metrics.observe_phases(budget.timings)
+    return master
+
+async def render_views(
+    page,
+    url: str,
+    viewports: List[Viewport],
+    full_page: bool = False,
+    wait_time: int = 0,
+    wait_until: str = "networkidle",
+    wait_for_images_flag: bool = True,
+    scroll_page_flag: bool = True,
+    block: str = "",
+    submitted_at: Optional[float] = None
+) -> List[bytes]:
     """
-    # Obtém a altura total da página
-    total_height = await page.evaluate("document.body.scrollHeight")
-    viewport_height = await page.evaluate("window.innerHeight")
+    Captura a página em vários viewports com uma única navegação.
     
-    # Rola a página em incrementos menores
-    current_position = 0
-    while current_position < total_height:
-        # Rola para a próxima posição
-        await page.evaluate(f"window.scrollTo(0, {current_position})")
-        # Espera um pouco para o conteúdo carregar
-        await page.wait_for_timeout(500)
-        # Atualiza a posição
-        current_position += viewport_height
+    A página é aberta no primeiro viewport (o do contexto) e depois só a
+    janela é redimensionada; o navegador refaz o layout apenas onde o CSS
+    responsivo muda, e a espera por imagens cobre as que passaram a
+    aparecer. Todos os viewports devem ter a densidade de pixels do
+    contexto (``viewports.group_by_scale``).
     
-    # Rola de volta para o topo
-    await page.evaluate("window.scrollTo(0, 0)")
-    await page.wait_for_timeout(1000)
+    Returns:
+        List[bytes]: Captura mestre (PNG) de cada viewport, na mesma ordem
+    """
+    budget = await prepare_page(
+        page, url, wait_time, wait_until, wait_for_images_flag,
+        scroll_page_flag, block, submitted_at
+    )
+    masters = []
+    for index, viewport in enumerate(viewports):
+        if index:
+            async with budget.phase("resize"):
+                await page.set_viewport_size({"width": viewport.width, "height": viewport.height})
+                if wait_for_images_flag:
+                    await wait_for_images(page, budget)
+        masters.append(await take_screenshot(page, full_page, budget))
+    logger.info(f"Tempos da captura de {url} em {len(viewports)} viewports: {budget.timings}")
+    metrics.observe_phases(budget.timings)
+    return masters
+
+class FastPathUnavailable(Exception):
+    """A captura síncrona não pôde ser feita; a requisição segue pela fila."""
 
 async def capture_screenshot(
     url: str,
-    view: Literal["desktop", "mobile"],
+    view: str,
     full_page: bool = False,
     wait_time: int = 0,
-    quality: int = 80,
-    wait_until: Literal["load", "domcontentloaded", "networkidle"] = "networkidle",
+    wait_until: str = "networkidle",
     wait_for_images_flag: bool = True,
-    scroll_page_flag: bool = True
+    scroll_page_flag: bool = True,
+    block: str = ""
 ) -> bytes:
     """
-    Captura um screenshot da URL fornecida usando o Playwright.
+    Captura a URL no navegador da própria API (modo ``sync=true``).
+    
+    Não espera vaga: com ``SYNC_MAX_CONCURRENCY`` capturas em andamento a
+    requisição vai para a fila. A captura inteira, incluindo a espera por
+    memória, precisa terminar em ``SYNC_DEADLINE`` segundos.
     
     Args:
         url: URL do site a ser capturado
         view: Tipo de visualização (desktop ou mobile)
         full_page: Se True, captura a página inteira incluindo área de rolagem
         wait_time: Tempo de espera em milissegundos após o carregamento da página
-        quality: Qualidade do JPEG (1-100)
         wait_until: Quando considerar a página carregada
         wait_for_images_flag: Se True, espera todas as imagens carregarem
         scroll_page_flag: Se True, rola a página para carregar conteúdo lazy
+        block: Token da política de bloqueio de requisições
         
     Returns:
-        bytes: Imagem do screenshot em formato JPEG
+        bytes: Captura mestre em formato PNG
         
     Raises:
-        HTTPException: Se houver erro ao capturar o screenshot
+        FastPathUnavailable: Se o navegador da API estiver desativado ou
+            ocupado, se o host estiver no limite, se o prazo acabar ou se a
+            captura falhar
     """
-    try:
-        async with async_playwright() as p:
-            # Inicializa o navegador em modo headless
-            browser = await p.chromium.launch(headless=True)
-            context = await browser.new_context(viewport=VIEWPORT_CONFIGS[view])
-            page = await context.new_page()
-            
-            # Navega para a URL e espera o carregamento
-            await page.goto(url, wait_until=wait_until)
-            
-            # Espera o tempo adicional se especificado
-            if wait_time > 0:
-                await page.wait_for_timeout(wait_time)
-            
-            # Rola a página se solicitado
-            if scroll_page_flag:
-                await perform_page_scroll(page)
-            
-            # Espera imagens carregarem se solicitado
-            if wait_for_images_flag:
-                await wait_for_images(page)
-            
-            # Captura o screenshot
-            screenshot_bytes = await page.screenshot(
-                type="jpeg",
-                quality=quality,
-                full_page=full_page
+    engine = await get_api_render_engine()
+    if engine is None:
+        raise FastPathUnavailable("navegador da API desativado")
+    if sync_semaphore.locked():
+        raise FastPathUnavailable("navegador da API ocupado")
+    async with sync_semaphore:
+        # A vaga do host usa o Redis síncrono, então é reservada fora do loop
+        try:
+            slot = await run_io(acquire_host_slot, url)
+        except HostThrottled as e:
+            raise FastPathUnavailable(str(e)) from e
+        try:
+            return await asyncio.wait_for(
+                engine.render(
+                    render_page,
+                    context_options=parse_view(view)[1].context_options(),
+                    submitted_at=time.monotonic(),
+                    url=url,
+                    full_page=full_page,
+                    wait_time=wait_time,
+                    wait_until=wait_until,
+                    wait_for_images_flag=wait_for_images_flag,
+                    scroll_page_flag=scroll_page_flag,
+                    block=block
+                ),
+                SYNC_DEADLINE
             )
-            
-            # Fecha o navegador
-            await browser.close()
-            
-            return screenshot_bytes
-            
+        except asyncio.TimeoutError as e:
+            raise FastPathUnavailable(f"prazo de {SYNC_DEADLINE}s excedido") from e
+        except Exception as e:
+            raise FastPathUnavailable(str(e)) from e
+        finally:
+            await run_io(release_host_slot, slot)
+
+async def start_api_render_engine() -> None:
+    """Lança o navegador da API usado pelo modo ``sync=true``."""
+    global api_render_engine, _api_engine_retry_at
+    if SYNC_MAX_CONCURRENCY <= 0:
+        return
+    engine = RenderEngine(
+        max_pages=SYNC_MAX_CONCURRENCY,
+        memory_limit=RENDER_MEMORY_LIMIT,
+        max_contexts=BROWSER_MAX_CONTEXTS,
+        max_age=BROWSER_MAX_AGE
+    )
+    try:
+        await engine.start()
     except Exception as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Erro ao capturar screenshot: {str(e)}"
-        )
+        # Sem navegador, as requisições síncronas seguem pela fila
+        logger.error(f"Erro ao iniciar o navegador da API: {e}")
+        _api_engine_retry_at = time.monotonic() + API_ENGINE_RETRY_INTERVAL
+        return
+    api_render_engine = engine
+
+async def get_api_render_engine() -> Optional[RenderEngine]:
+    """
+    Retorna o navegador da API, lançando-o na primeira chamada.
+    
+    Returns:
+        Optional[RenderEngine]: None se o modo síncrono estiver desativado ou
+        se o lançamento falhou há menos de ``API_ENGINE_RETRY_INTERVAL`` segundos
+    """
+    global _api_engine_lock
+    if api_render_engine is not None or SYNC_MAX_CONCURRENCY <= 0:
+        return api_render_engine
+    if time.monotonic() < _api_engine_retry_at:
+        return None
+    if _api_engine_lock is None:
+        _api_engine_lock = asyncio.Lock()
+    async with _api_engine_lock:
+        if api_render_engine is None and time.monotonic() >= _api_engine_retry_at:
+            await start_api_render_engine()
+    return api_render_engine
+
+async def stop_api_render_engine() -> None:
+    """Fecha o navegador da API."""
+    global api_render_engine
+    if api_render_engine is not None:
+        await api_render_engine.stop()
+        api_render_engine = None
 
 @app.get("/screenshot")
 async def get_screenshot(
-    background_tasks: BackgroundTasks,
+    request: Request,
     url: str,
-    view: Literal["desktop", "mobile"] = "desktop",
+    view: str = "desktop",
     full_page: bool = False,
     wait_time: Optional[int] = 0,
     quality: Optional[int] = 80,
     wait_until: Literal["load", "domcontentloaded", "networkidle"] = "networkidle",
     wait_for_images_flag: bool = True,
     scroll_page_flag: bool = True,
-    no_cache: bool = False
+    no_cache: bool = False,
+    block_profile: str = BLOCK_PROFILE,
+    block_resources: Optional[str] = None,
+    format: Literal["jpeg", "webp", "avif", "png"] = "jpeg",
+    width: Optional[int] = None,
+    height: Optional[int] = None,
+    fit: Literal["contain", "cover", "fill"] = "contain",
+    sync: bool = False,
+    priority: Literal["low", "normal", "high"] = "normal",
+    max_age: int = CACHE_EXPIRY,
+    stale_ttl: int = CACHE_STALE_TTL,
+    views: Optional[str] = None,
+    since: Optional[str] = None
 ) -> Response:
-    """Endpoint para capturar screenshot de uma URL."""
+    """
+    Endpoint para capturar screenshot de uma URL.
+    
+    Com ``sync=true`` a captura é feita no navegador da API e a imagem volta
+    na resposta; se ele estiver ocupado ou o prazo acabar, a requisição segue
+    pela fila e a resposta traz o ``task_id`` como no modo normal.
+    
+    Imagens em cache com mais de ``max_age`` segundos ainda são servidas por
+    até ``stale_ttl`` segundos (``X-Cache: STALE``), enquanto uma única
+    tarefa em segundo plano renova a captura.
+    
+    Com ``views`` (ex.: ``desktop,mobile,custom:1440x900@2x``) a página é
+    carregada uma vez por densidade de pixels e capturada em cada viewport;
+    a resposta é JSON com a situação de cada visualização (ver
+    ``enqueue_views``).
+    
+    Toda imagem traz o hash perceptual em ``X-Perceptual-Hash``; com
+    ``since`` igual a um hash anterior, a resposta é 304 sem corpo se a
+    página não mudou visualmente desde ele.
+    """
     # Valida os parâmetros
     validate_url(url)
-    validate_view(view)
+    view = validate_view(view)
+    validate_rendition(format, width, height)
+    block = get_block_token(block_profile, (block_resources or "").split(","))
+    rendition = {"fmt": format, "width": width, "height": height, "fit": fit}
     
     # Valida a qualidade
     if not 1 <= quality <= 100:
@@ -385,55 +1765,263 @@ async def get_screenshot(
             detail="Tempo de espera não pode ser negativo"
         )
     
+    validate_freshness(max_age, stale_ttl)
+    validate_since(since)
+    
+    if views is not None:
+        return await enqueue_views(
+            url, views, full_page, wait_time, quality, wait_until,
+            wait_for_images_flag, scroll_page_flag, no_cache, block,
+            rendition, priority, max_age
+        )
+    
+    key = render_key(
+        url, view, full_page, wait_time, wait_until,
+        wait_for_images_flag, scroll_page_flag, block
+    )
+    
+    task_kwargs = capture_task_kwargs(
+        url, view, full_page, wait_time, quality, wait_until,
+        wait_for_images_flag, scroll_page_flag, block, rendition, no_cache
+    )
+    inflight_key = task_kwargs["inflight_key"]
+    queue = cost_queue(full_page, scroll_page_flag)
+    
+    # Conta o acesso para o aquecimento do cache sem atrasar a resposta
+    asyncio.get_running_loop().run_in_executor(
+        io_pool, record_access, variant_name(key, quality, **rendition), task_kwargs
+    )
+    
     # Verifica cache apenas se no_cache for False
-    if not no_cache:
-        cache_path = get_cache_path(url, view, full_page)
-        if os.path.exists(cache_path):
-            if time.time() - os.path.getmtime(cache_path) < CACHE_EXPIRY:
-                async with aiofiles.open(cache_path, 'rb') as f:
-                    return Response(
-                        content=await f.read(),
-                        media_type="image/jpeg"
+    if no_cache:
+        memory_cache.invalidate(key)
+    else:
+        # Imagens populares saem da memória; vencidas seguem para o disco,
+        # onde pode já haver uma versão renovada
+        image = memory_cache.get(variant_name(key, quality, **rendition))
+        if image is not None and time.time() - image.mtime < max_age:
+            metrics.count_lookup("memory")
+            return serve_memory_image(request, image, max_age, since)
+        
+        cached = await run_io(
+            get_cached_variant, key, quality, max_age, stale_ttl, **rendition
+        )
+        if cached is not None:
+            try:
+                response = await serve_cached_file(request, cached, max_age, since=since)
+            except FileNotFoundError:
+                # Removida entre a busca e o envio: segue como se não houvesse cache
+                logger.info(f"{cached} saiu do cache durante a requisição")
+            else:
+                if response.headers["X-Cache"] == "STALE":
+                    # Serve a imagem vencida e renova depois de enviar a resposta
+                    response.background = BackgroundTask(
+                        run_io, schedule_refresh, queue, task_kwargs
+                    )
+                else:
+                    response.background = BackgroundTask(
+                        promote_to_memory, key, cached
                     )
+                return response
     
-    # Agenda limpeza de cache em background
-    background_tasks.add_task(cleanup_old_cache)
-    background_tasks.add_task(check_cache_size)
+    # Captura na própria API se pedido e se ninguém já renderiza o mesmo
+    if sync and not await is_inflight(inflight_key):
+        try:
+            master = await capture_screenshot(
+                url, view, full_page, wait_time, wait_until,
+                wait_for_images_flag, scroll_page_flag, block
+            )
+        except FastPathUnavailable as e:
+            logger.info(f"Captura síncrona indisponível, usando a fila: {e}")
+        else:
+            name = await run_io(store_capture, key, master, quality, **rendition)
+            return await serve_cached_file(request, name, max_age, "MISS", since)
     
-    # Envia tarefa para a fila
-    task = capture_screenshot_task.delay(
-        url=url,
-        view=view,
-        full_page=full_page,
-        wait_time=wait_time,
-        quality=quality,
-        wait_until=wait_until,
-        wait_for_images_flag=wait_for_images_flag,
-        scroll_page_flag=scroll_page_flag,
-        no_cache=no_cache
+    # Reutiliza a tarefa que já renderiza os mesmos parâmetros ou envia uma
+    # nova para a fila
+    task_id, _ = await run_io(
+        enqueue_task, capture_screenshot_task, task_kwargs, queue, priority
     )
-    
     return JSONResponse({
         "status": "processing",
-        "task_id": task.id,
+        "task_id": task_id,
         "message": "Screenshot está sendo processado"
     })
 
+async def enqueue_views(
+    url: str,
+    views: str,
+    full_page: bool,
+    wait_time: int,
+    quality: int,
+    wait_until: str,
+    wait_for_images_flag: bool,
+    scroll_page_flag: bool,
+    no_cache: bool,
+    block: str,
+    rendition: dict,
+    priority: str,
+    max_age: int
+) -> JSONResponse:
+    """
+    Agenda uma única tarefa que captura as visualizações ainda sem cache.
+    
+    Visualizações vencidas são capturadas de novo. A resposta traz, para
+    cada visualização, ``cached`` ou ``processing``; ao fim da tarefa cada
+    uma é servida por ``/screenshot`` com o ``view`` correspondente ou por
+    ``/screenshot/status/{task_id}?view=``.
+    """
+    try:
+        parsed = parse_views(views, VIEWS_MAX)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    statuses = {}
+    missing = []
+    for name, _ in parsed:
+        key = render_key(
+            url, name, full_page, wait_time, wait_until,
+            wait_for_images_flag, scroll_page_flag, block
+        )
+        if no_cache:
+            memory_cache.invalidate(key)
+        elif await run_io(get_cached_variant, key, quality, max_age, 0, **rendition):
+            statuses[name] = "cached"
+            continue
+        statuses[name] = "processing"
+        missing.append(name)
+    if not missing:
+        return JSONResponse({"status": "completed", "views": statuses})
+    
+    # A reserva cobre o conjunto de visualizações que falta capturar
+    inflight_key = get_inflight_key(
+        render_key(
+            url, ",".join(missing), full_page, wait_time, wait_until,
+            wait_for_images_flag, scroll_page_flag, block
+        ),
+        quality,
+        **rendition
+    )
+    views_kwargs = {
+        "url": url,
+        "views": missing,
+        "full_page": full_page,
+        "wait_time": wait_time,
+        "quality": quality,
+        "wait_until": wait_until,
+        "wait_for_images_flag": wait_for_images_flag,
+        "scroll_page_flag": scroll_page_flag,
+        "no_cache": no_cache,
+        "inflight_key": inflight_key,
+        "block": block,
+        **rendition
+    }
+    queue = cost_queue(full_page, scroll_page_flag)
+    task_id, _ = await run_io(enqueue_task, capture_views_task, views_kwargs, queue, priority)
+    return JSONResponse({"status": "processing", "task_id": task_id, "views": statuses})
+
+async def wait_for_task(task_id: str, timeout: float) -> bool:
+    """
+    Aguarda a conclusão da tarefa pelo pub/sub do Redis.
+    
+    Args:
+        task_id: ID da tarefa
+        timeout: Tempo máximo de espera em segundos
+        
+    Returns:
+        bool: True se a tarefa terminou dentro do prazo
+    """
+    pubsub = async_redis_client.pubsub()
+    await pubsub.subscribe(TASK_EVENTS_PREFIX + task_id)
+    try:
+        # Verifica depois de assinar para não perder uma conclusão no intervalo
+        if await run_io(celery_app.AsyncResult(task_id).ready):
+            return True
+        deadline = time.monotonic() + timeout
+        while (remaining := deadline - time.monotonic()) > 0:
+            message = await pubsub.get_message(
+                ignore_subscribe_messages=True,
+                timeout=remaining
+            )
+            # Confere no backend: a mensagem pode ser de uma tentativa anterior
+            if message is not None and await run_io(celery_app.AsyncResult(task_id).ready):
+                return True
+        return False
+    finally:
+        await pubsub.unsubscribe()
+        await pubsub.aclose()
+
+def get_task_error(task) -> Optional[str]:
+    """Retorna a mensagem de erro de uma tarefa concluída, se ela falhou."""
+    if task.failed():
+        return f"Erro ao capturar screenshot: {task.result}"
+    if isinstance(task.result, str) and task.result.startswith("Erro"):
+        return task.result
+    return None
+
 @app.get("/screenshot/status/{task_id}")
-async def get_screenshot_status(task_id: str) -> Response:
-    """Endpoint para verificar o status de uma tarefa."""
+async def get_screenshot_status(
+    request: Request,
+    task_id: str,
+    wait: int = 0,
+    view: Optional[str] = None,
+    since: Optional[str] = None
+) -> Response:
+    """
+    Endpoint para verificar o status de uma tarefa.
+    
+    Com ``wait`` > 0 (long-poll), responde assim que a tarefa terminar ou
+    após ``wait`` segundos, o que ocorrer primeiro. Tarefas de várias
+    visualizações (``views``) servem a imagem indicada em ``view``; sem ele,
+    respondem com a situação de cada visualização. ``since`` funciona como
+    em ``/screenshot``.
+    """
+    if not 0 <= wait <= STATUS_MAX_WAIT:
+        raise HTTPException(
+            status_code=400,
+            detail=f"wait deve estar entre 0 e {STATUS_MAX_WAIT} segundos"
+        )
+    validate_since(since)
+    
+    # O estado vem do backend de resultados por uma chamada síncrona; depois
+    # de pronta, o resultado fica em cache no AsyncResult
     task = celery_app.AsyncResult(task_id)
+    ready = await run_io(task.ready)
+    
+    if not ready and wait > 0:
+        try:
+            await wait_for_task(task_id, wait)
+        except RedisError as e:
+            logger.warning(f"Erro no long-poll da tarefa {task_id}: {e}")
+        ready = await run_io(task.ready)
     
-    if task.ready():
-        if isinstance(task.result, str) and task.result.startswith("Erro"):
-            raise HTTPException(status_code=500, detail=task.result)
+    if ready:
+        error = get_task_error(task)
+        if error:
+            raise HTTPException(status_code=500, detail=error)
+        
+        result = task.result
+        if isinstance(result, dict):
+            if view is None:
+                return JSONResponse({
+                    "status": "completed",
+                    "task_id": task_id,
+                    "views": {
+                        name: {"status": "failed", "detail": value}
+                        if value.startswith("Erro") else {"status": "completed"}
+                        for name, value in result.items()
+                    }
+                })
+            result = result.get(validate_view(view))
+            if result is None:
+                raise HTTPException(status_code=404, detail="Visualização não pertence à tarefa")
+            if result.startswith("Erro"):
+                raise HTTPException(status_code=500, detail=result)
         
         try:
-            async with aiofiles.open(task.result, 'rb') as f:
-                return Response(
-                    content=await f.read(),
-                    media_type="image/jpeg"
-                )
+            return await serve_cached_file(request, result, since=since)
+        except FileNotFoundError:
+            raise HTTPException(status_code=410, detail="Imagem removida do cache")
         except Exception as e:
             raise HTTPException(status_code=500, detail=str(e))
     
@@ -442,16 +2030,268 @@ async def get_screenshot_status(task_id: str) -> Response:
         "task_id": task_id
     })
 
+def format_sse(event: str, data: dict) -> str:
+    """Formata um evento no padrão Server-Sent Events."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.get("/screenshot/events/{task_id}")
+async def stream_screenshot_events(task_id: str) -> StreamingResponse:
+    """
+    Endpoint SSE que avisa quando a tarefa termina.
+    
+    Envia ``processing`` enquanto a tarefa roda (com comentários de keep-alive)
+    e encerra com ``completed`` (com a URL da imagem) ou ``failed``.
+    """
+    async def events():
+        started = time.monotonic()
+        task = celery_app.AsyncResult(task_id)
+        ready = await run_io(task.ready)
+        if not ready:
+            yield format_sse("processing", {"task_id": task_id})
+        while not ready:
+            if time.monotonic() - started >= SSE_MAX_DURATION:
+                yield format_sse("timeout", {"task_id": task_id})
+                return
+            try:
+                done = await wait_for_task(task_id, SSE_KEEPALIVE_INTERVAL)
+            except RedisError as e:
+                yield format_sse("failed", {"task_id": task_id, "detail": str(e)})
+                return
+            if not done:
+                yield ": keep-alive\n\n"
+            ready = await run_io(task.ready)
+        
+        error = get_task_error(task)
+        if error:
+            yield format_sse("failed", {"task_id": task_id, "detail": error})
+        else:
+            yield format_sse("completed", {
+                "task_id": task_id,
+                "url": f"/screenshot/status/{task_id}"
+            })
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+class BatchOptions(BaseModel):
+    """Parâmetros de captura aplicados a todas as URLs de um lote."""
+    view: str = "desktop"
+    full_page: bool = False
+    wait_time: int = Field(0, ge=0)
+    quality: int = Field(80, ge=1, le=100)
+    wait_until: Literal["load", "domcontentloaded", "networkidle"] = "networkidle"
+    wait_for_images_flag: bool = True
+    scroll_page_flag: bool = True
+    no_cache: bool = False
+    block_profile: str = BLOCK_PROFILE
+    block_resources: List[str] = []
+    format: Literal["jpeg", "webp", "avif", "png"] = "jpeg"
+    width: Optional[int] = None
+    height: Optional[int] = None
+    fit: Literal["contain", "cover", "fill"] = "contain"
+    priority: Literal["low", "normal", "high"] = "normal"
+
+class BatchRequest(BaseModel):
+    """Corpo da requisição de captura em lote."""
+    urls: List[str] = Field(..., min_length=1)
+    options: BatchOptions = BatchOptions()
+
+class WarmEntry(BatchOptions):
+    """Entrada da lista de aquecimento (``WARM_LIST_FILE``)."""
+    url: str
+
+def get_batch_items(batch_id: str) -> List[dict]:
+    """Retorna os itens do lote ou responde 404 se ele não existir."""
+    if batch_store.get_meta(batch_id) is None:
+        raise HTTPException(status_code=404, detail="Lote não encontrado ou expirado")
+    return batch_store.get_items(batch_id)
+
+def public_batch_item(batch_id: str, item: dict) -> dict:
+    """Item do lote sem o caminho local, com a URL da imagem se concluído."""
+    public = {k: v for k, v in item.items() if k != "name"}
+    if item["status"] == ITEM_COMPLETED:
+        public["image_url"] = f"/screenshots/batch/{batch_id}/items/{item['index']}"
+    return public
+
+def enqueue_batch(urls: List[str], options: dict, chunks: List[list], queue: str) -> str:
+    """
+    Cria o lote e envia uma tarefa por parte, após o controle de admissão.
+    
+    Faz E/S síncrona (Redis e broker); a API chama pelo ``io_pool``.
+    
+    Returns:
+        str: ID do lote
+    """
+    admit(queue, options["priority"], tasks=len(chunks))
+    batch_id = batch_store.create(urls, options)
+    for chunk in chunks:
+        capture_batch_task.apply_async(
+            args=(batch_id, chunk, options),
+            queue=queue,
+            priority=PRIORITIES[options["priority"]]
+        )
+    return batch_id
+
+@app.post("/screenshots/batch", status_code=202)
+async def create_screenshot_batch(body: BatchRequest) -> JSONResponse:
+    """
+    Endpoint para capturar várias URLs em lote.
+    
+    As URLs são divididas em partes de ``BATCH_CHUNK_SIZE``; cada parte vira
+    uma tarefa que renderiza suas URLs em paralelo no navegador do worker.
+    """
+    if len(body.urls) > BATCH_MAX_URLS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"O lote pode ter no máximo {BATCH_MAX_URLS} URLs"
+        )
+    for url in body.urls:
+        validate_url(url)
+    validate_rendition(body.options.format, body.options.width, body.options.height)
+    
+    options = body.options.model_dump()
+    options["view"] = validate_view(options["view"])
+    get_block_token(options["block_profile"], options["block_resources"])
+    
+    indexed_urls = list(enumerate(body.urls))
+    chunks = [
+        indexed_urls[start:start + BATCH_CHUNK_SIZE]
+        for start in range(0, len(indexed_urls), BATCH_CHUNK_SIZE)
+    ]
+    queue = cost_queue(options["full_page"], options["scroll_page_flag"])
+    batch_id = await run_io(enqueue_batch, body.urls, options, chunks, queue)
+    
+    return JSONResponse(status_code=202, content={
+        "status": "processing",
+        "batch_id": batch_id,
+        "total": len(body.urls),
+        "status_url": f"/screenshots/batch/{batch_id}",
+        "manifest_url": f"/screenshots/batch/{batch_id}/manifest",
+        "archive_url": f"/screenshots/batch/{batch_id}/archive"
+    })
+
+@app.get("/screenshots/batch/{batch_id}")
+async def get_screenshot_batch(batch_id: str) -> JSONResponse:
+    """Endpoint com o progresso do lote e a situação de cada item."""
+    items = await run_io(get_batch_items, batch_id)
+    counts = summarize(items)
+    return JSONResponse({
+        "batch_id": batch_id,
+        "status": "processing" if counts["pending"] else "completed",
+        "total": len(items),
+        **counts,
+        "items": [public_batch_item(batch_id, item) for item in items]
+    })
+
+@app.get("/screenshots/batch/{batch_id}/items/{index}")
+async def get_screenshot_batch_item(request: Request, batch_id: str, index: int) -> Response:
+    """Endpoint que devolve a imagem de um item do lote."""
+    items = await run_io(get_batch_items, batch_id)
+    if not 0 <= index < len(items):
+        raise HTTPException(status_code=404, detail="Item não encontrado no lote")
+    item = items[index]
+    
+    if item["status"] == ITEM_FAILED:
+        raise HTTPException(status_code=500, detail=item["error"])
+    if item["status"] != ITEM_COMPLETED:
+        return JSONResponse({"status": "processing", "batch_id": batch_id, "index": index})
+    try:
+        return await serve_cached_file(request, item["name"])
+    except FileNotFoundError:
+        raise HTTPException(status_code=410, detail="Imagem removida do cache")
+
+@app.get("/screenshots/batch/{batch_id}/manifest")
+async def get_screenshot_batch_manifest(batch_id: str) -> StreamingResponse:
+    """Endpoint que lista os itens do lote em NDJSON (um JSON por linha)."""
+    items = await run_io(get_batch_items, batch_id)
+    lines = (
+        json.dumps(public_batch_item(batch_id, item)) + "\n" for item in items
+    )
+    return StreamingResponse(lines, media_type="application/x-ndjson")
+
+@app.get("/screenshots/batch/{batch_id}/archive")
+async def get_screenshot_batch_archive(batch_id: str) -> StreamingResponse:
+    """Endpoint que envia as imagens concluídas do lote em um ZIP em streaming."""
+    items = await run_io(get_batch_items, batch_id)
+    return StreamingResponse(
+        iter_zip(items, read_cached_file),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="batch-{batch_id}.zip"'}
+    )
+
+def read_queue_depth() -> dict:
+    """Tarefas aguardando em cada fila de captura, somando as prioridades."""
+    return {
+        (queue,): admission.stats(queue, PRIORITIES["low"])[0]
+        for queue in (QUEUE_CHEAP, QUEUE_HEAVY)
+    }
+
+def read_render_engines(attribute: str) -> dict:
+    """Lê um atributo dos motores de renderização ativos neste processo."""
+    engines = {"worker": render_engine, "api": api_render_engine}
+    values = {}
+    for name, engine in engines.items():
+        if engine is not None:
+            target = engine.pool if attribute == "active_contexts" else engine
+            values[(name,)] = getattr(target, attribute)
+    return values
+
+metrics.register_gauge(
+    "screenshot_queue_depth",
+    "Tarefas aguardando em cada fila de captura",
+    ["queue"],
+    read_queue_depth
+)
+metrics.register_gauge(
+    "screenshot_memory_cache_bytes",
+    "Bytes de imagens na camada em memória da API",
+    [],
+    lambda: {(): memory_cache.size}
+)
+metrics.register_gauge(
+    "screenshot_cache_size_bytes",
+    "Tamanho do cache de capturas segundo o índice",
+    [],
+    lambda: {(): cache_index.total_size()}
+)
+metrics.register_gauge(
+    "screenshot_render_active_pages",
+    "Páginas sendo renderizadas pelo motor",
+    ["engine"],
+    lambda: read_render_engines("active_pages")
+)
+metrics.register_gauge(
+    "screenshot_render_max_pages",
+    "Páginas simultâneas permitidas no motor",
+    ["engine"],
+    lambda: read_render_engines("max_pages")
+)
+metrics.register_gauge(
+    "screenshot_browser_contexts",
+    "Contextos abertos no pool de navegadores",
+    ["engine"],
+    lambda: read_render_engines("active_contexts")
+)
+
+@app.get("/metrics")
+async def get_metrics() -> Response:
+    """Endpoint com as métricas no formato de texto do Prometheus."""
+    # A coleta lê o Redis, então roda fora do event loop
+    body = await run_io(metrics.render_latest)
+    return Response(body, media_type=CONTENT_TYPE_LATEST)
+
 @app.get("/health")
 async def health_check():
     """Endpoint para verificar a saúde da aplicação."""
     try:
         # Verifica conexão com Redis
-        redis_client.ping()
+        await async_redis_client.ping()
         
-        # Verifica diretório de cache
-        if not os.path.exists(CACHE_DIR):
-            os.makedirs(CACHE_DIR, exist_ok=True)
+        # Verifica o armazenamento das capturas
+        await run_io(storage.check)
         
         return JSONResponse(
             status_code=200,
@@ -459,6 +2299,7 @@ async def health_check():
                 "status": "healthy",
                 "redis": "connected",
                 "cache": "available",
+                "event_loop_lag": metrics.last_loop_lag(),
                 "timestamp": datetime.utcnow().isoformat()
             }
         )
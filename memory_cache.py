@@ -0,0 +1,181 @@
+"""Camada em memória, no processo da API, para as imagens mais acessadas."""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional, Set
+
+
+class CachedImage(NamedTuple):
+    """Imagem guardada em memória com o necessário para respondê-la."""
+    body: bytes
+    etag: str
+    mtime: float
+    media_type: str
+    loaded_at: float
+    phash: str = ""
+
+
+class FrequencySketch:
+    """
+    Count-Min Sketch com contadores de 4 bits que estima a frequência recente.
+
+    A cada ``sample_size`` incrementos todos os contadores caem pela metade,
+    então acessos antigos perdem peso (TinyLFU).
+    """
+
+    def __init__(self, width: int = 4096, depth: int = 4) -> None:
+        self.width = width
+        self.depth = depth
+        self.sample_size = width * 10
+        self._table = [bytearray(width) for _ in range(depth)]
+        self._additions = 0
+
+    def _indexes(self, name: str):
+        digest = hashlib.blake2b(name.encode(), digest_size=4 * self.depth).digest()
+        for row in range(self.depth):
+            yield row, int.from_bytes(digest[row * 4:row * 4 + 4], "little") % self.width
+
+    def increment(self, name: str) -> None:
+        for row, index in self._indexes(name):
+            if self._table[row][index] < 15:
+                self._table[row][index] += 1
+        self._additions += 1
+        if self._additions >= self.sample_size:
+            self._reset()
+
+    def frequency(self, name: str) -> int:
+        return min(self._table[row][index] for row, index in self._indexes(name))
+
+    def _reset(self) -> None:
+        for row in self._table:
+            for index, count in enumerate(row):
+                row[index] = count >> 1
+        self._additions //= 2
+
+
+class MemoryCache:
+    """
+    Cache LRU limitado por bytes, com admissão TinyLFU.
+
+    Com o orçamento cheio, uma imagem nova só entra se for acessada com mais
+    frequência que as que ela expulsaria; assim imagens vistas uma única vez
+    não tiram as populares da memória. As entradas são agrupadas pela chave
+    da renderização para que ``invalidate`` remova todas as variantes dela.
+    Entradas carregadas há mais de ``ttl`` segundos são descartadas, o que
+    limita por quanto tempo a memória pode divergir do disco. É seguro usar a
+    partir de várias threads.
+    """
+
+    def __init__(self, max_size: int, max_entry_size: int, ttl: float) -> None:
+        self.max_size = max_size
+        self.max_entry_size = max_entry_size
+        self.ttl = ttl
+        self.size = 0
+        self._entries: "OrderedDict[str, CachedImage]" = OrderedDict()
+        self._groups: Dict[str, Set[str]] = {}
+        self._group_of: Dict[str, str] = {}
+        self._sketch = FrequencySketch()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _drop(self, name: str) -> None:
+        # Chamado com o lock
+        entry = self._entries.pop(name, None)
+        if entry is not None:
+            self.size -= len(entry.body)
+        group = self._group_of.pop(name, None)
+        if group is not None:
+            names = self._groups.get(group)
+            if names is not None:
+                names.discard(name)
+                if not names:
+                    del self._groups[group]
+
+    def get(self, name: str) -> Optional[CachedImage]:
+        """Busca uma imagem e registra o acesso para a admissão."""
+        with self._lock:
+            self._sketch.increment(name)
+            entry = self._entries.get(name)
+            if entry is None:
+                return None
+            if time.monotonic() - entry.loaded_at >= self.ttl:
+                self._drop(name)
+                return None
+            self._entries.move_to_end(name)
+            return entry
+
+    def admits(self, name: str, size: int) -> bool:
+        """
+        Indica se uma imagem desse tamanho entraria agora na memória.
+
+        Permite evitar a leitura do arquivo quando ele seria recusado.
+        """
+        if self.max_size <= 0 or size > min(self.max_entry_size, self.max_size):
+            return False
+        with self._lock:
+            return self._admits(name, size)
+
+    def _admits(self, name: str, size: int) -> bool:
+        # Chamado com o lock
+        needed = self.size + size - self.max_size
+        if name in self._entries:
+            needed -= len(self._entries[name].body)
+        if needed <= 0:
+            return True
+        frequency = self._sketch.frequency(name)
+        for victim, entry in self._entries.items():
+            if victim == name:
+                continue
+            if self._sketch.frequency(victim) >= frequency:
+                return False
+            needed -= len(entry.body)
+            if needed <= 0:
+                return True
+        return False
+
+    def put(
+        self,
+        name: str,
+        body: bytes,
+        etag: str,
+        mtime: float,
+        media_type: str,
+        group: str,
+        phash: str = ""
+    ) -> bool:
+        """
+        Guarda uma imagem se a política de admissão permitir.
+
+        Returns:
+            bool: True se a imagem ficou em memória
+        """
+        size = len(body)
+        if self.max_size <= 0 or size > min(self.max_entry_size, self.max_size):
+            return False
+        with self._lock:
+            if not self._admits(name, size):
+                return False
+            self._drop(name)
+            while self._entries and self.size + size > self.max_size:
+                self._drop(next(iter(self._entries)))
+            self._entries[name] = CachedImage(body, etag, mtime, media_type, time.monotonic(), phash)
+            self.size += size
+            self._groups.setdefault(group, set()).add(name)
+            self._group_of[name] = group
+        return True
+
+    def invalidate(self, group: str) -> None:
+        """Remove todas as imagens de um grupo (variantes de uma renderização)."""
+        with self._lock:
+            for name in list(self._groups.get(group, ())):
+                self._drop(name)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._groups.clear()
+            self._group_of.clear()
+            self.size = 0
@@ -0,0 +1,202 @@
+"""Métricas Prometheus da API e dos workers."""
+import asyncio
+import logging
+import os
+from typing import Callable, Dict, Iterable, List, Mapping, Tuple
+
+from prometheus_client import (
+    CollectorRegistry, Counter, Histogram, generate_latest, multiprocess, start_http_server,
+)
+from prometheus_client.core import REGISTRY, GaugeMetricFamily
+from prometheus_client.registry import Collector
+
+logger = logging.getLogger(__name__)
+
+# Fases da captura, na ordem em que acontecem
+CAPTURE_PHASES = (
+    "browser", "navigation", "wait_time", "scroll", "images", "screenshot",
+    "resize", "encode", "cache_write",
+)
+
+# Resultados da busca no cache de capturas
+CACHE_RESULTS = ("memory", "hit", "derived", "stale", "miss")
+
+# Resultados do aquecimento do cache para cada imagem avaliada
+WARM_RESULTS = ("scheduled", "fresh", "deferred")
+
+_PHASE_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 80, 160)
+_LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+CAPTURE_PHASE_SECONDS = Histogram(
+    "screenshot_capture_phase_seconds",
+    "Duração de cada fase da captura",
+    ["phase"],
+    buckets=_PHASE_BUCKETS,
+)
+CACHE_LOOKUPS = Counter(
+    "screenshot_cache_lookups",
+    "Buscas no cache de capturas por resultado",
+    ["result"],
+)
+TASK_WAIT_SECONDS = Histogram(
+    "screenshot_task_wait_seconds",
+    "Tempo entre o envio da tarefa e o início da execução",
+    ["queue"],
+    buckets=_PHASE_BUCKETS,
+)
+BYTES_SERVED = Counter(
+    "screenshot_served_bytes",
+    "Bytes de imagens enviados pela API",
+)
+CACHE_WARMING = Counter(
+    "screenshot_cache_warming",
+    "Imagens avaliadas pelo aquecimento do cache por resultado",
+    ["result"],
+)
+TRUNCATED_CAPTURES = Counter(
+    "screenshot_truncated_captures",
+    "Capturas de página inteira cortadas na altura ou no número de faixas máximo",
+)
+EVENT_LOOP_LAG_SECONDS = Histogram(
+    "screenshot_event_loop_lag_seconds",
+    "Atraso do event loop da API além do intervalo de medição",
+    buckets=_LAG_BUCKETS,
+)
+
+# Gauges lidos na coleta, também servidos no modo multiprocesso
+_GAUGES: List["GaugeCollector"] = []
+
+# Último atraso medido do event loop, em segundos
+_loop_lag = 0.0
+
+for _phase in CAPTURE_PHASES:
+    CAPTURE_PHASE_SECONDS.labels(phase=_phase)
+for _result in CACHE_RESULTS:
+    CACHE_LOOKUPS.labels(result=_result)
+for _result in WARM_RESULTS:
+    CACHE_WARMING.labels(result=_result)
+
+
+def observe_phase(phase: str, seconds: float) -> None:
+    """Registra a duração de uma fase da captura."""
+    CAPTURE_PHASE_SECONDS.labels(phase=phase).observe(seconds)
+
+
+def observe_phases(timings: Mapping[str, object]) -> None:
+    """Registra as fases presentes em ``CaptureBudget.timings``."""
+    for phase in CAPTURE_PHASES:
+        seconds = timings.get(phase)
+        if isinstance(seconds, (int, float)):
+            observe_phase(phase, seconds)
+
+
+def count_lookup(result: str) -> None:
+    """Conta uma busca no cache pelo resultado (``CACHE_RESULTS``)."""
+    CACHE_LOOKUPS.labels(result=result).inc()
+
+
+class GaugeCollector(Collector):
+    """
+    Gauge lido na hora da coleta, para estado que vive fora do processo.
+
+    ``read`` devolve um dicionário de tuplas de valores dos rótulos para o
+    valor; erros na leitura omitem a métrica daquela coleta.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str],
+        read: Callable[[], Dict[Tuple[str, ...], float]]
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = list(labelnames)
+        self.read = read
+
+    def _family(self) -> GaugeMetricFamily:
+        return GaugeMetricFamily(self.name, self.documentation, labels=self.labelnames)
+
+    def describe(self):
+        # Evita que o registro chame collect() (e leia o Redis) no registro
+        yield self._family()
+
+    def collect(self):
+        try:
+            values = self.read()
+        except Exception as e:
+            logger.warning(f"Erro ao coletar a métrica {self.name}: {e}")
+            return
+        family = self._family()
+        for labels, value in values.items():
+            family.add_metric(list(labels), value)
+        yield family
+
+
+def register_gauge(
+    name: str,
+    documentation: str,
+    labelnames: Iterable[str],
+    read: Callable[[], Dict[Tuple[str, ...], float]]
+) -> GaugeCollector:
+    """Registra um ``GaugeCollector`` no registro padrão."""
+    collector = GaugeCollector(name, documentation, labelnames, read)
+    REGISTRY.register(collector)
+    _GAUGES.append(collector)
+    return collector
+
+
+def render_latest() -> bytes:
+    """
+    Métricas no formato de texto do Prometheus.
+
+    Com ``PROMETHEUS_MULTIPROC_DIR`` (API com vários workers do gunicorn),
+    agrega os contadores e histogramas de todos os processos; os gauges
+    lidos na coleta vêm do processo que atende a requisição.
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return generate_latest()
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    for collector in _GAUGES:
+        registry.register(collector)
+    return generate_latest(registry)
+
+
+async def monitor_event_loop(interval: float) -> None:
+    """
+    Mede o atraso do event loop até ser cancelada.
+
+    A cada ``interval`` segundos, registra quanto o ``sleep`` demorou além do
+    pedido: o tempo em que o loop ficou ocupado com código que não cedeu a
+    vez (E/S bloqueante, CPU).
+    """
+    global _loop_lag
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval)
+        _loop_lag = max(loop.time() - started - interval, 0.0)
+        EVENT_LOOP_LAG_SECONDS.observe(_loop_lag)
+
+
+def last_loop_lag() -> float:
+    """Último atraso medido do event loop, em segundos."""
+    return round(_loop_lag, 4)
+
+
+def start_exporter(port: int) -> bool:
+    """
+    Expõe as métricas do processo em ``http://0.0.0.0:port/metrics``.
+
+    Returns:
+        bool: True se o servidor foi iniciado
+    """
+    try:
+        start_http_server(port)
+    except OSError as e:
+        logger.warning(f"Erro ao iniciar o exportador de métricas na porta {port}: {e}")
+        return False
+    logger.info(f"Métricas do worker disponíveis na porta {port}")
+    return True
@@ -0,0 +1,143 @@
+"""Limites por host (concorrência e espaçamento) para não sobrecarregar as origens."""
+import json
+import random
+import time
+import uuid
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import redis
+
+# Reserva uma vaga do host: respeita o limite de capturas simultâneas e
+# consome uma ficha do token bucket que impõe o espaçamento mínimo.
+# Retorna {1, 0} se reservou, ou {0, espera em segundos}; -1 indica host cheio.
+_ACQUIRE = """
+local now = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local burst = tonumber(ARGV[3])
+local max_concurrency = tonumber(ARGV[4])
+local lease_ttl = tonumber(ARGV[6])
+
+redis.call('zremrangebyscore', KEYS[2], '-inf', now)
+if max_concurrency > 0 and redis.call('zcard', KEYS[2]) >= max_concurrency then
+    return {0, '-1'}
+end
+
+if rate > 0 then
+    local state = redis.call('hmget', KEYS[1], 'tokens', 'ts')
+    local tokens = tonumber(state[1]) or burst
+    local ts = tonumber(state[2]) or now
+    tokens = math.min(burst, tokens + math.max(now - ts, 0) * rate)
+    if tokens < 1 then
+        return {0, tostring((1 - tokens) / rate)}
+    end
+    redis.call('hset', KEYS[1], 'tokens', tokens - 1, 'ts', now)
+    redis.call('expire', KEYS[1], math.ceil(burst / rate) + 1)
+end
+
+redis.call('zadd', KEYS[2], now + lease_ttl, ARGV[5])
+redis.call('expire', KEYS[2], math.ceil(lease_ttl))
+return {1, '0'}
+"""
+
+
+class HostThrottled(Exception):
+    """O host atingiu o limite; a captura deve ser adiada por ``delay`` segundos."""
+
+    def __init__(self, host: str, delay: float) -> None:
+        super().__init__(f"Host {host} limitado, nova tentativa em {delay:.1f}s")
+        self.host = host
+        self.delay = delay
+
+
+def origin_host(url: str) -> str:
+    """Host (em minúsculas) ao qual os limites se aplicam."""
+    return (urlsplit(url).hostname or "").lower()
+
+
+def parse_host_limits(value: Optional[str]) -> Dict[str, Dict[str, float]]:
+    """
+    Lê os limites específicos por host de um JSON.
+
+    Ex.: ``{"example.com": {"max_concurrency": 1, "min_interval": 5}}``; vale
+    também para os subdomínios do host.
+    """
+    if not value:
+        return {}
+    return {host.lower(): limits for host, limits in json.loads(value).items()}
+
+
+class HostScheduler:
+    """
+    Controla quantas capturas de um mesmo host rodam e com que frequência.
+
+    Cada host tem no máximo ``max_concurrency`` capturas simultâneas (0 não
+    limita) e um token bucket com ``burst`` fichas repostas a cada
+    ``min_interval`` segundos (0 não espaça). As reservas expiram após
+    ``lease_ttl`` segundos, liberando a vaga de workers que caíram.
+    """
+
+    def __init__(
+        self,
+        client: redis.Redis,
+        max_concurrency: int,
+        min_interval: float,
+        burst: int = 1,
+        lease_ttl: float = 300,
+        busy_delay: float = 5.0,
+        overrides: Optional[Dict[str, Dict[str, float]]] = None,
+        prefix: str = "screenshot:host:"
+    ) -> None:
+        self.client = client
+        self.max_concurrency = max_concurrency
+        self.min_interval = min_interval
+        self.burst = burst
+        self.lease_ttl = lease_ttl
+        self.busy_delay = busy_delay
+        self.overrides = overrides or {}
+        self.prefix = prefix
+        self._acquire = client.register_script(_ACQUIRE)
+
+    def limits(self, host: str) -> Tuple[int, float, int]:
+        """Concorrência máxima, intervalo mínimo e rajada aplicados ao host."""
+        labels = host.split(".")
+        for i in range(len(labels)):
+            override = self.overrides.get(".".join(labels[i:]))
+            if override is not None:
+                return (
+                    int(override.get("max_concurrency", self.max_concurrency)),
+                    float(override.get("min_interval", self.min_interval)),
+                    int(override.get("burst", self.burst)),
+                )
+        return self.max_concurrency, self.min_interval, self.burst
+
+    def _keys(self, host: str):
+        return [f"{self.prefix}{host}:bucket", f"{self.prefix}{host}:active"]
+
+    def acquire(self, host: str) -> str:
+        """
+        Reserva uma vaga para capturar o host.
+
+        Returns:
+            str: Identificador da reserva, usado em ``release``
+
+        Raises:
+            HostThrottled: Se o host estiver no limite
+        """
+        max_concurrency, min_interval, burst = self.limits(host)
+        rate = 1 / min_interval if min_interval > 0 else 0
+        lease = str(uuid.uuid4())
+        acquired, wait = self._acquire(
+            keys=self._keys(host),
+            args=[time.time(), rate, max(burst, 1), max_concurrency, lease, self.lease_ttl],
+            client=self.client
+        )
+        if acquired:
+            return lease
+        delay = self.busy_delay if float(wait) < 0 else float(wait)
+        # Espalha as novas tentativas para não voltarem todas juntas
+        raise HostThrottled(host, delay * random.uniform(1.0, 1.2))
+
+    def release(self, host: str, lease: str) -> None:
+        """Libera a vaga reservada."""
+        self.client.zrem(self._keys(host)[1], lease)
@@ -0,0 +1,128 @@
+"""Popularidade das imagens do cache, com decaimento, para o aquecimento."""
+import json
+import time
+from typing import List, NamedTuple
+
+import redis
+
+# Soma um acesso com peso 2^((agora - marco) / meia-vida) (decaimento para a
+# frente: os pesos antigos não precisam ser atualizados) e guarda os
+# parâmetros da captura na primeira vez
+_RECORD = """
+local now = tonumber(ARGV[3])
+local landmark = tonumber(redis.call('get', KEYS[3]))
+if not landmark then
+    landmark = now
+    redis.call('set', KEYS[3], ARGV[3])
+end
+local weight = 2 ^ ((now - landmark) / tonumber(ARGV[4]))
+redis.call('zincrby', KEYS[1], string.format('%.17g', weight), ARGV[1])
+redis.call('hsetnx', KEYS[2], ARGV[1], ARGV[2])
+"""
+
+# Traz as pontuações para o marco atual (evita que os pesos cresçam sem
+# limite) e descarta as imagens esquecidas e as que passam do limite
+_RESCALE = """
+local now = tonumber(ARGV[1])
+local landmark = tonumber(redis.call('get', KEYS[3]))
+if landmark and redis.call('exists', KEYS[1]) == 1 then
+    local factor = 2 ^ (-(now - landmark) / tonumber(ARGV[2]))
+    redis.call('zunionstore', KEYS[1], 1, KEYS[1], 'WEIGHTS', string.format('%.17g', factor))
+end
+redis.call('set', KEYS[3], ARGV[1])
+local dropped = redis.call('zrangebyscore', KEYS[1], '-inf', '(' .. ARGV[4])
+local excess = redis.call('zcard', KEYS[1]) - #dropped - tonumber(ARGV[3])
+if excess > 0 then
+    local rest = redis.call('zrange', KEYS[1], #dropped, #dropped + excess - 1)
+    for _, name in ipairs(rest) do
+        table.insert(dropped, name)
+    end
+end
+for _, name in ipairs(dropped) do
+    redis.call('zrem', KEYS[1], name)
+    redis.call('hdel', KEYS[2], name)
+end
+return #dropped
+"""
+
+
+class PopularEntry(NamedTuple):
+    """Imagem do cache com os acessos recentes e os parâmetros da captura."""
+    name: str
+    hits: float
+    params: dict
+
+
+class PopularityTracker:
+    """
+    Conta os acessos por imagem do cache em um conjunto ordenado do Redis.
+
+    Cada acesso vale 1 agora e metade depois de ``half_life`` segundos. Em
+    vez de reduzir todas as pontuações com o tempo, os acessos novos valem
+    mais (decaimento para a frente), então registrar custa um ZINCRBY;
+    ``rescale`` normaliza as pontuações de tempos em tempos e mantém no
+    máximo ``max_entries`` imagens.
+    """
+
+    def __init__(
+        self,
+        client: redis.Redis,
+        half_life: float,
+        max_entries: int,
+        prefix: str = "screenshot:popularity:"
+    ) -> None:
+        self.client = client
+        self.half_life = half_life
+        self.max_entries = max_entries
+        self._keys = [f"{prefix}scores", f"{prefix}params", f"{prefix}landmark"]
+        self._record = client.register_script(_RECORD)
+        self._rescale = client.register_script(_RESCALE)
+
+    def record(self, name: str, params: dict) -> None:
+        """
+        Registra um acesso à imagem.
+
+        Args:
+            name: Nome do objeto da imagem no cache
+            params: Parâmetros da tarefa que recaptura a imagem
+        """
+        self._record(
+            keys=self._keys,
+            args=[name, json.dumps(params), time.time(), self.half_life],
+            client=self.client
+        )
+
+    def rescale(self, min_hits: float = 0.01) -> int:
+        """
+        Normaliza as pontuações e descarta as imagens com menos de
+        ``min_hits`` acessos recentes ou além do limite.
+
+        Returns:
+            int: Número de imagens descartadas
+        """
+        return self._rescale(
+            keys=self._keys,
+            args=[time.time(), self.half_life, self.max_entries, min_hits],
+            client=self.client
+        )
+
+    def top(self, count: int, min_hits: float = 0) -> List[PopularEntry]:
+        """As ``count`` imagens mais acessadas, com pelo menos ``min_hits`` acessos recentes."""
+        if count <= 0:
+            return []
+        pipe = self.client.pipeline(transaction=False)
+        pipe.get(self._keys[2])
+        pipe.zrevrange(self._keys[0], 0, count - 1, withscores=True)
+        landmark, ranked = pipe.execute()
+        if not ranked:
+            return []
+        decay = 2 ** (-(time.time() - float(landmark or time.time())) / self.half_life)
+        ranked = [(name, score * decay) for name, score in ranked if score * decay >= min_hits]
+        if not ranked:
+            return []
+        params = self.client.hmget(self._keys[1], [name for name, _ in ranked])
+        return [
+            PopularEntry(name, hits, json.loads(raw))
+            for (name, hits), raw in zip(ranked, params)
+            if raw is not None
+        ]
@@ -0,0 +1,265 @@
+"""Detecção adaptativa de prontidão da página antes da captura."""
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Set
+
+logger = logging.getLogger(__name__)
+
+# Tipos de requisição de longa duração que nunca deixam a rede "quieta"
+_BACKGROUND_RESOURCE_TYPES = {"websocket", "eventsource", "media"}
+
+# Observa quais imagens estão no viewport (inclusive as adicionadas depois)
+_INSTALL_SCRIPT = """() => {
+    if (window.__shotReadiness) return;
+    const visible = new Set();
+    const observer = new IntersectionObserver(entries => {
+        for (const entry of entries) {
+            if (entry.isIntersecting) visible.add(entry.target);
+            else visible.delete(entry.target);
+        }
+    });
+    const observeAll = root => root.querySelectorAll('img').forEach(img => observer.observe(img));
+    observeAll(document);
+    new MutationObserver(mutations => {
+        for (const mutation of mutations) {
+            for (const node of mutation.addedNodes) {
+                if (node.tagName === 'IMG') observer.observe(node);
+                else if (node.querySelectorAll) observeAll(node);
+            }
+        }
+    }).observe(document.documentElement, {childList: true, subtree: true});
+    window.__shotReadiness = {
+        pendingVisible: () => {
+            let pending = 0;
+            for (const img of visible) {
+                if (img.isConnected && !img.complete) pending++;
+            }
+            return pending;
+        },
+        settle: () => new Promise(resolve => {
+            requestAnimationFrame(() => requestAnimationFrame(resolve));
+        })
+    };
+}"""
+
+_SCROLL_HEIGHT = """() => Math.max(
+    document.body ? document.body.scrollHeight : 0,
+    document.documentElement.scrollHeight
+)"""
+
+# Força imagens lazy e espera todas, cada uma limitada ao tempo informado
+_WAIT_IMAGES_SCRIPT = """timeout => {
+    document.querySelectorAll('img[loading="lazy"]').forEach(img => {
+        if (img.dataset.src) img.src = img.dataset.src;
+        if (img.dataset.srcset) img.srcset = img.dataset.srcset;
+    });
+    const pending = Array.from(document.images).filter(img => !img.complete);
+    return Promise.all(pending.map(img => Promise.race([
+        new Promise(resolve => {
+            img.addEventListener('load', resolve, {once: true});
+            img.addEventListener('error', resolve, {once: true});
+        }),
+        new Promise(resolve => setTimeout(resolve, timeout))
+    ]))).then(() => Array.from(document.images).filter(img => !img.complete).length);
+}"""
+
+
+class CaptureBudget:
+    """
+    Orçamento de tempo das fases de prontidão de uma captura.
+
+    Cada fase espera no máximo o tempo restante; esgotado o orçamento, as
+    fases seguintes retornam logo e a captura é feita com o que carregou.
+    Os tempos de cada fase ficam em ``timings`` (segundos).
+    """
+
+    def __init__(self, total: float) -> None:
+        self.total = total
+        self.deadline = time.monotonic() + total
+        self.timings: Dict[str, float] = {}
+
+    def remaining(self) -> float:
+        """Segundos restantes do orçamento (nunca negativo)."""
+        return max(self.deadline - time.monotonic(), 0.0)
+
+    @asynccontextmanager
+    async def phase(self, name: str) -> AsyncIterator[None]:
+        """Mede a duração de uma fase e acumula em ``timings``."""
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            elapsed = time.monotonic() - started
+            self.timings[name] = round(self.timings.get(name, 0.0) + elapsed, 3)
+
+
+class NetworkMonitor:
+    """
+    Acompanha as requisições em andamento de uma página.
+
+    Requisições de longa duração (websocket, eventsource, mídia) e as que estão
+    abertas há mais de ``stale_after`` segundos (long-poll, analytics) não
+    impedem que a rede seja considerada quieta.
+    """
+
+    def __init__(self, page, stale_after: float = 5.0) -> None:
+        self.page = page
+        self.stale_after = stale_after
+        self._inflight: Dict[object, float] = {}
+        self._last_activity = time.monotonic()
+        page.on("request", self._on_request)
+        page.on("requestfinished", self._on_done)
+        page.on("requestfailed", self._on_done)
+
+    def _on_request(self, request) -> None:
+        if request.resource_type in _BACKGROUND_RESOURCE_TYPES:
+            return
+        self._inflight[request] = time.monotonic()
+        self._last_activity = time.monotonic()
+
+    def _on_done(self, request) -> None:
+        if self._inflight.pop(request, None) is not None:
+            self._last_activity = time.monotonic()
+
+    def _active(self) -> Set[object]:
+        cutoff = time.monotonic() - self.stale_after
+        return {r for r, started in self._inflight.items() if started > cutoff}
+
+    def is_quiet(self, quiet: float) -> bool:
+        """True se não há requisições ativas há pelo menos ``quiet`` segundos."""
+        return not self._active() and time.monotonic() - self._last_activity >= quiet
+
+    async def wait_for_quiet(self, quiet: float, timeout: float) -> bool:
+        """
+        Espera a rede ficar quieta.
+
+        Returns:
+            bool: True se a rede ficou quieta antes do ``timeout``
+        """
+        deadline = time.monotonic() + timeout
+        while not self.is_quiet(quiet):
+            if time.monotonic() >= deadline:
+                return False
+            await asyncio.sleep(0.05)
+        return True
+
+
+async def install(page) -> None:
+    """Instala na página o observador de imagens visíveis."""
+    await page.evaluate(_INSTALL_SCRIPT)
+
+
+async def _visible_images_loaded(page, timeout: float) -> bool:
+    try:
+        await page.wait_for_function(
+            "() => window.__shotReadiness.pendingVisible() === 0",
+            timeout=timeout * 1000,
+            polling=100
+        )
+        return True
+    except Exception:
+        return False
+
+
+async def wait_for_step(
+    page,
+    network: NetworkMonitor,
+    timeout: float,
+    quiet: float = 0.3
+) -> None:
+    """
+    Espera o trecho recém-exposto da página ficar pronto.
+
+    Avança assim que as imagens visíveis terminam de carregar ou a rede fica
+    quieta, o que ocorrer primeiro, limitado a ``timeout`` segundos.
+    """
+    if timeout <= 0:
+        return
+    # Dois quadros para os observadores (da página e nossos) reagirem ao scroll
+    await page.evaluate("() => window.__shotReadiness.settle()")
+    waiters = [
+        asyncio.ensure_future(_visible_images_loaded(page, timeout)),
+        asyncio.ensure_future(network.wait_for_quiet(quiet, timeout)),
+    ]
+    try:
+        await asyncio.wait(waiters, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+
+
+async def scroll_until_ready(
+    page,
+    budget: CaptureBudget,
+    network: NetworkMonitor,
+    step_timeout: float = 2.0,
+    max_height: int = 30000,
+    max_growths: int = 3
+) -> dict:
+    """
+    Rola a página um viewport por vez para carregar conteúdo lazy.
+
+    Cada passo avança quando o trecho exposto fica pronto (ver
+    ``wait_for_step``). Uma página cuja altura continua crescendo ao chegar
+    ao fim por ``max_growths`` passos seguidos, ou que passa de ``max_height``,
+    é tratada como scroll infinito e a rolagem para.
+
+    Returns:
+        dict: Passos executados, altura final e se houve scroll infinito
+    """
+    await install(page)
+    viewport_height = await page.evaluate("window.innerHeight") or 1
+    position = 0
+    steps = 0
+    growths = 0
+    infinite_scroll = False
+    height = await page.evaluate(_SCROLL_HEIGHT)
+
+    while position < height and budget.remaining() > 0:
+        await page.evaluate("y => window.scrollTo(0, y)", position)
+        await wait_for_step(page, network, min(step_timeout, budget.remaining()))
+        steps += 1
+        position += viewport_height
+
+        new_height = await page.evaluate(_SCROLL_HEIGHT)
+        # Crescimento ao chegar no fim da página indica carregamento contínuo
+        if new_height > height and position + viewport_height >= height:
+            growths += 1
+        else:
+            growths = 0
+        height = new_height
+        if growths >= max_growths or height > max_height:
+            infinite_scroll = True
+            break
+
+    await page.evaluate("window.scrollTo(0, 0)")
+    await wait_for_step(page, network, min(step_timeout, budget.remaining()))
+
+    if infinite_scroll:
+        logger.info(f"Scroll infinito detectado (altura {height}px após {steps} passos)")
+    return {"steps": steps, "height": height, "infinite_scroll": infinite_scroll}
+
+
+async def wait_for_images(page, timeout: float) -> int:
+    """
+    Força imagens lazy e espera todas carregarem, no máximo por ``timeout``.
+
+    Uma imagem que nunca dispara ``load`` ou ``error`` não trava a captura.
+
+    Returns:
+        int: Quantidade de imagens que não terminaram de carregar
+    """
+    if timeout <= 0:
+        return await page.evaluate(
+            "() => Array.from(document.images).filter(img => !img.complete).length"
+        )
+    try:
+        return await asyncio.wait_for(
+            page.evaluate(_WAIT_IMAGES_SCRIPT, int(timeout * 1000)),
+            timeout + 1
+        )
+    except asyncio.TimeoutError:
+        return -1
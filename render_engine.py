@@ -0,0 +1,191 @@
+"""Motor assíncrono que renderiza várias páginas ao mesmo tempo em um navegador."""
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
+
+from browser_pool import BrowserPool
+
+logger = logging.getLogger(__name__)
+
+# Arquivos de uso de memória do cgroup (v2 e v1), lidos em ordem
+_CGROUP_MEMORY_FILES = (
+    "/sys/fs/cgroup/memory.current",
+    "/sys/fs/cgroup/memory/memory.usage_in_bytes",
+)
+
+
+def current_memory_usage() -> Optional[int]:
+    """
+    Retorna o uso de memória do container em bytes.
+
+    Usa o cgroup porque ele inclui os processos do Chromium. Retorna None se
+    não houver cgroup disponível (nesse caso o limite de memória é ignorado).
+    """
+    for path in _CGROUP_MEMORY_FILES:
+        try:
+            with open(path) as f:
+                return int(f.read().strip())
+        except (OSError, ValueError):
+            continue
+    return None
+
+
+class RenderEngine:
+    """
+    Executa pipelines de captura concorrentes em um único event loop.
+
+    Todas as páginas compartilham o navegador do ``BrowserPool``; cada uma roda
+    em seu próprio contexto. Uma nova página só é aberta se houver vaga
+    (``max_pages``) e se o uso de memória estiver abaixo de ``memory_limit``.
+    Com nenhuma página ativa, a captura sempre é liberada para não travar.
+    """
+
+    def __init__(
+        self,
+        max_pages: int = 4,
+        memory_limit: Optional[int] = None,
+        max_contexts: int = 100,
+        max_age: int = 3600
+    ) -> None:
+        self.max_pages = max_pages
+        self.memory_limit = memory_limit
+        self.pool = BrowserPool(max_contexts=max_contexts, max_age=max_age)
+        self._active = 0
+        self._slots: Optional[asyncio.Condition] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._thread_lock = threading.Lock()
+
+    @property
+    def active_pages(self) -> int:
+        """Número de páginas sendo renderizadas."""
+        return self._active
+
+    def _has_room(self) -> bool:
+        if self._active >= self.max_pages:
+            return False
+        if self._active == 0 or not self.memory_limit:
+            return True
+        usage = current_memory_usage()
+        return usage is None or usage < self.memory_limit
+
+    @asynccontextmanager
+    async def _slot(self) -> AsyncIterator[None]:
+        if self._slots is None:
+            self._slots = asyncio.Condition()
+        async with self._slots:
+            while not self._has_room():
+                try:
+                    # Reavalia a memória periodicamente mesmo sem notificação
+                    await asyncio.wait_for(self._slots.wait(), timeout=0.5)
+                except asyncio.TimeoutError:
+                    pass
+            self._active += 1
+        try:
+            yield
+        finally:
+            async with self._slots:
+                self._active -= 1
+                self._slots.notify()
+
+    async def start(self) -> None:
+        """Lança o navegador compartilhado."""
+        await self.pool.start()
+
+    async def stop(self) -> None:
+        """Fecha o navegador compartilhado."""
+        await self.pool.stop()
+
+    async def render(
+        self,
+        pipeline: Callable[..., Awaitable[Any]],
+        context_options: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+        **kwargs: Any
+    ) -> Any:
+        """
+        Executa um pipeline de captura em uma página nova.
+
+        Args:
+            pipeline: Corrotina ``pipeline(page, **kwargs)`` que faz a captura
+            context_options: Argumentos para ``browser.new_context``
+            timeout: Tempo máximo do pipeline em segundos, contado a partir da
+                abertura da página (a espera por vaga não conta)
+            **kwargs: Argumentos repassados ao pipeline
+
+        Returns:
+            Any: O valor retornado pelo pipeline
+
+        Raises:
+            TimeoutError: Se o pipeline exceder ``timeout``
+        """
+        async with self._slot():
+            async with self.pool.new_context(**(context_options or {})) as context:
+                page = await context.new_page()
+                try:
+                    return await asyncio.wait_for(pipeline(page, **kwargs), timeout)
+                finally:
+                    try:
+                        await page.close()
+                    except Exception as e:
+                        logger.warning(f"Erro ao fechar a página: {e}")
+
+    # Execução a partir de código síncrono (tarefas Celery em threads)
+
+    def start_background(self) -> None:
+        """Inicia o event loop do motor em uma thread dedicada."""
+        with self._thread_lock:
+            if self._thread is not None:
+                return
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(
+                target=loop.run_forever,
+                name="render-engine",
+                daemon=True
+            )
+            thread.start()
+            try:
+                asyncio.run_coroutine_threadsafe(self.start(), loop).result()
+            except Exception:
+                loop.call_soon_threadsafe(loop.stop)
+                raise
+            self._loop = loop
+            self._thread = thread
+
+    def stop_background(self) -> None:
+        """Fecha o navegador e encerra a thread do event loop."""
+        if self._loop is None or self._thread is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self.stop(), self._loop).result(timeout=30)
+        finally:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=30)
+            self._loop = None
+            self._thread = None
+
+    def submit(
+        self,
+        pipeline: Callable[..., Awaitable[Any]],
+        context_options: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+        **kwargs: Any
+    ) -> Future:
+        """
+        Agenda uma captura no event loop do motor a partir de outra thread.
+
+        Várias capturas agendadas de uma vez rodam em paralelo, respeitando o
+        limite de páginas e de memória.
+
+        Returns:
+            Future: Futuro com o valor retornado pelo pipeline
+        """
+        self.start_background()
+        assert self._loop is not None
+        return asyncio.run_coroutine_threadsafe(
+            self.render(pipeline, context_options, timeout, **kwargs),
+            self._loop
+        )
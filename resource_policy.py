@@ -0,0 +1,142 @@
+"""Políticas de bloqueio de requisições durante a captura."""
+from typing import FrozenSet, Iterable, Optional
+from urllib.parse import urlsplit
+
+# Tipos de recurso do Playwright que podem ser bloqueados ("document" nunca é)
+BLOCKABLE_RESOURCE_TYPES = frozenset({
+    "stylesheet", "image", "media", "font", "script", "texttrack", "xhr",
+    "fetch", "eventsource", "websocket", "manifest", "ping", "other",
+})
+
+# Perfis de bloqueio: tipos de recurso bloqueados e se bloqueia rastreadores
+BLOCK_PROFILES = {
+    "none": (frozenset(), False),
+    "standard": (frozenset({"media", "websocket", "eventsource", "ping"}), True),
+    "strict": (
+        frozenset({"media", "websocket", "eventsource", "ping", "font", "manifest", "texttrack"}),
+        True,
+    ),
+}
+
+# Domínios de anúncios e rastreamento bloqueados (subdomínios incluídos)
+DEFAULT_TRACKER_DOMAINS = frozenset({
+    "2mdn.net",
+    "adnxs.com",
+    "adservice.google.com",
+    "amazon-adsystem.com",
+    "bat.bing.com",
+    "clarity.ms",
+    "criteo.com",
+    "criteo.net",
+    "doubleclick.net",
+    "facebook.net",
+    "google-analytics.com",
+    "googleadservices.com",
+    "googlesyndication.com",
+    "googletagmanager.com",
+    "googletagservices.com",
+    "hotjar.com",
+    "mixpanel.com",
+    "outbrain.com",
+    "quantserve.com",
+    "scorecardresearch.com",
+    "segment.io",
+    "taboola.com",
+})
+
+
+def load_tracker_domains(path: Optional[str]) -> FrozenSet[str]:
+    """
+    Lê uma lista extra de domínios, um por linha (linhas com # são ignoradas).
+
+    Returns:
+        FrozenSet[str]: Domínios padrão mais os do arquivo, se informado
+    """
+    domains = set(DEFAULT_TRACKER_DOMAINS)
+    if path:
+        with open(path) as f:
+            for line in f:
+                domain = line.split("#", 1)[0].strip().lower().lstrip(".")
+                if domain:
+                    domains.add(domain)
+    return frozenset(domains)
+
+
+def is_tracker(url: str, domains: FrozenSet[str]) -> bool:
+    """Indica se o host da URL é um dos domínios ou subdomínio de um deles."""
+    labels = (urlsplit(url).hostname or "").split(".")
+    return any(".".join(labels[i:]) in domains for i in range(len(labels)))
+
+
+class BlockPolicy:
+    """
+    Conjunto de tipos de recurso bloqueados e bloqueio de rastreadores.
+
+    A política é representada por um token canônico (ex.:
+    ``"media,ping;trackers"``), usado na chave de cache e repassado ao worker.
+    """
+
+    def __init__(
+        self,
+        resource_types: Iterable[str] = (),
+        block_trackers: bool = False,
+        tracker_domains: FrozenSet[str] = DEFAULT_TRACKER_DOMAINS
+    ) -> None:
+        self.resource_types = frozenset(resource_types)
+        self.block_trackers = block_trackers
+        self.tracker_domains = tracker_domains
+
+    @property
+    def token(self) -> str:
+        """Representação canônica da política ("" quando nada é bloqueado)."""
+        token = ",".join(sorted(self.resource_types))
+        if self.block_trackers:
+            token += ";trackers"
+        return token
+
+    @classmethod
+    def from_token(
+        cls,
+        token: str,
+        tracker_domains: FrozenSet[str] = DEFAULT_TRACKER_DOMAINS
+    ) -> "BlockPolicy":
+        """Reconstrói a política a partir do token."""
+        types, _, flags = token.partition(";")
+        return cls(
+            [t for t in types.split(",") if t],
+            block_trackers=flags == "trackers",
+            tracker_domains=tracker_domains
+        )
+
+    def __bool__(self) -> bool:
+        return bool(self.resource_types) or self.block_trackers
+
+    def blocks(self, resource_type: str, url: str) -> bool:
+        """
+        Indica se a requisição deve ser abortada.
+
+        Documentos só são bloqueados por rastreador (iframes de anúncio); quem
+        chama não deve aplicar a política à navegação principal.
+        """
+        if resource_type in self.resource_types:
+            return True
+        return self.block_trackers and is_tracker(url, self.tracker_domains)
+
+
+def resolve_block_policy(profile: str, extra_types: Iterable[str] = ()) -> BlockPolicy:
+    """
+    Monta a política a partir de um perfil e de tipos de recurso adicionais.
+
+    Raises:
+        ValueError: Se o perfil ou algum tipo de recurso for desconhecido
+    """
+    if profile not in BLOCK_PROFILES:
+        raise ValueError(
+            f"Perfil de bloqueio inválido. Use: {', '.join(sorted(BLOCK_PROFILES))}"
+        )
+    extra = {t.strip().lower() for t in extra_types if t.strip()}
+    unknown = extra - BLOCKABLE_RESOURCE_TYPES
+    if unknown:
+        raise ValueError(f"Tipo de recurso inválido: {', '.join(sorted(unknown))}")
+    types, block_trackers = BLOCK_PROFILES[profile]
+    return BlockPolicy(types | extra, block_trackers)
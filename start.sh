@@ -50,13 +50,31 @@ wait_for_redis() {
 # Função para iniciar o Celery Worker
 start_celery() {
     log "Iniciando Celery Worker..."
-    celery -A main.celery_app worker --loglevel=info
+    # Filas consumidas (ex.: WORKER_QUEUES=screenshots.heavy para um worker dedicado)
+    celery -A main.celery_app worker --loglevel=info \
+        -Q "${WORKER_QUEUES:-screenshots.cheap,screenshots.heavy,celery}"
+}
+
+# Função para iniciar o Celery Beat (tarefas periódicas do cache)
+start_beat() {
+    log "Iniciando Celery Beat..."
+    celery -A main.celery_app beat --loglevel=info --schedule /tmp/celerybeat-schedule
 }
 
 # Função para iniciar o FastAPI
 start_api() {
     log "Iniciando FastAPI..."
-    uvicorn main:app --host 0.0.0.0 --port 8000 --reload
+    # Desenvolvimento: um processo com recarga automática
+    if [ "${API_RELOAD}" = "true" ]; then
+        uvicorn main:app --host 0.0.0.0 --port 8000 --reload
+        return
+    fi
+    # Métricas agregadas entre os workers: o diretório começa vazio
+    if [ -n "${PROMETHEUS_MULTIPROC_DIR}" ]; then
+        rm -rf "${PROMETHEUS_MULTIPROC_DIR}"
+        mkdir -p "${PROMETHEUS_MULTIPROC_DIR}"
+    fi
+    gunicorn -c gunicorn.conf.py main:app
 }
 
 # Verifica se o Redis está disponível
@@ -74,8 +92,11 @@ case "${SERVICO}" in
     "api")
         start_api
         ;;
+    "beat")
+        start_beat
+        ;;
     *)
-        log "ERRO: Variável SERVICO não definida ou inválida. Use 'api' ou 'celery'."
+        log "ERRO: Variável SERVICO não definida ou inválida. Use 'api', 'celery' ou 'beat'."
         exit 1
         ;;
 esac 
\ No newline at end of file
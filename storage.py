@@ -0,0 +1,236 @@
+"""Armazenamento das capturas: sistema de arquivos local ou object storage S3."""
+import os
+import time
+import uuid
+from abc import ABC, abstractmethod
+from email.utils import parsedate_to_datetime
+from typing import Iterator, NamedTuple, Optional
+
+try:
+    # Backend S3 (dependência opcional)
+    import boto3
+except ImportError:
+    boto3 = None
+
+STORAGE_BACKENDS = ("local", "s3")
+
+
+class StorageError(OSError):
+    """Falha do backend de armazenamento remoto."""
+
+
+class StoredObject(NamedTuple):
+    """Metadados de um objeto armazenado."""
+    name: str
+    size: int
+    mtime: float
+
+
+class Storage(ABC):
+    """
+    Interface dos backends de armazenamento.
+
+    Os objetos são identificados por nome (ex.: ``<chave>_q80.jpg``); nenhum
+    caminho local sai do backend, então API e workers podem rodar em máquinas
+    diferentes. Objetos ausentes geram ``FileNotFoundError`` e as demais falhas
+    ``OSError`` (``StorageError`` nos backends remotos). A escrita é
+    atômica: leitores veem o objeto antigo ou o novo, nunca um parcial.
+    """
+
+    @abstractmethod
+    def stat(self, name: str) -> Optional[StoredObject]:
+        """Metadados do objeto, ou None se ele não existir."""
+
+    @abstractmethod
+    def read(self, name: str) -> bytes:
+        """Conteúdo do objeto."""
+
+    @abstractmethod
+    def write(self, name: str, data: bytes, mtime: Optional[float] = None) -> StoredObject:
+        """Grava o objeto com o mtime dado (padrão: agora)."""
+
+    @abstractmethod
+    def delete(self, name: str) -> None:
+        """Remove o objeto, se existir."""
+
+    @abstractmethod
+    def iter_objects(self) -> Iterator[StoredObject]:
+        """Percorre todos os objetos armazenados."""
+
+    def local_path(self, name: str) -> Optional[str]:
+        """Caminho local do objeto, para envio direto do arquivo, se houver."""
+        return None
+
+    @abstractmethod
+    def check(self) -> None:
+        """Verifica se o armazenamento está acessível (levanta exceção se não)."""
+
+
+class LocalStorage(Storage):
+    """
+    Objetos em disco, em subdiretórios pelo prefixo do nome (``ab/cd/abcd…``).
+
+    Os nomes começam pelo hash da renderização, então os subdiretórios ficam
+    equilibrados e as variantes ficam junto da captura mestre. A escrita usa
+    um arquivo temporário no mesmo diretório seguido de ``os.replace``.
+    """
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+
+    def local_path(self, name: str) -> str:
+        return os.path.join(self.directory, name[:2], name[2:4], name)
+
+    def stat(self, name: str) -> Optional[StoredObject]:
+        try:
+            stat = os.stat(self.local_path(name))
+        except FileNotFoundError:
+            return None
+        return StoredObject(name, stat.st_size, stat.st_mtime)
+
+    def read(self, name: str) -> bytes:
+        with open(self.local_path(name), "rb") as f:
+            return f.read()
+
+    def write(self, name: str, data: bytes, mtime: Optional[float] = None) -> StoredObject:
+        path = self.local_path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = os.path.join(os.path.dirname(path), f".{name}.{uuid.uuid4().hex}.tmp")
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            if mtime is not None:
+                os.utime(tmp_path, (mtime, mtime))
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+        return StoredObject(name, len(data), os.path.getmtime(path))
+
+    def delete(self, name: str) -> None:
+        try:
+            os.remove(self.local_path(name))
+        except FileNotFoundError:
+            pass
+
+    def iter_objects(self) -> Iterator[StoredObject]:
+        for root, _, files in os.walk(self.directory):
+            if os.path.relpath(root, self.directory).count(os.sep) != 1:
+                # Só os subdiretórios de dois níveis guardam objetos
+                continue
+            for name in files:
+                if name.startswith("."):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(root, name))
+                except FileNotFoundError:
+                    continue
+                yield StoredObject(name, stat.st_size, stat.st_mtime)
+
+    def check(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+
+
+class S3Storage(Storage):
+    """
+    Objetos em um bucket S3 ou compatível (MinIO, R2, etc.).
+
+    O mtime da captura fica nos metadados do objeto (``x-amz-meta-mtime``),
+    já que o ``LastModified`` do S3 não pode ser definido; as variantes
+    herdam o mtime da captura mestre como no disco. O ``PUT`` do S3 já é
+    atômico.
+    """
+
+    def __init__(self, bucket: str, prefix: str = "", client=None, **client_options) -> None:
+        if client is None:
+            if boto3 is None:
+                raise RuntimeError("O backend S3 requer o pacote boto3")
+            client = boto3.client("s3", **client_options)
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix
+
+    def _key(self, name: str) -> str:
+        return self.prefix + name
+
+    def _call(self, method: str, name: Optional[str] = None, **params):
+        # Converte os erros do cliente para FileNotFoundError/StorageError
+        if name is not None:
+            params["Key"] = self._key(name)
+        try:
+            return getattr(self.client, method)(Bucket=self.bucket, **params)
+        except Exception as e:
+            code = getattr(e, "response", {}).get("Error", {}).get("Code")
+            if code in ("404", "NoSuchKey", "NotFound"):
+                raise FileNotFoundError(name or self.bucket) from e
+            raise StorageError(f"{method} {name or self.bucket}: {e}") from e
+
+    @staticmethod
+    def _mtime(metadata: dict, last_modified) -> float:
+        try:
+            return float(metadata["mtime"])
+        except (KeyError, ValueError):
+            pass
+        if isinstance(last_modified, str):
+            return parsedate_to_datetime(last_modified).timestamp()
+        return last_modified.timestamp()
+
+    def stat(self, name: str) -> Optional[StoredObject]:
+        try:
+            head = self._call("head_object", name)
+        except FileNotFoundError:
+            return None
+        return StoredObject(
+            name, head["ContentLength"], self._mtime(head.get("Metadata", {}), head["LastModified"])
+        )
+
+    def read(self, name: str) -> bytes:
+        return self._call("get_object", name)["Body"].read()
+
+    def write(self, name: str, data: bytes, mtime: Optional[float] = None) -> StoredObject:
+        mtime = time.time() if mtime is None else mtime
+        self._call("put_object", name, Body=data, Metadata={"mtime": repr(mtime)})
+        return StoredObject(name, len(data), mtime)
+
+    def delete(self, name: str) -> None:
+        self._call("delete_object", name)
+
+    def iter_objects(self) -> Iterator[StoredObject]:
+        # A listagem não traz os metadados; o LastModified aproxima o mtime
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self.prefix):
+            for entry in page.get("Contents", []):
+                yield StoredObject(
+                    entry["Key"][len(self.prefix):],
+                    entry["Size"],
+                    self._mtime({}, entry["LastModified"])
+                )
+
+    def check(self) -> None:
+        self._call("head_bucket")
+
+
+def create_storage(
+    backend: str,
+    directory: str,
+    bucket: Optional[str] = None,
+    prefix: str = "",
+    endpoint_url: Optional[str] = None
+) -> Storage:
+    """
+    Cria o backend configurado.
+
+    Raises:
+        ValueError: Se o backend for desconhecido ou faltar o bucket do S3
+    """
+    if backend == "local":
+        return LocalStorage(directory)
+    if backend == "s3":
+        if not bucket:
+            raise ValueError("STORAGE_S3_BUCKET é obrigatório com STORAGE_BACKEND=s3")
+        options = {"endpoint_url": endpoint_url} if endpoint_url else {}
+        return S3Storage(bucket, prefix, **options)
+    raise ValueError(f"Backend de armazenamento inválido. Use: {', '.join(STORAGE_BACKENDS)}")
@@ -0,0 +1,204 @@
+"""Cache em disco, local ao worker, de subrecursos estáticos das páginas."""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Cabeçalhos que não podem ser repetidos ao reenviar o corpo já decodificado
+_DROPPED_HEADERS = {
+    "age", "connection", "content-encoding", "content-length", "keep-alive",
+    "set-cookie", "transfer-encoding",
+}
+
+
+def _parse_date(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def freshness_lifetime(headers: Dict[str, str], now: Optional[float] = None) -> Optional[float]:
+    """
+    Calcula por quantos segundos a resposta pode ser reutilizada.
+
+    Segue as regras de um cache compartilhado: ``no-store``, ``no-cache`` e
+    ``private`` impedem o armazenamento; ``s-maxage`` tem precedência sobre
+    ``max-age``, que tem precedência sobre ``Expires``. Respostas sem validade
+    explícita ou com ``Vary`` além de ``Accept-Encoding`` não são guardadas.
+
+    Args:
+        headers: Cabeçalhos da resposta (nomes em minúsculas)
+        now: Momento de referência (padrão: agora)
+
+    Returns:
+        Optional[float]: Segundos restantes de validade, ou None se não cacheável
+    """
+    now = time.time() if now is None else now
+    vary = {v.strip().lower() for v in headers.get("vary", "").split(",") if v.strip()}
+    if vary - {"accept-encoding"}:
+        return None
+
+    directives = {}
+    for part in headers.get("cache-control", "").lower().split(","):
+        name, _, value = part.strip().partition("=")
+        if name:
+            directives[name] = value.strip('"')
+    if {"no-store", "no-cache", "private"} & directives.keys():
+        return None
+
+    age = 0.0
+    try:
+        age = float(headers.get("age", 0))
+    except ValueError:
+        pass
+
+    for name in ("s-maxage", "max-age"):
+        if name in directives:
+            try:
+                return float(directives[name]) - age
+            except ValueError:
+                return None
+
+    expires = _parse_date(headers.get("expires"))
+    if expires is None:
+        return None
+    date = _parse_date(headers.get("date")) or now
+    return expires - date - age
+
+
+class SubresourceCache:
+    """
+    Guarda respostas de CSS, JS, fontes e imagens para reutilizar entre capturas.
+
+    Cada entrada tem dois arquivos no diretório: o corpo e os metadados
+    (status, cabeçalhos e validade). As entradas seguem a validade informada
+    pela origem e as menos usadas são removidas ao passar de ``max_size``.
+    É seguro usar a partir de várias threads.
+    """
+
+    def __init__(self, directory: str, max_size: int, max_entry_size: int) -> None:
+        self.directory = directory
+        self.max_size = max_size
+        self.max_entry_size = max_entry_size
+        self._lock = threading.Lock()
+        self._entries: Optional["OrderedDict[str, int]"] = None
+        self._total = 0
+
+    def _paths(self, name: str) -> Tuple[str, str]:
+        base = os.path.join(self.directory, name)
+        return f"{base}.body", f"{base}.json"
+
+    def _load(self) -> "OrderedDict[str, int]":
+        # Chamado com o lock; reconstrói o índice LRU a partir do disco
+        if self._entries is None:
+            os.makedirs(self.directory, exist_ok=True)
+            found = []
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    if entry.name.endswith(".body"):
+                        stat = entry.stat()
+                        found.append((stat.st_mtime, entry.name[:-5], stat.st_size))
+            self._entries = OrderedDict((name, size) for _, name, size in sorted(found))
+            self._total = sum(self._entries.values())
+        return self._entries
+
+    def _drop(self, name: str) -> None:
+        # Chamado com o lock
+        self._total -= self._load().pop(name, 0)
+        for path in self._paths(name):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    @staticmethod
+    def entry_name(url: str) -> str:
+        """Nome do arquivo da entrada de uma URL."""
+        return hashlib.sha256(url.encode()).hexdigest()
+
+    def get(self, url: str) -> Optional[dict]:
+        """
+        Busca uma resposta ainda válida.
+
+        Returns:
+            Optional[dict]: ``status``, ``headers`` e ``body``, ou None
+        """
+        name = self.entry_name(url)
+        body_path, meta_path = self._paths(name)
+        with self._lock:
+            entries = self._load()
+            if name not in entries:
+                return None
+            try:
+                with open(meta_path) as f:
+                    meta = json.load(f)
+                if meta["url"] != url or meta["expires"] <= time.time():
+                    self._drop(name)
+                    return None
+                with open(body_path, "rb") as f:
+                    body = f.read()
+            except (OSError, ValueError, KeyError):
+                self._drop(name)
+                return None
+            entries.move_to_end(name)
+        return {"status": meta["status"], "headers": meta["headers"], "body": body}
+
+    def put(self, url: str, status: int, headers: Dict[str, str], body: bytes) -> bool:
+        """
+        Guarda a resposta se a origem permitir.
+
+        Returns:
+            bool: True se a resposta foi guardada
+        """
+        headers = {k.lower(): v for k, v in headers.items()}
+        if status != 200 or len(body) > self.max_entry_size:
+            return False
+        lifetime = freshness_lifetime(headers)
+        if lifetime is None or lifetime <= 0:
+            return False
+
+        name = self.entry_name(url)
+        body_path, meta_path = self._paths(name)
+        meta = {
+            "url": url,
+            "status": status,
+            "headers": {k: v for k, v in headers.items() if k not in _DROPPED_HEADERS},
+            "expires": time.time() + lifetime,
+        }
+        with self._lock:
+            entries = self._load()
+            try:
+                # Grava em arquivos temporários e renomeia para não expor entradas parciais;
+                # únicos por escritor, pois outros processos usam o mesmo diretório
+                for path, data, mode in ((body_path, body, "wb"), (meta_path, json.dumps(meta), "w")):
+                    tmp_path = f"{path}.{os.getpid()}.{uuid.uuid4().hex}.tmp"
+                    try:
+                        with open(tmp_path, mode) as f:
+                            f.write(data)
+                        os.replace(tmp_path, path)
+                    except OSError:
+                        try:
+                            os.remove(tmp_path)
+                        except FileNotFoundError:
+                            pass
+                        raise
+            except OSError as e:
+                logger.warning(f"Erro ao gravar subrecurso no cache: {e}")
+                self._drop(name)
+                return False
+            self._total += len(body) - entries.pop(name, 0)
+            entries[name] = len(body)
+            while self._total > self.max_size and entries:
+                self._drop(next(iter(entries)))
+        return name in entries
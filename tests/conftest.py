@@ -0,0 +1,130 @@
+import fakeredis
+import pytest
+
+import browser_pool
+import main
+from admission import AdmissionController
+from batches import BatchStore
+from cache_index import CacheIndex
+from memory_cache import MemoryCache
+from politeness import HostScheduler
+from popularity import PopularityTracker
+from storage import LocalStorage
+
+
+@pytest.fixture
+def fake_redis(monkeypatch, tmp_path):
+    server = fakeredis.FakeServer()
+    client = fakeredis.FakeRedis(server=server, decode_responses=True)
+    monkeypatch.setattr(main, "redis_client", client)
+    monkeypatch.setattr(
+        main,
+        "async_redis_client",
+        fakeredis.aioredis.FakeRedis(server=server, decode_responses=True),
+    )
+    storage = LocalStorage(str(tmp_path))
+    monkeypatch.setattr(main, "CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(main, "storage", storage)
+    monkeypatch.setattr(
+        main,
+        "cache_index",
+        CacheIndex(client, storage, main.MAX_CACHE_SIZE, main.CACHE_EXPIRY),
+    )
+    monkeypatch.setattr(main, "batch_store", BatchStore(client, main.BATCH_TTL))
+    monkeypatch.setattr(
+        main,
+        "admission",
+        AdmissionController(
+            client,
+            main.ADMISSION_MAX_DEPTH,
+            main.ADMISSION_MAX_WAIT,
+            main.ADMISSION_DEFAULT_DURATION,
+            main.RENDER_MAX_PAGES,
+        ),
+    )
+    monkeypatch.setattr(
+        main,
+        "host_scheduler",
+        HostScheduler(client, main.HOST_MAX_CONCURRENCY, main.HOST_MIN_INTERVAL, main.HOST_BURST),
+    )
+    monkeypatch.setattr(
+        main,
+        "memory_cache",
+        MemoryCache(main.MEMORY_CACHE_MAX_SIZE, main.MEMORY_CACHE_MAX_ENTRY, main.MEMORY_CACHE_TTL),
+    )
+    monkeypatch.setattr(
+        main,
+        "popularity",
+        PopularityTracker(client, main.POPULARITY_HALF_LIFE, main.POPULARITY_MAX_ENTRIES),
+    )
+    return client
+
+
+class FakeBrowserContext:
+    def __init__(self, browser):
+        self.browser = browser
+        self.closed = False
+
+    async def new_page(self):
+        return FakeBrowserPage()
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeBrowserPage:
+    def __init__(self):
+        self.closed = False
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeBrowser:
+    version = "fake"
+
+    def __init__(self):
+        self.connected = True
+        self.closed = False
+        self.fail_new_context = False
+        self.contexts = []
+
+    def is_connected(self):
+        return self.connected and not self.closed
+
+    async def new_context(self, **kwargs):
+        if self.fail_new_context:
+            raise RuntimeError("Target closed")
+        context = FakeBrowserContext(self)
+        self.contexts.append(context)
+        return context
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeChromium:
+    """Playwright falso: cada ``launch`` devolve um ``FakeBrowser`` novo."""
+
+    def __init__(self):
+        self.browsers = []
+        self.chromium = self
+        self.stopped = False
+
+    async def launch(self, headless=True):
+        browser = FakeBrowser()
+        self.browsers.append(browser)
+        return browser
+
+    async def start(self):
+        return self
+
+    async def stop(self):
+        self.stopped = True
+
+
+@pytest.fixture
+def fake_chromium(monkeypatch):
+    chromium = FakeChromium()
+    monkeypatch.setattr(browser_pool, "async_playwright", lambda: chromium)
+    return chromium
@@ -0,0 +1,83 @@
+import fakeredis
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from admission import (
+    QUEUE_CHEAP, QUEUE_HEAVY, AdmissionController, cost_queue, priority_lists
+)
+
+client = TestClient(main.app)
+
+
+@pytest.fixture
+def controller():
+    client = fakeredis.FakeRedis(decode_responses=True)
+    return AdmissionController(
+        client, max_depth=10, max_wait=20, default_duration=10, default_slots=2
+    )
+
+
+def _enqueue(controller, queue, count):
+    for n in range(count):
+        controller.client.rpush(queue, f"task-{n}")
+
+
+def test_cost_queue_and_priority_lists():
+    assert cost_queue(False, False) == QUEUE_CHEAP
+    assert cost_queue(True, False) == QUEUE_HEAVY
+    assert cost_queue(False, True) == QUEUE_HEAVY
+    assert priority_lists("q", 0) == ["q"]
+    assert priority_lists("q", 6) == ["q", "q:3", "q:6"]
+
+
+def test_estimated_wait_uses_measured_duration_and_slots(controller):
+    _enqueue(controller, "q", 4)
+    _enqueue(controller, "q:6", 4)
+    controller.record_duration("q", 5)
+    controller.register_worker("worker-1", ["q"], slots=4, ttl=30)
+
+    assert controller.estimated_wait("q", 0) == 5
+    assert controller.estimated_wait("q", 6) == 10
+
+
+def test_check_returns_429_then_503(controller):
+    assert controller.check("q", 3) is None
+
+    _enqueue(controller, "q", 5)
+    rejection = controller.check("q", 3)
+    assert rejection.status_code == 429
+    assert rejection.retry_after >= 1
+
+    _enqueue(controller, "q", 5)
+    assert controller.check("q", 3).status_code == 503
+
+
+def test_endpoint_answers_429_with_retry_after(fake_redis, monkeypatch):
+    enqueued = []
+    monkeypatch.setattr(
+        main.capture_screenshot_task,
+        "apply_async",
+        lambda **kwargs: enqueued.append(kwargs),
+    )
+    monkeypatch.setattr(main.admission, "max_wait", 0)
+    for n in range(3):
+        fake_redis.rpush(QUEUE_CHEAP, f"task-{n}")
+
+    params = {"url": "https://example.com/", "scroll_page_flag": False}
+    response = client.get("/screenshot", params=params)
+
+    assert response.status_code == 429
+    assert int(response.headers["retry-after"]) >= 1
+    assert enqueued == []
+    # A reserva de renderização é liberada ao recusar
+    assert fake_redis.keys("screenshot:inflight:*") == []
+
+    response = client.get("/screenshot", params={**params, "priority": "high"})
+    assert response.status_code == 429
+
+    fake_redis.delete(QUEUE_CHEAP)
+    response = client.get("/screenshot", params=params)
+    assert response.status_code == 200
+    assert enqueued[0]["queue"] == QUEUE_CHEAP
+    assert enqueued[0]["priority"] == 3
@@ -0,0 +1,127 @@
+import io
+import json
+import zipfile
+from concurrent.futures import Future
+
+from fastapi.testclient import TestClient
+from PIL import Image
+
+import main
+from batches import ITEM_COMPLETED, ITEM_FAILED
+from cache_keys import render_key
+
+client = TestClient(main.app)
+
+
+def _png():
+    image = io.BytesIO()
+    Image.new("RGB", (16, 16), "green").save(image, format="PNG")
+    return image.getvalue()
+
+
+def _failed_future(error):
+    future = Future()
+    future.set_exception(error)
+    return future
+
+
+def test_create_batch_splits_urls_into_chunks(fake_redis, monkeypatch):
+    calls = []
+    monkeypatch.setattr(main, "BATCH_CHUNK_SIZE", 2)
+    monkeypatch.setattr(
+        main.capture_batch_task,
+        "apply_async",
+        lambda args, **options: calls.append(args),
+    )
+    urls = [f"https://example.com/{n}" for n in range(5)]
+
+    response = client.post("/screenshots/batch", json={"urls": urls})
+
+    assert response.status_code == 202
+    batch_id = response.json()["batch_id"]
+    assert [len(chunk) for _, chunk, _ in calls] == [2, 2, 1]
+    assert calls[2][1] == [(4, "https://example.com/4")]
+    progress = client.get(f"/screenshots/batch/{batch_id}").json()
+    assert progress["pending"] == 5
+    assert progress["status"] == "processing"
+
+
+def test_create_batch_rejects_invalid_url(fake_redis):
+    response = client.post("/screenshots/batch", json={"urls": ["ftp://example.com"]})
+    assert response.status_code == 400
+
+
+def test_create_batch_accepts_custom_view(fake_redis, monkeypatch):
+    calls = []
+    monkeypatch.setattr(
+        main.capture_batch_task,
+        "apply_async",
+        lambda args, **options: calls.append(args),
+    )
+
+    response = client.post("/screenshots/batch", json={
+        "urls": ["https://example.com/"],
+        "options": {"view": "custom:800x600"},
+    })
+
+    assert response.status_code == 202
+    assert calls[0][2]["view"] == main.validate_view("custom:800x600")
+
+
+def test_create_batch_rejects_invalid_view(fake_redis):
+    response = client.post("/screenshots/batch", json={
+        "urls": ["https://example.com/"],
+        "options": {"view": "tablet"},
+    })
+    assert response.status_code == 400
+
+
+def test_batch_task_isolates_item_failures(fake_redis, monkeypatch):
+    urls = ["https://ok.example.com/", "https://broken.example.com/"]
+    options = main.BatchOptions().model_dump()
+    batch_id = main.batch_store.create(urls, options)
+
+    def fake_submit(url, **kwargs):
+        if "broken" in url:
+            return _failed_future(RuntimeError("net::ERR_NAME_NOT_RESOLVED"))
+        future = Future()
+        future.set_result(_png())
+        return future
+
+    monkeypatch.setattr(main, "submit_capture", fake_submit)
+
+    result = main.capture_batch_task(batch_id, list(enumerate(urls)), options)
+
+    assert result == {"completed": 1, "failed": 1, "deferred": 0}
+    items = main.batch_store.get_items(batch_id)
+    assert items[0]["status"] == ITEM_COMPLETED
+    assert items[1]["status"] == ITEM_FAILED
+    assert "ERR_NAME_NOT_RESOLVED" in items[1]["error"]
+
+
+def test_batch_results_manifest_and_archive(fake_redis):
+    urls = ["https://a.example.com/", "https://b.example.com/"]
+    options = main.BatchOptions().model_dump()
+    batch_id = main.batch_store.create(urls, options)
+    key = render_key(urls[0], "desktop", False, 0, "networkidle", True, True)
+    name = main.store_capture(key, _png(), 80)
+    main.batch_store.set_item(batch_id, 0, ITEM_COMPLETED, name=name)
+    main.batch_store.set_item(batch_id, 1, ITEM_FAILED, error="Erro")
+
+    image = client.get(f"/screenshots/batch/{batch_id}/items/0")
+    assert image.status_code == 200
+    assert image.headers["content-type"] == "image/jpeg"
+
+    manifest = client.get(f"/screenshots/batch/{batch_id}/manifest")
+    lines = [json.loads(line) for line in manifest.text.splitlines()]
+    assert [line["status"] for line in lines] == ["completed", "failed"]
+    assert "name" not in lines[0]
+
+    archive = client.get(f"/screenshots/batch/{batch_id}/archive")
+    with zipfile.ZipFile(io.BytesIO(archive.content)) as zf:
+        assert zf.namelist() == ["0000.jpg"]
+        assert zf.read("0000.jpg") == image.content
+
+
+def test_unknown_batch_returns_404(fake_redis):
+    assert client.get("/screenshots/batch/missing").status_code == 404
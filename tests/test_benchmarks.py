@@ -0,0 +1,60 @@
+import asyncio
+import urllib.request
+
+import main
+from benchmarks.fixture_site import FixtureSite
+from benchmarks.run import compare, parse_args, percentile, run, summarize
+
+# Estado global da API trocado pelo gerador de carga
+PATCHED = (
+    "redis_client", "async_redis_client", "CACHE_DIR", "storage", "cache_index",
+    "batch_store", "admission", "host_scheduler", "memory_cache", "popularity",
+    "SYNC_MAX_CONCURRENCY", "SYNC_DEADLINE", "sync_semaphore", "api_render_engine",
+    "render_engine",
+)
+
+
+def test_percentile_nearest_rank():
+    samples = [float(n) for n in range(1, 101)]
+    assert percentile(samples, 50) == 50
+    assert percentile(samples, 95) == 95
+    assert percentile(samples, 99) == 99
+    assert percentile([3.0], 99) == 3.0
+    assert percentile([], 50) == 0.0
+
+
+def test_compare_flags_regressions():
+    baseline = {"scenarios": {"cold": summarize([1.0, 1.0, 1.0], 0, 3.0)}}
+    slower = {"scenarios": {"cold": summarize([1.5, 1.5, 1.5], 1, 4.5)}}
+
+    assert compare(baseline, baseline, 0.2) == []
+    regressions = compare(slower, baseline, 0.2)
+    assert any(r.startswith("cold.p95") for r in regressions)
+    assert any(r.startswith("cold.throughput") for r in regressions)
+    assert any(r.startswith("cold.errors") for r in regressions)
+
+
+def test_fixture_site_serves_pages_and_images():
+    with FixtureSite() as site:
+        with urllib.request.urlopen(site.url("/gallery?images=3")) as response:
+            assert response.headers["Content-Type"].startswith("text/html")
+            assert response.read().count(b"<img") == 3
+        with urllib.request.urlopen(site.url("/img/7.png?delay=0")) as response:
+            assert response.headers["Content-Type"] == "image/png"
+            assert "max-age" in response.headers["Cache-Control"]
+
+
+def test_synthetic_run_smoke(monkeypatch):
+    for name in PATCHED:
+        monkeypatch.setattr(main, name, getattr(main, name))
+    for task in (main.capture_screenshot_task, main.capture_batch_task):
+        monkeypatch.setattr(task, "apply_async", task.apply_async)
+    args = parse_args([
+        "--engine", "synthetic", "--synthetic-delay", "0", "--concurrency", "2",
+        "--requests", "4", "--cold-requests", "2", "--batches", "1", "--batch-size", "2",
+    ])
+
+    results = asyncio.run(run(args))
+
+    for name in ("cache_hit", "cold", "batch"):
+        assert results["scenarios"][name]["errors"] == 0
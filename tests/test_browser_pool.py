@@ -0,0 +1,78 @@
+import time
+
+import pytest
+
+from browser_pool import BrowserPool
+
+
+@pytest.mark.asyncio
+async def test_contexts_share_the_browser_until_recycled(fake_chromium):
+    pool = BrowserPool(max_contexts=2)
+    for _ in range(3):
+        async with pool.new_context() as context:
+            assert not context.closed
+        assert context.closed
+
+    first, second = fake_chromium.browsers
+    assert len(first.contexts) == 2 and first.closed
+    assert len(second.contexts) == 1 and not second.closed
+
+
+@pytest.mark.asyncio
+async def test_browser_is_recycled_by_age(fake_chromium):
+    pool = BrowserPool(max_age=60)
+    await pool.start()
+    pool._current.launched_at = time.monotonic() - 61
+
+    async with pool.new_context():
+        pass
+
+    assert len(fake_chromium.browsers) == 2
+    assert fake_chromium.browsers[0].closed
+
+
+@pytest.mark.asyncio
+async def test_disconnected_browser_is_relaunched(fake_chromium):
+    pool = BrowserPool()
+    await pool.start()
+    fake_chromium.browsers[0].connected = False
+
+    async with pool.new_context() as context:
+        assert context.browser is fake_chromium.browsers[1]
+
+
+@pytest.mark.asyncio
+async def test_failed_context_relaunches_browser(fake_chromium):
+    pool = BrowserPool()
+    await pool.start()
+    fake_chromium.browsers[0].fail_new_context = True
+
+    async with pool.new_context() as context:
+        assert context.browser is fake_chromium.browsers[1]
+
+
+@pytest.mark.asyncio
+async def test_retired_browser_closes_after_active_contexts(fake_chromium):
+    pool = BrowserPool(max_contexts=1)
+    async with pool.new_context():
+        # O navegador atingiu o limite mas ainda tem um contexto ativo
+        async with pool.new_context() as newer:
+            old = fake_chromium.browsers[0]
+            assert newer.browser is not old
+            assert not old.closed
+            assert pool.active_contexts == 2
+        assert not old.closed
+    assert old.closed
+    assert pool.active_contexts == 0
+
+
+@pytest.mark.asyncio
+async def test_stop_closes_everything(fake_chromium):
+    pool = BrowserPool()
+    async with pool.new_context():
+        pass
+
+    await pool.stop()
+
+    assert fake_chromium.browsers[0].closed
+    assert fake_chromium.stopped
@@ -0,0 +1,148 @@
+import hashlib
+import time
+
+import fakeredis
+import pytest
+
+from cache_index import CacheIndex, blob_name
+from storage import LocalStorage
+
+
+@pytest.fixture
+def index(tmp_path):
+    client = fakeredis.FakeRedis(decode_responses=True)
+    return CacheIndex(client, LocalStorage(str(tmp_path)), max_size=100, expiry=60)
+
+
+def _write(index, name, size, mtime=None, fill=None):
+    # Conteúdo distinto por nome, exceto quando ``fill`` for repetido
+    return index.store(name, ((fill or name.encode()) * size)[:size], mtime)
+
+
+def test_add_keeps_running_total(index):
+    _write(index, "a.png", 30)
+    _write(index, "b.png", 20)
+    assert index.total_size() == 50
+
+    _write(index, "a.png", 10)
+    assert index.total_size() == 30
+
+    index.remove("b.png")
+    assert index.total_size() == 10
+
+
+def test_identical_content_shares_one_blob(index):
+    first = _write(index, "a.png", 30, fill=b"x")
+    second = _write(index, "b.png", 30, fill=b"x")
+
+    assert first.blob == second.blob
+    assert index.total_size() == 30
+    assert len(list(index.storage.iter_objects())) == 1
+
+    index.remove("a.png")
+    assert index.storage.stat(first.blob) is not None
+    assert index.total_size() == 30
+
+    index.remove("b.png")
+    assert index.storage.stat(first.blob) is None
+    assert index.total_size() == 0
+
+
+def test_rewriting_entry_releases_old_blob(index):
+    old = _write(index, "a.png", 10, fill=b"x")
+    new = _write(index, "a.png", 10, fill=b"y")
+
+    assert index.storage.stat(old.blob) is None
+    assert index.lookup("a.png") == new
+    assert index.total_size() == 10
+
+
+def test_lookup_resolves_entry(index):
+    entry = index.store("k_q80.jpg", b"jpeg", mtime=1000.0, phash="00ff00ff00ff00ff")
+
+    assert entry.blob == blob_name(entry.digest, "k_q80.jpg")
+    assert entry.blob.endswith(".jpg")
+    assert index.lookup("k_q80.jpg") == entry
+    assert index.lookup("missing.png") is None
+
+
+def test_evict_to_fit_removes_least_recently_used(index):
+    entries = {name: _write(index, name, 30) for name in ("a.png", "b.png", "c.png", "d.png")}
+    index.touch("a.png")
+
+    assert index.evict_to_fit(batch_size=1) == 2
+    assert index.total_size() == 60
+    assert index.storage.stat(entries["a.png"].blob) is not None
+    assert index.storage.stat(entries["b.png"].blob) is None
+    assert index.storage.stat(entries["c.png"].blob) is None
+
+
+def test_evict_expired(index):
+    old = _write(index, "old.png", 10, mtime=time.time() - 120)
+    _write(index, "new.png", 10)
+
+    assert index.evict_expired() == 1
+    assert index.total_size() == 10
+    assert index.storage.stat(old.blob) is None
+
+
+def test_reconcile_repairs_index(index):
+    _write(index, "a.png", 10)
+    gone = _write(index, "gone.png", 10)
+    index.storage.delete(gone.blob)
+    index.storage.write("orphan.png", b"x" * 25, mtime=time.time() - 7200)
+    index.storage.write("recent.png", b"x" * 25)
+
+    assert index.reconcile() == {"removed": 1, "orphaned": 1}
+    assert index.total_size() == 10
+    assert index.lookup("gone.png") is None
+    assert index.storage.stat("orphan.png") is None
+    # Blob recente pode ser de uma captura que ainda vai registrá-lo
+    assert index.storage.stat("recent.png") is not None
+
+
+def test_reconcile_keeps_refs_added_concurrently(index, monkeypatch):
+    _write(index, "a.png", 10)
+    content = b"y" * 10
+    # Blob antigo ainda sem entradas, que uma captura vai reaproveitar
+    orphan = blob_name(hashlib.sha256(content).hexdigest(), "late.png")
+    index.storage.write(orphan, content, mtime=time.time() - 7200)
+    iter_objects = index.storage.iter_objects
+
+    def iter_with_store():
+        objects = list(iter_objects())
+        index.store("late.png", content)
+        return iter(objects)
+
+    monkeypatch.setattr(index.storage, "iter_objects", iter_with_store)
+
+    assert index.reconcile() == {"removed": 0, "orphaned": 0}
+    assert index.total_size() == 20
+    assert index.storage.stat(orphan) is not None
+    index.remove("a.png")
+    assert index.total_size() == 10
+    assert index.lookup("late.png") is not None
+
+
+def test_store_rewrites_blob_deleted_concurrently(index, monkeypatch):
+    first = _write(index, "a.png", 10, fill=b"x")
+    add = index.add
+
+    def add_after_eviction(*args, **kwargs):
+        # Outra remoção apaga o blob entre a gravação e o registro
+        index.storage.delete(first.blob)
+        add(*args, **kwargs)
+
+    monkeypatch.setattr(index, "add", add_after_eviction)
+    second = _write(index, "b.png", 10, fill=b"x")
+
+    assert index.storage.stat(second.blob) is not None
+
+
+def test_blob_with_new_reference_is_not_deleted(index):
+    entry = _write(index, "a.png", 10, fill=b"x")
+    _write(index, "b.png", 10, fill=b"x")
+
+    index._delete_blobs(["a.png", entry.digest])
+
+    assert index.storage.stat(entry.blob) is not None
@@ -0,0 +1,66 @@
+import io
+
+from PIL import Image
+
+import main
+from cache_keys import master_name, normalize_url, render_key, variant_name
+
+
+def _render_key(url, **overrides):
+    params = {
+        "view": "desktop",
+        "full_page": False,
+        "wait_time": 0,
+        "wait_until": "networkidle",
+        "wait_for_images_flag": True,
+        "scroll_page_flag": True,
+    }
+    params.update(overrides)
+    return render_key(url, **params)
+
+
+def test_normalize_url():
+    assert (
+        normalize_url("HTTPS://Example.COM:443/a?b=2&a=1#top")
+        == "https://example.com/a?a=1&b=2"
+    )
+    assert normalize_url("http://example.com") == "http://example.com/"
+    assert normalize_url("http://example.com:8080/") == "http://example.com:8080/"
+
+
+def test_render_key_covers_output_parameters():
+    base = _render_key("https://example.com/?b=2&a=1")
+    assert base == _render_key("https://EXAMPLE.com/?a=1&b=2#section")
+    assert base != _render_key("https://example.com/?a=1&b=2", wait_until="load")
+    assert base != _render_key("https://example.com/?a=1&b=2", scroll_page_flag=False)
+    assert base != _render_key("https://example.com/?a=1&b=2", wait_time=500)
+    assert base != _render_key("https://example.com/?a=1&b=2", block="media;trackers")
+
+
+def test_get_cached_variant_transcodes_master(fake_redis):
+    key = _render_key("https://example.com")
+    master = io.BytesIO()
+    Image.new("RGB", (10, 10), "red").save(master, format="PNG")
+    main.write_cache_file(master_name(key), master.getvalue())
+
+    variant = main.get_cached_variant(key, 50)
+
+    assert variant == variant_name(key, 50)
+    assert main.read_cached_file(variant)[:2] == b"\xff\xd8"
+    assert main.get_cached_variant(key, 50) == variant
+    assert main.get_cached_variant(_render_key("https://example.org"), 50) is None
+
+
+def test_get_cached_variant_resizes_to_other_formats(fake_redis):
+    key = _render_key("https://example.com")
+    master = io.BytesIO()
+    Image.new("RGB", (640, 480), "red").save(master, format="PNG")
+    main.write_cache_file(master_name(key), master.getvalue())
+
+    name = main.get_cached_variant(key, 70, fmt="webp", width=320)
+
+    assert name.endswith("_q70_320x0_contain.webp")
+    assert main.get_media_type(name) == "image/webp"
+    with Image.open(io.BytesIO(main.read_cached_file(name))) as image:
+        assert image.size == (320, 240)
+    assert main.get_cached_variant(key, 80, fmt="png") == master_name(key)
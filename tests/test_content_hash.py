@@ -0,0 +1,83 @@
+import io
+
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+
+import main
+from cache_keys import master_name, render_key
+from resource_policy import resolve_block_policy
+
+client = TestClient(main.app)
+
+URL = "https://example.com/"
+
+
+def _png(left, right):
+    image = Image.new("RGB", (64, 64), right)
+    image.paste(Image.new("RGB", (32, 64), left))
+    output = io.BytesIO()
+    image.save(output, format="PNG")
+    return output.getvalue()
+
+
+def _key(url):
+    block = resolve_block_policy(main.BLOCK_PROFILE).token
+    return render_key(url, "desktop", False, 0, "networkidle", True, True, block)
+
+
+def test_identical_captures_share_blobs(fake_redis):
+    master = _png("black", "white")
+    for url in (URL, "https://example.com/?utm_source=mail"):
+        main.store_capture(_key(url), master, 80)
+
+    # Uma captura mestre e uma variante JPEG para as duas URLs
+    assert len(list(main.storage.iter_objects())) == 2
+    entry = main.cache_index.lookup(master_name(_key(URL)))
+    assert main.cache_index.total_size() == entry.size + main.cache_index.lookup(
+        main.get_cached_variant(_key(URL), 80)
+    ).size
+
+
+def test_since_returns_not_modified_when_unchanged(fake_redis):
+    main.store_capture(_key(URL), _png("black", "white"), 80)
+
+    response = client.get("/screenshot", params={"url": URL})
+    phash = response.headers["x-perceptual-hash"]
+    assert response.status_code == 200
+
+    unchanged = client.get("/screenshot", params={"url": URL, "since": phash})
+    assert unchanged.status_code == 304
+    assert unchanged.content == b""
+    assert unchanged.headers["x-perceptual-hash"] == phash
+
+    main.store_capture(_key(URL), _png("white", "black"), 80)
+    # A camada em memória da API só acompanha a nova captura após o TTL
+    main.memory_cache.clear()
+    changed = client.get("/screenshot", params={"url": URL, "since": phash})
+    assert changed.status_code == 200
+    assert changed.headers["x-perceptual-hash"] != phash
+
+
+@pytest.mark.parametrize("since", ["abc", "zzzzzzzzzzzzzzzz"])
+def test_invalid_since(fake_redis, since):
+    response = client.get("/screenshot", params={"url": URL, "since": since})
+    assert response.status_code == 400
+
+
+def test_missing_blob_is_a_cache_miss(fake_redis, monkeypatch):
+    enqueued = []
+    monkeypatch.setattr(
+        main.capture_screenshot_task,
+        "apply_async",
+        lambda kwargs, task_id, **options: enqueued.append(task_id)
+    )
+    variant = main.store_capture(_key(URL), _png("black", "white"), 80)
+    # Blob apagado por uma remoção simultânea depois da busca no índice
+    main.storage.delete(main.cache_index.lookup(variant).blob)
+
+    response = client.get("/screenshot", params={"url": URL})
+
+    assert response.status_code == 200
+    assert response.json()["status"] == "processing"
+    assert len(enqueued) == 1
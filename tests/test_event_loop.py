@@ -0,0 +1,77 @@
+import asyncio
+import io
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+from prometheus_client import REGISTRY
+
+import main
+import metrics
+
+client = TestClient(main.app)
+
+
+@pytest.mark.asyncio
+async def test_monitor_event_loop_measures_blocking():
+    before = REGISTRY.get_sample_value("screenshot_event_loop_lag_seconds_sum") or 0
+    monitor = asyncio.create_task(metrics.monitor_event_loop(0.01))
+    await asyncio.sleep(0.02)
+    # Bloqueia o loop de propósito: a próxima medição passa do intervalo
+    time.sleep(0.1)
+    await asyncio.sleep(0.03)
+    monitor.cancel()
+
+    lag = REGISTRY.get_sample_value("screenshot_event_loop_lag_seconds_sum") - before
+    assert 0.05 <= lag < 1
+
+
+def test_enqueue_runs_off_the_event_loop(fake_redis, monkeypatch):
+    threads = []
+    monkeypatch.setattr(
+        main.capture_screenshot_task,
+        "apply_async",
+        lambda kwargs, task_id, **options: threads.append(threading.current_thread().name)
+    )
+
+    response = client.get("/screenshot", params={"url": "https://example.com/"})
+
+    assert response.json()["status"] == "processing"
+    assert len(threads) == 1
+    assert threads[0].startswith("api-io")
+
+
+def test_sync_host_slot_runs_off_the_event_loop(fake_redis, monkeypatch):
+    class Engine:
+        async def render(self, pipeline, **kwargs):
+            output = io.BytesIO()
+            Image.new("RGB", (8, 8), "white").save(output, format="PNG")
+            return output.getvalue()
+
+    threads = []
+    scheduler = main.host_scheduler
+    monkeypatch.setattr(main, "api_render_engine", Engine())
+    monkeypatch.setattr(
+        scheduler, "acquire",
+        lambda host: threads.append(threading.current_thread().name) or "token"
+    )
+    monkeypatch.setattr(
+        scheduler, "release",
+        lambda host, token: threads.append(threading.current_thread().name)
+    )
+
+    response = client.get("/screenshot", params={"url": "https://example.com/", "sync": True})
+
+    assert response.status_code == 200
+    assert len(threads) == 2
+    assert all(name.startswith("api-io") for name in threads)
+
+
+def test_health_uses_async_redis(fake_redis):
+    response = client.get("/health")
+
+    assert response.status_code == 200
+    assert response.json()["redis"] == "connected"
+    assert response.json()["event_loop_lag"] >= 0
@@ -0,0 +1,104 @@
+import io
+
+import pytest
+from PIL import Image
+
+import main
+from readiness import CaptureBudget
+
+
+class FakePage:
+    """Página que desenha cada faixa com uma cor derivada da posição."""
+
+    def __init__(self, height, width=100, viewport_height=50, scale=1):
+        self.height = height
+        self.width = width
+        self.scale = scale
+        self.viewport_size = {"width": width, "height": viewport_height}
+        self.clips = []
+
+    async def evaluate(self, script, arg=None):
+        return [self.width, self.height, self.scale]
+
+    async def screenshot(self, type="png", full_page=False, clip=None):
+        if clip is None:
+            size = (self.width, self.height)
+            color = (0, 0, 0)
+        else:
+            self.clips.append(clip)
+            size = (round(clip["width"] * self.scale), round(clip["height"] * self.scale))
+            color = (clip["y"] % 256, 0, 0)
+        output = io.BytesIO()
+        Image.new("RGB", size, color).save(output, format="PNG")
+        return output.getvalue()
+
+
+@pytest.mark.asyncio
+async def test_full_page_is_captured_in_tiles():
+    page = FakePage(height=120)
+    budget = CaptureBudget(10)
+
+    png = await main.capture_full_page(page, budget)
+
+    assert [clip["y"] for clip in page.clips] == [0, 50, 100]
+    assert page.clips[-1]["height"] == 20
+    assert budget.timings["tiles"] == 3
+    with Image.open(io.BytesIO(png)) as image:
+        assert image.size == (100, 120)
+        assert image.getpixel((0, 0)) == (0, 0, 0)
+        assert image.getpixel((0, 60)) == (50, 0, 0)
+        assert image.getpixel((0, 119)) == (100, 0, 0)
+        assert "Truncated" not in image.text
+
+
+@pytest.mark.asyncio
+async def test_full_page_is_truncated_at_max_height(monkeypatch):
+    monkeypatch.setattr(main, "FULLPAGE_MAX_HEIGHT", 100)
+    page = FakePage(height=1000, scale=2)
+    budget = CaptureBudget(10)
+
+    png = await main.capture_full_page(page, budget)
+
+    assert len(page.clips) == 2
+    assert budget.timings["truncated"] is True
+    with Image.open(io.BytesIO(png)) as image:
+        assert image.size == (200, 200)
+        assert image.text == {"Truncated": "1000"}
+
+
+@pytest.mark.asyncio
+async def test_full_page_is_truncated_at_max_tiles(monkeypatch):
+    monkeypatch.setattr(main, "FULLPAGE_MAX_TILES", 3)
+    page = FakePage(height=1000)
+
+    png = await main.capture_full_page(page, CaptureBudget(10))
+
+    assert len(page.clips) == 3
+    with Image.open(io.BytesIO(png)) as image:
+        assert image.size == (100, 150)
+
+
+@pytest.mark.asyncio
+async def test_short_page_uses_single_screenshot():
+    page = FakePage(height=40)
+
+    png = await main.capture_full_page(page, CaptureBudget(10))
+
+    assert page.clips == []
+    with Image.open(io.BytesIO(png)) as image:
+        assert image.size == (100, 40)
+
+
+def test_oversized_capture_serves_master(fake_redis, monkeypatch):
+    def bomb(*args, **kwargs):
+        raise Image.DecompressionBombError("grande demais")
+
+    monkeypatch.setattr(main, "perceptual_hash", bomb)
+    monkeypatch.setattr(main, "encode_rendition", bomb)
+    master = io.BytesIO()
+    Image.new("RGB", (10, 10)).save(master, format="PNG")
+
+    name = main.store_capture("key", master.getvalue(), 80, fmt="jpeg")
+
+    assert name == "key.png"
+    assert main.read_cached_file(name) == master.getvalue()
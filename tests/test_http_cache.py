@@ -0,0 +1,69 @@
+import io
+
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+
+import main
+from cache_keys import master_name, render_key
+from http_cache import parse_range
+from resource_policy import resolve_block_policy
+
+client = TestClient(main.app)
+
+URL = "https://example.com/"
+
+
+@pytest.fixture
+def cached_screenshot(fake_redis):
+    block = resolve_block_policy(main.BLOCK_PROFILE).token
+    key = render_key(URL, "desktop", False, 0, "networkidle", True, True, block)
+    master = io.BytesIO()
+    Image.new("RGB", (64, 64), "blue").save(master, format="PNG")
+    main.write_cache_file(master_name(key), master.getvalue())
+    return key
+
+
+def test_parse_range():
+    assert parse_range("bytes=0-9", 100) == (0, 9)
+    assert parse_range("bytes=90-", 100) == (90, 99)
+    assert parse_range("bytes=-10", 100) == (90, 99)
+    assert parse_range("bytes=50-500", 100) == (50, 99)
+    assert parse_range("bytes=0-1,5-6", 100) is None
+    assert parse_range("items=0-1", 100) is None
+    with pytest.raises(ValueError):
+        parse_range("bytes=100-", 100)
+
+
+def test_cached_screenshot_has_validators(cached_screenshot):
+    response = client.get("/screenshot", params={"url": URL})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/jpeg"
+    assert response.headers["etag"].startswith('"')
+    assert "last-modified" in response.headers
+    assert response.headers["cache-control"].startswith("public, max-age=")
+    assert response.headers["accept-ranges"] == "bytes"
+
+
+def test_conditional_get_returns_not_modified(cached_screenshot):
+    etag = client.get("/screenshot", params={"url": URL}).headers["etag"]
+
+    response = client.get(
+        "/screenshot", params={"url": URL}, headers={"If-None-Match": etag}
+    )
+
+    assert response.status_code == 304
+    assert response.content == b""
+
+
+def test_range_request_returns_partial_content(cached_screenshot):
+    full = client.get("/screenshot", params={"url": URL}).content
+
+    response = client.get(
+        "/screenshot", params={"url": URL}, headers={"Range": "bytes=0-99"}
+    )
+
+    assert response.status_code == 206
+    assert response.headers["content-range"] == f"bytes 0-99/{len(full)}"
+    assert response.content == full[:100]
@@ -0,0 +1,120 @@
+import io
+
+from PIL import Image
+
+import imaging
+from cache_keys import master_name, variant_name
+from imaging import (
+    PNGStreamWriter, encode_rendition, hash_distance, is_format_supported, perceptual_hash, resize
+)
+
+
+def _png(width, height):
+    output = io.BytesIO()
+    Image.new("RGB", (width, height), "green").save(output, format="PNG")
+    return output.getvalue()
+
+
+def test_resize_modes():
+    image = Image.new("RGB", (1920, 1080))
+
+    assert resize(image, 320, None).size == (320, 180)
+    assert resize(image, None, 540).size == (960, 540)
+    assert resize(image, 320, 320, "contain").size == (320, 180)
+    assert resize(image, 320, 320, "cover").size == (320, 320)
+    assert resize(image, 320, 320, "fill").size == (320, 320)
+    assert resize(image, 4000, None).size == (1920, 1080)
+
+
+def test_encode_rendition_formats():
+    master = _png(200, 100)
+
+    webp = encode_rendition(master, 70, "webp", width=50)
+    with Image.open(io.BytesIO(webp)) as image:
+        assert image.format == "WEBP"
+        assert image.size == (50, 25)
+
+    png = encode_rendition(master, 80, "png", height=10)
+    with Image.open(io.BytesIO(png)) as image:
+        assert image.format == "PNG"
+        assert image.size == (20, 10)
+
+
+def test_is_format_supported():
+    assert is_format_supported("jpeg")
+    assert is_format_supported("webp")
+    assert not is_format_supported("gif")
+
+
+def test_variant_name():
+    assert variant_name("k", 80) == "k_q80.jpg"
+    assert variant_name("k", 75, "webp", 320, None, "cover") == "k_q75_320x0_cover.webp"
+    assert variant_name("k", 80, "png") == master_name("k")
+    assert variant_name("k", 80, "png", 320) == "k_320x0_contain.png"
+
+
+def test_png_stream_writer_stitches_tiles():
+    writer = PNGStreamWriter(40, 100)
+    tiles = []
+    for color in ("red", "green", "blue"):
+        output = io.BytesIO()
+        Image.new("RGB", (40, 40), color).save(output, format="PNG")
+        tiles.append(writer.add_tile(output.getvalue()))
+
+    png = writer.close({"Truncated": "300"})
+
+    assert tiles == [40, 40, 20]
+    with Image.open(io.BytesIO(png)) as image:
+        assert image.size == (40, 100)
+        assert image.getpixel((0, 0)) == (255, 0, 0)
+        assert image.getpixel((0, 50)) == (0, 128, 0)
+        assert image.getpixel((0, 99)) == (0, 0, 255)
+        assert image.text == {"Truncated": "300"}
+
+
+def test_png_stream_writer_pads_missing_rows():
+    writer = PNGStreamWriter(10, 30)
+    writer.add_tile(_png(8, 10))
+
+    with Image.open(io.BytesIO(writer.close())) as image:
+        assert image.size == (10, 30)
+        assert image.getpixel((9, 0)) == (255, 255, 255)
+        assert image.getpixel((0, 29)) == (255, 255, 255)
+
+
+def test_perceptual_hash_ignores_recompression():
+    image = Image.new("RGB", (320, 240), "white")
+    image.paste(Image.new("RGB", (160, 240), "black"))
+    original = io.BytesIO()
+    image.save(original, format="PNG")
+    other = io.BytesIO()
+    image.transpose(Image.FLIP_LEFT_RIGHT).save(other, format="PNG")
+
+    phash = perceptual_hash(original.getvalue())
+    assert len(phash) == 16
+    assert hash_distance(phash, perceptual_hash(encode_rendition(original.getvalue(), 30))) <= 2
+    assert hash_distance(phash, perceptual_hash(other.getvalue())) > 4
+
+
+def _tiled_png(width, height):
+    writer = PNGStreamWriter(width, height)
+    for top in range(0, height, 50):
+        writer.add_tile(_png(width, 50))
+    return writer.close()
+
+
+def test_large_tiled_master_is_read_in_strips(monkeypatch):
+    master = _tiled_png(100, 1000)
+    expected = perceptual_hash(master)
+
+    def no_full_decode(*args, **kwargs):
+        raise AssertionError("a captura não deveria ser decodificada inteira")
+
+    monkeypatch.setattr(imaging.Image, "open", no_full_decode)
+    jpeg = encode_rendition(master, 80, "jpeg", max_pixels=25_000)
+    assert perceptual_hash(master) == expected
+    monkeypatch.undo()
+
+    with Image.open(io.BytesIO(jpeg)) as image:
+        assert image.size == (50, 500)
+        assert image.getpixel((25, 480))[1] > 100
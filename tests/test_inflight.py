@@ -0,0 +1,49 @@
+import main
+from cache_keys import render_key
+
+
+class _PendingResult:
+    def __init__(self, ready):
+        self._ready = ready
+
+    def ready(self):
+        return self._ready
+
+
+def test_claim_inflight_returns_existing_task(fake_redis, monkeypatch):
+    monkeypatch.setattr(main.celery_app, "AsyncResult", lambda _: _PendingResult(False))
+    key = main.get_inflight_key(
+        render_key("https://example.com", "desktop", False, 0, "networkidle", True, True),
+        80
+    )
+
+    assert main.claim_inflight(key, "task-1") is None
+    assert main.claim_inflight(key, "task-2") == "task-1"
+    assert fake_redis.ttl(key) > 0
+
+
+def test_release_inflight_only_by_owner(fake_redis, monkeypatch):
+    monkeypatch.setattr(main.celery_app, "AsyncResult", lambda _: _PendingResult(False))
+    key = main.get_inflight_key(
+        render_key("https://example.com", "mobile", True, 0, "load", False, False),
+        80
+    )
+    main.claim_inflight(key, "task-1")
+
+    main.release_inflight(key, "task-2")
+    assert fake_redis.get(key) == "task-1"
+
+    main.release_inflight(key, "task-1")
+    assert main.claim_inflight(key, "task-3") is None
+
+
+def test_claim_inflight_replaces_finished_task(fake_redis, monkeypatch):
+    monkeypatch.setattr(main.celery_app, "AsyncResult", lambda _: _PendingResult(True))
+    key = main.get_inflight_key(
+        render_key("https://example.com", "desktop", False, 0, "networkidle", True, True),
+        80
+    )
+    main.claim_inflight(key, "task-1")
+
+    assert main.claim_inflight(key, "task-2") is None
+    assert fake_redis.get(key) == "task-2"
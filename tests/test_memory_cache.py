@@ -0,0 +1,125 @@
+import io
+
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+
+import main
+import memory_cache
+from cache_keys import master_name, render_key
+from memory_cache import FrequencySketch, MemoryCache
+from resource_policy import resolve_block_policy
+
+client = TestClient(main.app)
+
+URL = "https://example.com/"
+
+
+def _put(cache, name, size, group="g"):
+    return cache.put(name, b"x" * size, '"etag"', 0.0, "image/jpeg", group)
+
+
+def test_sketch_counts_and_ages():
+    sketch = FrequencySketch(width=1024)
+    sketch.sample_size = 20
+    for _ in range(10):
+        sketch.increment("a")
+    assert sketch.frequency("a") == 10
+    assert sketch.frequency("b") == 0
+
+    # Ao completar a amostra, as contagens caem pela metade
+    for _ in range(10):
+        sketch.increment("b")
+    assert sketch.frequency("a") == 5
+
+
+def test_lru_eviction_within_budget():
+    cache = MemoryCache(max_size=300, max_entry_size=200, ttl=60)
+    assert _put(cache, "a", 100)
+    assert _put(cache, "b", 100)
+    assert _put(cache, "c", 100)
+    cache.get("a")
+    cache.get("c")
+    cache.get("d")
+    cache.get("d")
+
+    # "d" é mais frequente que "b" (o menos usado) e o substitui
+    assert _put(cache, "d", 100)
+    assert cache.get("b") is None
+    assert cache.size == 300
+    assert not _put(cache, "big", 250)
+
+
+def test_tinylfu_keeps_popular_entries():
+    cache = MemoryCache(max_size=200, max_entry_size=200, ttl=60)
+    for name in ("a", "b"):
+        _put(cache, name, 100)
+        for _ in range(3):
+            cache.get(name)
+
+    assert not cache.admits("once", 100)
+    assert not _put(cache, "once", 100)
+    assert cache.get("a") is not None and cache.get("b") is not None
+
+
+def test_invalidate_group_and_ttl(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(memory_cache.time, "monotonic", lambda: now[0])
+    cache = MemoryCache(max_size=1000, max_entry_size=1000, ttl=10)
+    _put(cache, "k_q80.jpg", 10, group="k")
+    _put(cache, "k_q70.webp", 10, group="k")
+    _put(cache, "other_q80.jpg", 10, group="other")
+
+    cache.invalidate("k")
+    assert cache.get("k_q80.jpg") is None and cache.get("k_q70.webp") is None
+    assert cache.get("other_q80.jpg") is not None
+
+    now[0] += 10
+    assert cache.get("other_q80.jpg") is None
+    assert cache.size == 0
+
+
+@pytest.fixture
+def cached_key(fake_redis):
+    block = resolve_block_policy(main.BLOCK_PROFILE).token
+    key = render_key(URL, "desktop", False, 0, "networkidle", True, True, block)
+    master = io.BytesIO()
+    Image.new("RGB", (64, 64), "green").save(master, format="PNG")
+    main.write_cache_file(master_name(key), master.getvalue())
+    return key
+
+
+def test_hot_image_is_served_from_memory(cached_key):
+    first = client.get("/screenshot", params={"url": URL})
+    assert first.status_code == 200
+
+    # Sem o arquivo em disco, só a memória pode responder
+    for stored in list(main.storage.iter_objects()):
+        main.storage.delete(stored.name)
+    second = client.get("/screenshot", params={"url": URL})
+
+    assert second.status_code == 200
+    assert second.content == first.content
+    assert second.headers["etag"] == first.headers["etag"]
+    assert second.headers["x-cache"] == "HIT"
+
+    partial = client.get("/screenshot", params={"url": URL}, headers={"Range": "bytes=0-9"})
+    assert partial.status_code == 206
+    assert partial.content == first.content[:10]
+
+    not_modified = client.get(
+        "/screenshot", params={"url": URL}, headers={"If-None-Match": first.headers["etag"]}
+    )
+    assert not_modified.status_code == 304
+
+
+def test_no_cache_invalidates_memory(cached_key, monkeypatch):
+    monkeypatch.setattr(
+        main.capture_screenshot_task, "apply_async", lambda kwargs, task_id, **options: None
+    )
+    client.get("/screenshot", params={"url": URL})
+    assert len(main.memory_cache) == 1
+
+    client.get("/screenshot", params={"url": URL, "no_cache": True})
+
+    assert len(main.memory_cache) == 0
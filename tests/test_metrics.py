@@ -0,0 +1,105 @@
+import io
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from fastapi.testclient import TestClient
+from PIL import Image
+from prometheus_client import CollectorRegistry, generate_latest
+from prometheus_client.core import REGISTRY
+
+import main
+import metrics
+from cache_keys import render_key
+
+client = TestClient(main.app)
+
+
+def _sample(name, labels=None):
+    return REGISTRY.get_sample_value(name, labels or {}) or 0
+
+
+def _png():
+    output = io.BytesIO()
+    Image.new("RGB", (16, 16), "red").save(output, format="PNG")
+    return output.getvalue()
+
+
+def test_metrics_endpoint_exposes_queue_and_cache(fake_redis):
+    fake_redis.rpush("screenshots.heavy", "a", "b")
+    fake_redis.rpush("screenshots.heavy:6", "c")
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'screenshot_queue_depth{queue="screenshots.heavy"} 3.0' in response.text
+    assert 'screenshot_queue_depth{queue="screenshots.cheap"} 0.0' in response.text
+    assert "screenshot_cache_size_bytes 0.0" in response.text
+
+
+def test_cache_lookups_are_counted(fake_redis):
+    key = render_key("https://example.com/", "desktop", False, 0, "load", False, False)
+    before = {r: _sample("screenshot_cache_lookups_total", {"result": r}) for r in metrics.CACHE_RESULTS}
+
+    assert main.get_cached_variant(key, 80) is None
+    main.store_capture(key, _png(), 80)
+    assert main.get_cached_variant(key, 80) is not None
+    assert main.get_cached_variant(key, 70, fmt="webp") is not None
+
+    after = {r: _sample("screenshot_cache_lookups_total", {"result": r}) for r in metrics.CACHE_RESULTS}
+    assert after["miss"] - before["miss"] == 1
+    assert after["hit"] - before["hit"] == 1
+    assert after["derived"] - before["derived"] == 1
+
+
+def test_observe_phases_ignores_non_phase_timings():
+    before = _sample("screenshot_capture_phase_seconds_count", {"phase": "scroll"})
+
+    metrics.observe_phases({"scroll": 1.5, "scroll_steps": 12, "infinite_scroll": True})
+
+    assert _sample("screenshot_capture_phase_seconds_count", {"phase": "scroll"}) == before + 1
+
+
+def test_gauge_collector_skips_failed_reads():
+    registry = CollectorRegistry()
+
+    def broken():
+        raise RuntimeError("redis fora do ar")
+
+    registry.register(metrics.GaugeCollector("broken_gauge", "Teste", [], broken))
+    registry.register(metrics.GaugeCollector("ok_gauge", "Teste", ["a"], lambda: {("x",): 2}))
+
+    output = generate_latest(registry).decode()
+    assert "broken_gauge" not in output
+    assert 'ok_gauge{a="x"} 2.0' in output
+
+
+def test_gauge_collector_is_not_read_on_register():
+    reads = []
+    registry = CollectorRegistry()
+
+    registry.register(
+        metrics.GaugeCollector("lazy_gauge", "Teste", [], lambda: reads.append(1) or {(): 1})
+    )
+
+    assert reads == []
+    assert "lazy_gauge 1.0" in generate_latest(registry).decode()
+    assert reads == [1]
+
+
+def test_task_wait_discounts_countdown():
+    now = datetime.now(timezone.utc).timestamp()
+    request = {
+        "enqueued_at": now - 100,
+        "eta": datetime.fromtimestamp(now - 2, timezone.utc).isoformat(),
+        "delivery_info": {"routing_key": "screenshots.cheap"},
+    }
+    task = SimpleNamespace(request=SimpleNamespace(get=request.get, **request))
+    labels = {"queue": "screenshots.cheap"}
+    before_count = _sample("screenshot_task_wait_seconds_count", labels)
+    before_sum = _sample("screenshot_task_wait_seconds_sum", labels)
+
+    main.observe_task_wait(task=task)
+
+    assert _sample("screenshot_task_wait_seconds_count", labels) == before_count + 1
+    assert 1 <= _sample("screenshot_task_wait_seconds_sum", labels) - before_sum < 10
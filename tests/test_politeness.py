@@ -0,0 +1,210 @@
+import io
+from concurrent.futures import Future
+
+import fakeredis
+import pytest
+from celery.exceptions import Retry
+from PIL import Image
+
+import main
+import politeness
+from batches import ITEM_COMPLETED, ITEM_PENDING
+from politeness import HostScheduler, HostThrottled, origin_host, parse_host_limits
+
+
+def _png():
+    output = io.BytesIO()
+    Image.new("RGB", (8, 8), "blue").save(output, format="PNG")
+    return output.getvalue()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(politeness.time, "time", lambda: now[0])
+    return now
+
+
+def _scheduler(**kwargs):
+    options = {"max_concurrency": 2, "min_interval": 0, "burst": 1}
+    options.update(kwargs)
+    return HostScheduler(fakeredis.FakeRedis(decode_responses=True), **options)
+
+
+def test_origin_host_and_limits():
+    assert origin_host("https://WWW.Example.com:8443/a?b") == "www.example.com"
+    scheduler = _scheduler(
+        overrides=parse_host_limits('{"Example.com": {"max_concurrency": 1, "min_interval": 5}}')
+    )
+    assert scheduler.limits("cdn.example.com") == (1, 5.0, 1)
+    assert scheduler.limits("other.com") == (2, 0.0, 1)
+
+
+def test_concurrency_cap_per_host(clock):
+    scheduler = _scheduler(busy_delay=3)
+    first = scheduler.acquire("a.com")
+    scheduler.acquire("a.com")
+
+    with pytest.raises(HostThrottled) as info:
+        scheduler.acquire("a.com")
+    assert 3 <= info.value.delay <= 3.6
+
+    # Outros hosts não são afetados
+    scheduler.acquire("b.com")
+
+    scheduler.release("a.com", first)
+    scheduler.acquire("a.com")
+
+
+def test_expired_lease_frees_slot(clock):
+    scheduler = _scheduler(max_concurrency=1, lease_ttl=10)
+    scheduler.acquire("a.com")
+    with pytest.raises(HostThrottled):
+        scheduler.acquire("a.com")
+
+    clock[0] += 11
+    scheduler.acquire("a.com")
+
+
+def test_min_interval_spaces_renders(clock):
+    scheduler = _scheduler(max_concurrency=0, min_interval=4, burst=2)
+    scheduler.acquire("a.com")
+    scheduler.acquire("a.com")
+
+    with pytest.raises(HostThrottled) as info:
+        scheduler.acquire("a.com")
+    assert 4 <= info.value.delay <= 4.8
+
+    clock[0] += 2
+    with pytest.raises(HostThrottled) as info:
+        scheduler.acquire("a.com")
+    assert 2 <= info.value.delay <= 2.4
+
+    clock[0] += 2
+    scheduler.acquire("a.com")
+
+
+def test_task_is_retried_when_host_throttled(fake_redis, monkeypatch):
+    retries = []
+
+    class Retry(Exception):
+        pass
+
+    def fake_retry(countdown=None, max_retries=None, **kwargs):
+        retries.append(countdown)
+        return Retry()
+
+    monkeypatch.setattr(main, "host_scheduler", HostScheduler(fake_redis, 1, 0, busy_delay=2))
+    monkeypatch.setattr(main.capture_screenshot_task, "retry", fake_retry)
+    monkeypatch.setattr(main, "submit_capture", lambda *args: pytest.fail("não deveria renderizar"))
+    main.host_scheduler.acquire("example.com")
+
+    with pytest.raises(Retry):
+        main.capture_screenshot_task(
+            "https://example.com/", "desktop", False, 0, 80, "load", False, False
+        )
+    assert 2 <= retries[0] <= 2.4
+
+
+def test_batch_defers_throttled_hosts(fake_redis, monkeypatch):
+    urls = ["https://busy.example.com/", "https://free.example.com/"]
+    options = main.BatchOptions().model_dump()
+    batch_id = main.batch_store.create(urls, options)
+    retries = []
+    rendered = []
+
+    def fake_submit(url, **kwargs):
+        rendered.append(url)
+        future = Future()
+        future.set_result(_png())
+        return future
+
+    monkeypatch.setattr(main, "host_scheduler", HostScheduler(fake_redis, 1, 0, busy_delay=2))
+    monkeypatch.setattr(main, "submit_capture", fake_submit)
+    monkeypatch.setattr(
+        main.capture_batch_task, "retry", lambda **kwargs: retries.append(kwargs)
+    )
+    main.host_scheduler.acquire("busy.example.com")
+
+    result = main.capture_batch_task(batch_id, list(enumerate(urls)), options)
+
+    assert result == {"completed": 1, "failed": 0, "deferred": 1}
+    assert rendered == ["https://free.example.com/"]
+    assert retries[0]["args"] == (batch_id, [[0, "https://busy.example.com/"]], options)
+    assert main.batch_store.get_items(batch_id)[1]["status"] == ITEM_COMPLETED
+    # A vaga do host livre foi devolvida
+    assert fake_redis.zcard("screenshot:host:free.example.com:active") == 0
+
+
+
+@pytest.fixture
+def deferring_request():
+    """Executa a tarefa como no worker, já adiada algumas vezes."""
+    tasks = []
+
+    def push(task, retries, args):
+        task.push_request(id="task-1", retries=retries, args=args, kwargs={}, called_directly=False)
+        tasks.append(task)
+
+    yield push
+    for task in tasks:
+        task.pop_request()
+
+
+def test_task_is_deferred_past_the_default_retry_limit(fake_redis, monkeypatch, deferring_request):
+    sent = []
+    task = main.capture_screenshot_task
+    args = ("https://example.com/", "desktop", False, 0, 80, "load", False, False)
+    monkeypatch.setattr(main, "host_scheduler", HostScheduler(fake_redis, 1, 0, busy_delay=2))
+    monkeypatch.setattr(task, "apply_async", lambda *a, **kwargs: sent.append(kwargs))
+    main.host_scheduler.acquire("example.com")
+    deferring_request(task, task.max_retries, args)
+
+    with pytest.raises(Retry):
+        task.run(*args)
+    assert len(sent) == 1
+
+
+def test_task_fails_after_host_max_deferrals(fake_redis, monkeypatch, deferring_request):
+    task = main.capture_screenshot_task
+    args = ("https://example.com/", "desktop", False, 0, 80, "load", False, False)
+    monkeypatch.setattr(main, "host_scheduler", HostScheduler(fake_redis, 1, 0, busy_delay=2))
+    monkeypatch.setattr(task, "apply_async", lambda *a, **kwargs: pytest.fail("não deveria reenviar"))
+    main.host_scheduler.acquire("example.com")
+    fake_redis.set("screenshot:inflight:test", "task-1")
+    deferring_request(task, main.HOST_MAX_DEFERRALS, args)
+
+    result = task.run(*args, inflight_key="screenshot:inflight:test")
+
+    assert result.startswith("Erro ao capturar screenshot")
+    assert fake_redis.get("screenshot:inflight:test") is None
+
+
+def test_batch_finishes_pending_items_before_deferring(fake_redis, monkeypatch, deferring_request):
+    urls = ["https://free.example.com/", "https://busy.example.com/"]
+    options = main.BatchOptions().model_dump()
+    batch_id = main.batch_store.create(urls, options)
+    task = main.capture_batch_task
+    sent = []
+
+    def fake_submit(url, **kwargs):
+        future = Future()
+        future.set_result(_png())
+        return future
+
+    def fake_apply_async(*args, **kwargs):
+        # Os itens já agendados terminam antes do reenvio
+        assert main.batch_store.get_items(batch_id)[0]["status"] == ITEM_COMPLETED
+        sent.append(kwargs)
+
+    monkeypatch.setattr(main, "host_scheduler", HostScheduler(fake_redis, 1, 0, busy_delay=2))
+    monkeypatch.setattr(main, "submit_capture", fake_submit)
+    monkeypatch.setattr(task, "apply_async", fake_apply_async)
+    main.host_scheduler.acquire("busy.example.com")
+    deferring_request(task, task.max_retries, (batch_id, list(enumerate(urls)), options))
+
+    result = task.run(batch_id, list(enumerate(urls)), options)
+
+    assert result == {"completed": 1, "failed": 0, "deferred": 1}
+    assert len(sent) == 1
+    assert main.batch_store.get_items(batch_id)[1]["status"] == ITEM_PENDING
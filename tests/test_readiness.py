@@ -0,0 +1,103 @@
+import asyncio
+
+import pytest
+
+import readiness
+from readiness import CaptureBudget, NetworkMonitor
+
+
+class FakePage:
+    """Página mínima: altura cresce ``growth`` px a cada scroll até o fim."""
+
+    def __init__(self, height, viewport=1000, growth=0):
+        self.height = height
+        self.viewport = viewport
+        self.growth = growth
+        self.handlers = {}
+        self.scrolls = []
+
+    def on(self, event, handler):
+        self.handlers[event] = handler
+
+    async def evaluate(self, script, arg=None):
+        if "innerHeight" in script:
+            return self.viewport
+        if "scrollHeight" in script:
+            return self.height
+        if "scrollTo(0, y)" in script:
+            self.scrolls.append(arg)
+            if arg + self.viewport >= self.height:
+                self.height += self.growth
+        return None
+
+    async def wait_for_function(self, script, timeout=None, polling=None):
+        return None
+
+
+class FakeRequest:
+    def __init__(self, resource_type="image"):
+        self.resource_type = resource_type
+
+
+@pytest.mark.asyncio
+async def test_scroll_stops_at_page_end():
+    page = FakePage(height=3500)
+    budget = CaptureBudget(10)
+    result = await readiness.scroll_until_ready(page, budget, NetworkMonitor(page))
+
+    assert page.scrolls == [0, 1000, 2000, 3000]
+    assert result == {"steps": 4, "height": 3500, "infinite_scroll": False}
+
+
+@pytest.mark.asyncio
+async def test_scroll_detects_infinite_scroll():
+    page = FakePage(height=2000, growth=1000)
+    budget = CaptureBudget(10)
+    result = await readiness.scroll_until_ready(page, budget, NetworkMonitor(page))
+
+    assert result["infinite_scroll"] is True
+    assert result["steps"] < 10
+
+
+@pytest.mark.asyncio
+async def test_scroll_respects_budget():
+    page = FakePage(height=100000)
+    budget = CaptureBudget(0)
+    result = await readiness.scroll_until_ready(page, budget, NetworkMonitor(page))
+
+    assert result["steps"] == 0
+
+
+@pytest.mark.asyncio
+async def test_network_monitor_waits_for_quiet():
+    page = FakePage(height=1000)
+    network = NetworkMonitor(page)
+    request = FakeRequest()
+    page.handlers["request"](request)
+
+    assert await network.wait_for_quiet(0.05, 0.1) is False
+
+    asyncio.get_running_loop().call_later(0.05, page.handlers["requestfinished"], request)
+    assert await network.wait_for_quiet(0.05, 1) is True
+
+
+@pytest.mark.asyncio
+async def test_network_monitor_ignores_long_lived_requests():
+    page = FakePage(height=1000)
+    network = NetworkMonitor(page, stale_after=0.05)
+    page.handlers["request"](FakeRequest("websocket"))
+    page.handlers["request"](FakeRequest("xhr"))
+
+    assert await network.wait_for_quiet(0.05, 1) is True
+
+
+@pytest.mark.asyncio
+async def test_budget_records_phase_timings():
+    budget = CaptureBudget(5)
+    async with budget.phase("scroll"):
+        await asyncio.sleep(0.01)
+    async with budget.phase("scroll"):
+        await asyncio.sleep(0.01)
+
+    assert budget.timings["scroll"] >= 0.02
+    assert 0 < budget.remaining() <= 5
@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+
+import render_engine
+from render_engine import RenderEngine
+
+
+class _Tracker:
+    def __init__(self):
+        self.active = 0
+        self.peak = 0
+
+    async def pipeline(self, page, delay=0.05):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(delay)
+            return page
+        finally:
+            self.active -= 1
+
+
+@pytest.mark.asyncio
+async def test_render_respects_max_pages(fake_chromium):
+    engine = RenderEngine(max_pages=2)
+    tracker = _Tracker()
+
+    pages = await asyncio.gather(*(engine.render(tracker.pipeline) for _ in range(5)))
+
+    assert tracker.peak == 2
+    assert all(page.closed for page in pages)
+    assert engine.active_pages == 0
+    # Todas as páginas no mesmo navegador, cada uma no próprio contexto
+    assert len(fake_chromium.browsers) == 1
+    assert len(fake_chromium.browsers[0].contexts) == 5
+
+
+@pytest.mark.asyncio
+async def test_render_waits_for_memory(fake_chromium, monkeypatch):
+    monkeypatch.setattr(render_engine, "current_memory_usage", lambda: 2048)
+    engine = RenderEngine(max_pages=4, memory_limit=1024)
+    tracker = _Tracker()
+
+    await asyncio.gather(*(engine.render(tracker.pipeline, delay=0.02) for _ in range(3)))
+
+    # Acima do limite, só uma página por vez (nunca trava com zero ativas)
+    assert tracker.peak == 1
+
+
+@pytest.mark.asyncio
+async def test_render_timeout_closes_page(fake_chromium):
+    engine = RenderEngine()
+    opened = []
+
+    async def slow(page):
+        opened.append(page)
+        await asyncio.sleep(1)
+
+    with pytest.raises(asyncio.TimeoutError):
+        await engine.render(slow, timeout=0.05)
+
+    assert opened[0].closed
+    assert engine.active_pages == 0
+
+
+def test_submit_runs_on_background_loop(fake_chromium):
+    engine = RenderEngine(max_pages=2)
+    tracker = _Tracker()
+    try:
+        futures = [engine.submit(tracker.pipeline, delay=0.02) for _ in range(3)]
+        assert all(future.result(timeout=5).closed for future in futures)
+    finally:
+        engine.stop_background()
+
+    assert tracker.peak == 2
+    assert fake_chromium.browsers[0].closed
@@ -0,0 +1,38 @@
+import pytest
+
+from resource_policy import BlockPolicy, is_tracker, resolve_block_policy
+
+
+def test_is_tracker_matches_subdomains():
+    domains = frozenset({"doubleclick.net"})
+    assert is_tracker("https://doubleclick.net/x", domains)
+    assert is_tracker("https://ad.g.doubleclick.net/pixel?x=1", domains)
+    assert not is_tracker("https://notdoubleclick.net/", domains)
+    assert not is_tracker("https://example.com/doubleclick.net", domains)
+
+
+def test_policy_token_round_trip():
+    policy = resolve_block_policy("standard", ["font"])
+    restored = BlockPolicy.from_token(policy.token)
+
+    assert policy.token == "eventsource,font,media,ping,websocket;trackers"
+    assert restored.resource_types == policy.resource_types
+    assert restored.block_trackers is True
+    assert resolve_block_policy("none").token == ""
+    assert not BlockPolicy.from_token("")
+
+
+def test_policy_blocks_types_and_trackers():
+    policy = resolve_block_policy("standard")
+
+    assert policy.blocks("media", "https://example.com/video.mp4")
+    assert policy.blocks("script", "https://www.google-analytics.com/analytics.js")
+    assert policy.blocks("document", "https://tpc.googlesyndication.com/ad.html")
+    assert not policy.blocks("script", "https://example.com/app.js")
+
+
+def test_resolve_rejects_unknown_values():
+    with pytest.raises(ValueError):
+        resolve_block_policy("everything")
+    with pytest.raises(ValueError):
+        resolve_block_policy("none", ["document"])
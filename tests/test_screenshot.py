@@ -1,8 +1,6 @@
-import pytest
 from fastapi.testclient import TestClient
 from main import app
 import os
-import time
 
 client = TestClient(app)
 
@@ -22,16 +20,9 @@ def test_screenshot_basic():
     assert "task_id" in data
     assert data["status"] == "processing"
 
-    # Aguarda processamento
+    # Aguarda processamento (long-poll: responde assim que a tarefa termina)
     task_id = data["task_id"]
-    max_retries = 10
-    for _ in range(max_retries):
-        time.sleep(2)
-        status_response = client.get(f"/screenshot/status/{task_id}")
-        if status_response.status_code == 200:
-            break
-    else:
-        pytest.fail("Screenshot não foi processado no tempo esperado")
+    status_response = client.get(f"/screenshot/status/{task_id}", params={"wait": 20})
 
     # Verifica resultado
     assert status_response.status_code == 200
@@ -0,0 +1,105 @@
+import io
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+
+import main
+from cache_keys import master_name, render_key
+from resource_policy import resolve_block_policy
+
+client = TestClient(main.app)
+
+URL = "https://example.com/"
+
+
+@pytest.fixture
+def cached_master(fake_redis):
+    block = resolve_block_policy(main.BLOCK_PROFILE).token
+    key = render_key(URL, "desktop", False, 0, "networkidle", True, True, block)
+    master = io.BytesIO()
+    Image.new("RGB", (64, 64), "blue").save(master, format="PNG")
+
+    def age(seconds):
+        main.write_cache_file(master_name(key), master.getvalue(), time.time() - seconds)
+
+    return age
+
+
+class _PendingResult:
+    def ready(self):
+        return False
+
+
+@pytest.fixture
+def enqueued(monkeypatch):
+    calls = []
+    monkeypatch.setattr(main.celery_app, "AsyncResult", lambda _: _PendingResult())
+    monkeypatch.setattr(
+        main.capture_screenshot_task,
+        "apply_async",
+        lambda kwargs, task_id, **options: calls.append((kwargs, task_id, options)),
+    )
+    return calls
+
+
+def test_fresh_image_is_a_hit(cached_master, enqueued):
+    cached_master(30)
+
+    response = client.get("/screenshot", params={"url": URL})
+
+    assert response.status_code == 200
+    assert response.headers["x-cache"] == "HIT"
+    assert 30 <= int(response.headers["age"]) < 40
+    assert enqueued == []
+
+
+def test_expired_image_is_served_stale_and_refreshed_once(cached_master, enqueued):
+    cached_master(main.CACHE_EXPIRY + 60)
+
+    first = client.get("/screenshot", params={"url": URL})
+    second = client.get("/screenshot", params={"url": URL})
+
+    for response in (first, second):
+        assert response.status_code == 200
+        assert response.headers["x-cache"] == "STALE"
+        assert response.headers["cache-control"] == "public, max-age=0"
+    # Uma única renovação, com prioridade baixa
+    assert len(enqueued) == 1
+    kwargs, task_id, options = enqueued[0]
+    assert kwargs["url"] == URL
+    assert options["priority"] == main.PRIORITIES["low"]
+    assert main.redis_client.get(kwargs["inflight_key"]) == task_id
+
+
+def test_max_age_per_request(cached_master, enqueued):
+    cached_master(120)
+
+    response = client.get("/screenshot", params={"url": URL, "max_age": 60})
+
+    assert response.headers["x-cache"] == "STALE"
+    assert len(enqueued) == 1
+
+
+def test_stale_ttl_zero_goes_to_queue(cached_master, enqueued):
+    cached_master(120)
+
+    response = client.get("/screenshot", params={"url": URL, "max_age": 60, "stale_ttl": 0})
+
+    assert response.json()["status"] == "processing"
+    assert len(enqueued) == 1
+
+
+def test_expired_beyond_stale_window_is_a_miss(cached_master, enqueued):
+    cached_master(main.CACHE_EXPIRY + main.CACHE_STALE_TTL + 60)
+
+    response = client.get("/screenshot", params={"url": URL})
+
+    assert response.json()["status"] == "processing"
+
+
+def test_invalid_freshness_parameters(fake_redis):
+    for params in ({"max_age": -1}, {"stale_ttl": main.CACHE_STALE_TTL + 1}):
+        response = client.get("/screenshot", params={"url": URL, **params})
+        assert response.status_code == 400
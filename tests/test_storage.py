@@ -0,0 +1,217 @@
+import io
+import os
+from datetime import datetime, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+
+import main
+from cache_index import CacheIndex
+from cache_keys import master_name, render_key
+from resource_policy import resolve_block_policy
+from storage import LocalStorage, S3Storage, Storage, StorageError, create_storage
+
+client = TestClient(main.app)
+
+URL = "https://example.com/"
+
+
+class _ClientError(Exception):
+    def __init__(self, code):
+        super().__init__(code)
+        self.response = {"Error": {"Code": code}}
+
+
+class _Body:
+    def __init__(self, data):
+        self.data = data
+
+    def read(self):
+        return self.data
+
+
+class _Paginator:
+    def __init__(self, s3):
+        self.s3 = s3
+
+    def paginate(self, Bucket, Prefix):
+        keys = sorted(k for k in self.s3.objects if k.startswith(Prefix))
+        for start in range(0, len(keys), 2):
+            yield {"Contents": [
+                {
+                    "Key": key,
+                    "Size": len(self.s3.objects[key][0]),
+                    "LastModified": datetime.now(timezone.utc),
+                }
+                for key in keys[start:start + 2]
+            ]}
+
+
+class FakeS3:
+    """Cliente S3 em memória com as chamadas usadas por ``S3Storage``."""
+
+    def __init__(self, bucket="captures"):
+        self.bucket = bucket
+        self.objects = {}
+
+    def _check(self, Bucket):
+        if Bucket != self.bucket:
+            raise _ClientError("NoSuchBucket")
+
+    def head_bucket(self, Bucket):
+        self._check(Bucket)
+
+    def put_object(self, Bucket, Key, Body, Metadata):
+        self._check(Bucket)
+        self.objects[Key] = (bytes(Body), dict(Metadata))
+
+    def head_object(self, Bucket, Key):
+        self._check(Bucket)
+        if Key not in self.objects:
+            raise _ClientError("404")
+        data, metadata = self.objects[Key]
+        return {
+            "ContentLength": len(data),
+            "Metadata": metadata,
+            "LastModified": datetime.now(timezone.utc),
+        }
+
+    def get_object(self, Bucket, Key):
+        self._check(Bucket)
+        if Key not in self.objects:
+            raise _ClientError("NoSuchKey")
+        return {"Body": _Body(self.objects[Key][0])}
+
+    def delete_object(self, Bucket, Key):
+        self._check(Bucket)
+        self.objects.pop(Key, None)
+
+    def get_paginator(self, name):
+        assert name == "list_objects_v2"
+        return _Paginator(self)
+
+
+def test_local_storage_shards_by_name_prefix(tmp_path):
+    storage = LocalStorage(str(tmp_path))
+
+    stored = storage.write("abcdef_q80.jpg", b"data", mtime=1000.0)
+
+    assert stored.size == 4 and stored.mtime == 1000.0
+    assert os.path.isfile(tmp_path / "ab" / "cd" / "abcdef_q80.jpg")
+    assert storage.read("abcdef_q80.jpg") == b"data"
+    assert storage.stat("abcdef_q80.jpg").mtime == 1000.0
+    assert storage.stat("missing.png") is None
+    with pytest.raises(FileNotFoundError):
+        storage.read("missing.png")
+
+
+def test_local_storage_write_is_atomic(tmp_path, monkeypatch):
+    storage = LocalStorage(str(tmp_path))
+    storage.write("abcdef.png", b"old")
+
+    def fail(*args):
+        raise OSError("disco cheio")
+
+    monkeypatch.setattr(os, "replace", fail)
+    with pytest.raises(OSError):
+        storage.write("abcdef.png", b"new")
+
+    # O objeto antigo continua inteiro e o temporário foi removido
+    assert storage.read("abcdef.png") == b"old"
+    assert os.listdir(tmp_path / "ab" / "cd") == ["abcdef.png"]
+
+
+def test_local_storage_lists_objects_and_skips_temporaries(tmp_path):
+    storage = LocalStorage(str(tmp_path))
+    storage.write("abcdef.png", b"1")
+    storage.write("ab12ef.png", b"22")
+    (tmp_path / "ab" / "cd" / ".abcdef.png.1234.tmp").write_bytes(b"partial")
+    (tmp_path / "legacy.png").write_bytes(b"flat")
+
+    listed = {stored.name: stored.size for stored in storage.iter_objects()}
+
+    assert listed == {"abcdef.png": 1, "ab12ef.png": 2}
+
+
+def test_s3_storage_round_trip():
+    s3 = FakeS3()
+    storage = S3Storage("captures", prefix="shots/", client=s3)
+
+    storage.write("abcdef.png", b"png", mtime=1234.5)
+
+    assert "shots/abcdef.png" in s3.objects
+    assert storage.stat("abcdef.png").mtime == 1234.5
+    assert storage.read("abcdef.png") == b"png"
+    assert storage.local_path("abcdef.png") is None
+    storage.delete("abcdef.png")
+    assert storage.stat("abcdef.png") is None
+    with pytest.raises(FileNotFoundError):
+        storage.read("abcdef.png")
+
+
+def test_s3_storage_wraps_client_errors():
+    storage = S3Storage("other", client=FakeS3())
+    with pytest.raises(StorageError):
+        storage.check()
+    with pytest.raises(StorageError):
+        storage.write("abcdef.png", b"png")
+
+
+def test_cache_index_stores_blobs_in_s3(fake_redis):
+    s3 = FakeS3()
+    storage = S3Storage("captures", prefix="shots/", client=s3)
+    index = CacheIndex(fake_redis, storage, max_size=100, expiry=60)
+    for name in ("a.png", "b.png"):
+        entry = index.store(name, b"x" * 10)
+    index.store("c.png", b"y" * 10)
+
+    assert len(s3.objects) == 2
+    assert f"shots/{entry.blob}" in s3.objects
+    assert index.total_size() == 20
+    storage.delete(entry.blob)
+    assert index.reconcile() == {"removed": 2, "orphaned": 0}
+    assert index.total_size() == 10
+
+
+def test_create_storage_validates_backend(tmp_path):
+    assert isinstance(create_storage("local", str(tmp_path)), LocalStorage)
+    with pytest.raises(ValueError):
+        create_storage("s3", str(tmp_path))
+    with pytest.raises(ValueError):
+        create_storage("ftp", str(tmp_path))
+
+
+def test_incomplete_backend_cannot_be_instantiated():
+    class ReadOnlyStorage(Storage):
+        def read(self, name):
+            return b""
+
+    with pytest.raises(TypeError):
+        ReadOnlyStorage()
+
+
+@pytest.fixture
+def s3_storage(fake_redis, monkeypatch):
+    storage = S3Storage("captures", client=FakeS3())
+    monkeypatch.setattr(main, "storage", storage)
+    monkeypatch.setattr(main.cache_index, "storage", storage)
+    return storage
+
+
+def test_screenshot_served_from_s3(s3_storage):
+    block = resolve_block_policy(main.BLOCK_PROFILE).token
+    key = render_key(URL, "desktop", False, 0, "networkidle", True, True, block)
+    master = io.BytesIO()
+    Image.new("RGB", (64, 64), "blue").save(master, format="PNG")
+    main.write_cache_file(master_name(key), master.getvalue())
+
+    response = client.get("/screenshot", params={"url": URL})
+
+    assert response.status_code == 200
+    assert response.headers["x-cache"] == "HIT"
+    assert response.content[:2] == b"\xff\xd8"
+    revalidated = client.get(
+        "/screenshot", params={"url": URL}, headers={"If-None-Match": response.headers["etag"]}
+    )
+    assert revalidated.status_code == 304
@@ -0,0 +1,96 @@
+import os
+import time
+from email.utils import formatdate
+
+import subresource_cache
+from subresource_cache import SubresourceCache, freshness_lifetime
+
+URL = "https://cdn.example.com/app.js"
+
+
+def test_freshness_lifetime():
+    now = 1_700_000_000
+    assert freshness_lifetime({"cache-control": "public, max-age=600"}, now) == 600
+    assert freshness_lifetime({"cache-control": "max-age=600, s-maxage=60"}, now) == 60
+    assert freshness_lifetime({"cache-control": "max-age=600", "age": "100"}, now) == 500
+    assert freshness_lifetime({
+        "expires": formatdate(now + 300, usegmt=True),
+        "date": formatdate(now, usegmt=True),
+    }, now) == 300
+    assert freshness_lifetime({"cache-control": "no-store, max-age=600"}, now) is None
+    assert freshness_lifetime({"cache-control": "private, max-age=600"}, now) is None
+    assert freshness_lifetime({"cache-control": "max-age=600", "vary": "Cookie"}, now) is None
+    assert freshness_lifetime({}, now) is None
+
+
+def test_put_and_get(tmp_path):
+    cache = SubresourceCache(str(tmp_path), max_size=1000, max_entry_size=100)
+    headers = {
+        "Cache-Control": "max-age=60",
+        "Content-Type": "text/javascript",
+        "Content-Encoding": "gzip",
+    }
+
+    assert cache.put(URL, 200, headers, b"console.log(1)")
+    cached = cache.get(URL)
+
+    assert cached["body"] == b"console.log(1)"
+    assert cached["headers"] == {"cache-control": "max-age=60", "content-type": "text/javascript"}
+    assert SubresourceCache(str(tmp_path), 1000, 100).get(URL) is not None
+
+
+def test_put_respects_origin_headers_and_limits(tmp_path):
+    cache = SubresourceCache(str(tmp_path), max_size=1000, max_entry_size=10)
+
+    assert not cache.put(URL, 200, {"cache-control": "no-store"}, b"x")
+    assert not cache.put(URL, 404, {"cache-control": "max-age=60"}, b"x")
+    assert not cache.put(URL, 200, {"cache-control": "max-age=60"}, b"x" * 11)
+    assert not cache.put(URL, 200, {"cache-control": "max-age=0"}, b"x")
+    assert cache.get(URL) is None
+
+
+def test_expired_entries_are_dropped(tmp_path, monkeypatch):
+    cache = SubresourceCache(str(tmp_path), max_size=1000, max_entry_size=100)
+    cache.put(URL, 200, {"cache-control": "max-age=60"}, b"x")
+
+    later = time.time() + 61
+    monkeypatch.setattr(subresource_cache.time, "time", lambda: later)
+
+    assert cache.get(URL) is None
+    assert os.listdir(tmp_path) == []
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = SubresourceCache(str(tmp_path), max_size=20, max_entry_size=20)
+    headers = {"cache-control": "max-age=60"}
+    cache.put("https://a/", 200, headers, b"a" * 10)
+    cache.put("https://b/", 200, headers, b"b" * 10)
+    cache.get("https://a/")
+    cache.put("https://c/", 200, headers, b"c" * 10)
+
+    assert cache.get("https://a/") is not None
+    assert cache.get("https://b/") is None
+    assert cache.get("https://c/") is not None
+
+
+def test_concurrent_writers_use_separate_temp_files(tmp_path, monkeypatch):
+    # Dois processos com o mesmo diretório gravando a mesma URL
+    first = SubresourceCache(str(tmp_path), max_size=1000, max_entry_size=100)
+    second = SubresourceCache(str(tmp_path), max_size=1000, max_entry_size=100)
+    headers = {"cache-control": "max-age=60"}
+    temp_paths = []
+    replace = os.replace
+
+    def interleaved_replace(src, dst):
+        temp_paths.append(src)
+        if len(temp_paths) == 1:
+            # O segundo escritor grava tudo antes de o primeiro renomear
+            assert second.put(URL, 200, headers, b"second")
+        replace(src, dst)
+
+    monkeypatch.setattr(subresource_cache.os, "replace", interleaved_replace)
+
+    assert first.put(URL, 200, headers, b"first!")
+    assert len(set(temp_paths)) == 4
+    assert first.get(URL)["body"] == b"first!"
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
@@ -0,0 +1,138 @@
+import asyncio
+import io
+
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+from redis.exceptions import RedisError
+
+import main
+
+client = TestClient(main.app)
+
+URL = "https://example.com/"
+
+
+def _png():
+    output = io.BytesIO()
+    Image.new("RGB", (32, 32), "white").save(output, format="PNG")
+    return output.getvalue()
+
+
+class FakeEngine:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = 0
+
+    async def render(self, pipeline, context_options=None, timeout=None, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return _png()
+
+
+@pytest.fixture
+def enqueued(fake_redis, monkeypatch):
+    calls = []
+    monkeypatch.setattr(
+        main.capture_screenshot_task,
+        "apply_async",
+        lambda kwargs, task_id, **options: calls.append(task_id)
+    )
+    return calls
+
+
+def test_sync_returns_image(enqueued, monkeypatch):
+    engine = FakeEngine()
+    monkeypatch.setattr(main, "api_render_engine", engine)
+
+    response = client.get("/screenshot", params={"url": URL, "sync": True})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/jpeg"
+    assert engine.calls == 1
+    assert enqueued == []
+
+
+def test_sync_falls_back_to_queue_after_deadline(enqueued, monkeypatch):
+    monkeypatch.setattr(main, "api_render_engine", FakeEngine(delay=1))
+    monkeypatch.setattr(main, "SYNC_DEADLINE", 0.05)
+
+    response = client.get("/screenshot", params={"url": URL, "sync": True})
+
+    assert response.status_code == 200
+    assert response.json()["task_id"] == enqueued[0]
+
+
+def test_sync_falls_back_when_disabled(enqueued, monkeypatch):
+    monkeypatch.setattr(main, "api_render_engine", None)
+    monkeypatch.setattr(main, "SYNC_MAX_CONCURRENCY", 0)
+
+    response = client.get("/screenshot", params={"url": URL, "sync": True})
+
+    assert response.json()["status"] == "processing"
+    assert len(enqueued) == 1
+
+
+@pytest.mark.asyncio
+async def test_capture_screenshot_rejects_when_saturated(monkeypatch):
+    monkeypatch.setattr(main, "api_render_engine", FakeEngine())
+    monkeypatch.setattr(main, "sync_semaphore", asyncio.Semaphore(0))
+
+    with pytest.raises(main.FastPathUnavailable):
+        await main.capture_screenshot(URL, "desktop")
+
+
+def test_sync_falls_back_to_queue_when_redis_fails(enqueued, monkeypatch):
+    engine = FakeEngine()
+    monkeypatch.setattr(main, "api_render_engine", engine)
+
+    async def broken_exists(*keys):
+        raise RedisError("conexão perdida")
+
+    monkeypatch.setattr(main.async_redis_client, "exists", broken_exists)
+
+    response = client.get("/screenshot", params={"url": URL, "sync": True})
+
+    assert response.status_code == 200
+    assert response.json()["status"] == "processing"
+    assert engine.calls == 0
+    assert len(enqueued) == 1
+
+
+class LaunchingEngine(FakeEngine):
+    launches = []
+
+    def __init__(self, **options):
+        super().__init__()
+
+    async def start(self):
+        self.launches.append(self)
+        await asyncio.sleep(0.01)
+        if len(self.launches) > 1:
+            raise RuntimeError("sem Chromium")
+
+
+@pytest.mark.asyncio
+async def test_api_engine_is_launched_lazily_once(monkeypatch):
+    LaunchingEngine.launches = []
+    monkeypatch.setattr(main, "RenderEngine", LaunchingEngine)
+    monkeypatch.setattr(main, "api_render_engine", None)
+    monkeypatch.setattr(main, "_api_engine_lock", None)
+
+    engines = await asyncio.gather(*(main.get_api_render_engine() for _ in range(3)))
+
+    assert len(LaunchingEngine.launches) == 1
+    assert all(engine is LaunchingEngine.launches[0] for engine in engines)
+
+
+@pytest.mark.asyncio
+async def test_failed_api_engine_launch_is_not_retried_at_once(monkeypatch):
+    LaunchingEngine.launches = [object()]
+    monkeypatch.setattr(main, "RenderEngine", LaunchingEngine)
+    monkeypatch.setattr(main, "api_render_engine", None)
+    monkeypatch.setattr(main, "_api_engine_lock", None)
+    monkeypatch.setattr(main, "_api_engine_retry_at", 0.0)
+
+    assert await main.get_api_render_engine() is None
+    assert await main.get_api_render_engine() is None
+    assert len(LaunchingEngine.launches) == 2
@@ -0,0 +1,58 @@
+import asyncio
+
+import fakeredis
+import pytest
+
+import main
+
+
+class _Result:
+    def __init__(self):
+        self.done = False
+
+    def ready(self):
+        return self.done
+
+
+@pytest.fixture
+def fake_pubsub(monkeypatch):
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(
+        main, "redis_client", fakeredis.FakeRedis(server=server, decode_responses=True)
+    )
+    monkeypatch.setattr(
+        main,
+        "async_redis_client",
+        fakeredis.aioredis.FakeRedis(server=server, decode_responses=True),
+    )
+    result = _Result()
+    monkeypatch.setattr(main.celery_app, "AsyncResult", lambda _: result)
+    return result
+
+
+@pytest.mark.asyncio
+async def test_wait_for_task_wakes_on_completion(fake_pubsub):
+    waiter = asyncio.create_task(main.wait_for_task("task-1", 5))
+    await asyncio.sleep(0.05)
+
+    fake_pubsub.done = True
+    main.publish_task_done(task_id="task-1", state="SUCCESS")
+
+    assert await asyncio.wait_for(waiter, 2) is True
+
+
+@pytest.mark.asyncio
+async def test_wait_for_task_ignores_retries(fake_pubsub):
+    waiter = asyncio.create_task(main.wait_for_task("task-3", 0.3))
+    await asyncio.sleep(0.05)
+
+    # Host no limite: a tarefa volta para a fila sem terminar
+    main.publish_task_done(task_id="task-3", state="RETRY")
+    main.redis_client.publish(main.TASK_EVENTS_PREFIX + "task-3", "SUCCESS")
+
+    assert await asyncio.wait_for(waiter, 2) is False
+
+
+@pytest.mark.asyncio
+async def test_wait_for_task_times_out(fake_pubsub):
+    assert await main.wait_for_task("task-2", 0.1) is False
@@ -0,0 +1,195 @@
+import io
+from concurrent.futures import Future
+
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+
+import main
+from cache_keys import master_name, render_key
+from readiness import CaptureBudget
+from resource_policy import resolve_block_policy
+from viewports import Viewport, group_by_scale, parse_view, parse_views
+
+client = TestClient(main.app)
+
+URL = "https://example.com/"
+
+
+def _png(width, height):
+    output = io.BytesIO()
+    Image.new("RGB", (width, height), "white").save(output, format="PNG")
+    return output.getvalue()
+
+
+def _key(view):
+    block = resolve_block_policy(main.BLOCK_PROFILE).token
+    return render_key(URL, view, False, 0, "networkidle", True, True, block)
+
+
+def test_parse_view():
+    assert parse_view("desktop") == ("desktop", Viewport(1920, 1080))
+    assert parse_view("custom:1440x900@2x") == ("custom:1440x900@2", Viewport(1440, 900, 2.0))
+    assert parse_view("custom:1440x900@2")[0] == "custom:1440x900@2"
+    assert parse_view("custom:800x600") == ("custom:800x600", Viewport(800, 600))
+    assert parse_view("custom:800x600@1.5x")[1].context_options() == {
+        "viewport": {"width": 800, "height": 600},
+        "device_scale_factor": 1.5,
+    }
+    for spec in ("tablet", "custom:10x10", "custom:800x600@9x", "custom:800"):
+        with pytest.raises(ValueError):
+            parse_view(spec)
+
+
+def test_parse_views_and_group_by_scale():
+    views = parse_views("desktop, mobile,desktop,custom:1440x900@2x", max_views=4)
+
+    assert [name for name, _ in views] == ["desktop", "mobile", "custom:1440x900@2"]
+    groups = group_by_scale(views)
+    assert [[name for name, _ in group] for group in groups] == [
+        ["desktop", "mobile"], ["custom:1440x900@2"]
+    ]
+    with pytest.raises(ValueError):
+        parse_views("desktop,mobile", max_views=1)
+    with pytest.raises(ValueError):
+        parse_views(" , ", max_views=4)
+
+
+class FakePage:
+    def __init__(self):
+        self.resizes = []
+
+    async def set_viewport_size(self, size):
+        self.resizes.append(size)
+
+    async def screenshot(self, type="png", full_page=False):
+        size = self.resizes[-1] if self.resizes else {"width": 1920, "height": 1080}
+        return _png(size["width"] // 10, size["height"] // 10)
+
+
+@pytest.mark.asyncio
+async def test_render_views_navigates_once(monkeypatch):
+    page = FakePage()
+    prepared = []
+
+    async def fake_prepare(page, url, *args):
+        prepared.append(url)
+        return CaptureBudget(10)
+
+    async def no_wait(page, budget):
+        return None
+
+    monkeypatch.setattr(main, "prepare_page", fake_prepare)
+    monkeypatch.setattr(main, "wait_for_images", no_wait)
+
+    masters = await main.render_views(
+        page, URL, [Viewport(1920, 1080), Viewport(375, 812)]
+    )
+
+    assert prepared == [URL]
+    assert page.resizes == [{"width": 375, "height": 812}]
+    sizes = [Image.open(io.BytesIO(master)).size for master in masters]
+    assert sizes == [(192, 108), (37, 81)]
+
+
+class FakeEngine:
+    def __init__(self):
+        self.calls = []
+
+    def submit(self, pipeline, context_options=None, timeout=None, **kwargs):
+        self.calls.append(context_options)
+        future = Future()
+        future.set_result([_png(v.width // 10, v.height // 10) for v in kwargs["viewports"]])
+        return future
+
+
+def test_views_task_fills_cache_for_each_view(fake_redis, monkeypatch):
+    engine = FakeEngine()
+    monkeypatch.setattr(main, "get_render_engine", lambda: engine)
+    block = resolve_block_policy(main.BLOCK_PROFILE).token
+
+    result = main.capture_views_task(
+        url=URL,
+        views=["desktop", "mobile", "custom:1440x900@2"],
+        full_page=False,
+        wait_time=0,
+        quality=80,
+        wait_until="networkidle",
+        wait_for_images_flag=True,
+        scroll_page_flag=True,
+        block=block,
+    )
+
+    # Uma navegação por densidade de pixels
+    assert engine.calls == [
+        {"viewport": {"width": 1920, "height": 1080}},
+        {"viewport": {"width": 1440, "height": 900}, "device_scale_factor": 2.0},
+    ]
+    assert set(result) == {"desktop", "mobile", "custom:1440x900@2"}
+    for view in result:
+        assert main.cache_index.lookup(master_name(_key(view))) is not None
+    # A visualização avulsa passa a sair do cache
+    response = client.get("/screenshot", params={"url": URL, "view": "mobile"})
+    assert response.status_code == 200
+    assert response.headers["x-cache"] == "HIT"
+
+
+class _PendingResult:
+    def ready(self):
+        return False
+
+
+def test_views_request_enqueues_only_missing_views(fake_redis, monkeypatch):
+    calls = []
+    monkeypatch.setattr(main.celery_app, "AsyncResult", lambda _: _PendingResult())
+    monkeypatch.setattr(
+        main.capture_views_task,
+        "apply_async",
+        lambda kwargs, task_id, **options: calls.append((kwargs, task_id)),
+    )
+    main.store_capture(_key("desktop"), _png(64, 64), 80)
+
+    response = client.get("/screenshot", params={"url": URL, "views": "desktop,custom:800x600@2x"})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["views"] == {"desktop": "cached", "custom:800x600@2": "processing"}
+    assert len(calls) == 1
+    assert calls[0][0]["views"] == ["custom:800x600@2"]
+    assert body["task_id"] == calls[0][1]
+
+    again = client.get("/screenshot", params={"url": URL, "views": "desktop,custom:800x600@2x"})
+    assert again.json()["task_id"] == body["task_id"]
+    assert len(calls) == 1
+
+
+def test_views_request_rejects_invalid_view(fake_redis):
+    response = client.get("/screenshot", params={"url": URL, "views": "desktop,tablet"})
+    assert response.status_code == 400
+
+
+class _DoneResult:
+    def __init__(self, result):
+        self.result = result
+
+    def ready(self):
+        return True
+
+    def failed(self):
+        return False
+
+
+def test_status_serves_each_view(fake_redis, monkeypatch):
+    name = main.store_capture(_key("mobile"), _png(40, 80), 80)
+    result = {"mobile": name, "desktop": "Erro ao capturar screenshot: timeout"}
+    monkeypatch.setattr(main.celery_app, "AsyncResult", lambda _: _DoneResult(result))
+
+    summary = client.get("/screenshot/status/task-1").json()
+    assert summary["views"]["mobile"] == {"status": "completed"}
+    assert summary["views"]["desktop"]["status"] == "failed"
+
+    image = client.get("/screenshot/status/task-1", params={"view": "mobile"})
+    assert image.status_code == 200
+    assert image.headers["content-type"] == "image/jpeg"
+    assert client.get("/screenshot/status/task-1", params={"view": "desktop"}).status_code == 500
+    assert client.get("/screenshot/status/task-1", params={"view": "custom:800x600"}).status_code == 404
@@ -0,0 +1,102 @@
+import io
+import json
+import time
+
+import fakeredis
+import pytest
+from PIL import Image
+
+import main
+from popularity import PopularityTracker
+from resource_policy import resolve_block_policy
+
+BLOCK = resolve_block_policy(main.BLOCK_PROFILE).token
+RENDITION = {"fmt": "jpeg", "width": None, "height": None, "fit": "contain"}
+
+
+def _kwargs(url):
+    return main.capture_task_kwargs(
+        url, "desktop", False, 0, 80, "networkidle", True, True, BLOCK, RENDITION
+    )
+
+
+def _name(url):
+    return _kwargs(url)["inflight_key"][len(main.INFLIGHT_PREFIX):]
+
+
+def _visit(url, times):
+    for _ in range(times):
+        main.record_access(_name(url), _kwargs(url))
+
+
+class _PendingResult:
+    def ready(self):
+        return False
+
+
+@pytest.fixture
+def enqueued(fake_redis, monkeypatch):
+    calls = []
+    monkeypatch.setattr(main.celery_app, "AsyncResult", lambda _: _PendingResult())
+    monkeypatch.setattr(
+        main.capture_screenshot_task,
+        "apply_async",
+        lambda kwargs, task_id, **options: calls.append((kwargs, options)),
+    )
+    monkeypatch.setattr(main, "WARM_LIST_FILE", None)
+    return calls
+
+
+def test_popularity_decays_and_trims():
+    client = fakeredis.FakeRedis(decode_responses=True)
+    tracker = PopularityTracker(client, half_life=3600, max_entries=2)
+    for name in ("a", "a", "a", "b", "c", "c"):
+        tracker.record(name, {"url": name})
+
+    assert [entry.name for entry in tracker.top(5)] == ["a", "c", "b"]
+    assert tracker.top(1)[0].params == {"url": "a"}
+
+    # Uma meia-vida depois, cada acesso vale metade
+    client.set("screenshot:popularity:landmark", time.time() - 3600)
+    assert tracker.top(1)[0].hits == pytest.approx(1.5, rel=0.01)
+
+    assert tracker.rescale() == 1
+    assert [entry.name for entry in tracker.top(5, min_hits=0.9)] == ["a", "c"]
+    assert client.hget("screenshot:popularity:params", "b") is None
+
+
+def test_warm_cache_recaptures_popular_and_listed_images(enqueued, monkeypatch, tmp_path):
+    popular, fresh, rare = (f"https://{host}.example.com/" for host in ("popular", "fresh", "rare"))
+    _visit(popular, 3)
+    _visit(fresh, 3)
+    _visit(rare, 1)
+    master = io.BytesIO()
+    Image.new("RGB", (16, 16), "red").save(master, format="PNG")
+    main.write_cache_file(_name(fresh), master.getvalue())
+    warm_list = tmp_path / "warm.json"
+    warm_list.write_text(json.dumps([
+        {"url": "https://listed.example.com/", "view": "custom:1440x900@2x", "format": "webp"},
+        {"url": "ftp://invalid.example.com/"},
+    ]))
+    monkeypatch.setattr(main, "WARM_LIST_FILE", str(warm_list))
+
+    assert main.warm_cache_task() == {"scheduled": 2, "fresh": 1, "deferred": 0}
+    urls = [kwargs["url"] for kwargs, _ in enqueued]
+    assert urls == ["https://listed.example.com/", popular]
+    assert enqueued[0][0]["view"] == "custom:1440x900@2"
+    assert all(options["priority"] == main.PRIORITIES["low"] for _, options in enqueued)
+
+
+def test_warm_cache_respects_budget(enqueued, monkeypatch):
+    for host in ("a", "b", "c"):
+        _visit(f"https://{host}.example.com/", 3)
+    monkeypatch.setattr(main, "WARM_MAX_TASKS", 1)
+
+    assert main.warm_cache_task() == {"scheduled": 1, "fresh": 0, "deferred": 2}
+
+    # Com a fila ocupada pelo tráfego ao vivo, nada é enfileirado
+    enqueued.clear()
+    monkeypatch.setattr(main.admission, "estimated_wait", lambda queue, priority: 60.0)
+    result = main.warm_cache_task()
+    assert result["scheduled"] == 0
+    assert enqueued == []
@@ -0,0 +1,94 @@
+"""Viewports das capturas: os nomeados e os personalizados (``custom:WxH@S``)."""
+import re
+from typing import Dict, List, NamedTuple, Tuple
+
+# Limites dos viewports personalizados
+MIN_DIMENSION = 200
+MAX_DIMENSION = 4096
+MAX_SCALE = 4.0
+
+_CUSTOM = re.compile(r"^custom:(\d+)x(\d+)(?:@(\d+(?:\.\d+)?)x?)?$")
+
+
+class Viewport(NamedTuple):
+    """Tamanho da janela em pixels CSS e densidade de pixels da tela."""
+    width: int
+    height: int
+    scale: float = 1.0
+
+    def context_options(self) -> dict:
+        """Opções de ``browser.new_context`` para este viewport."""
+        options: dict = {"viewport": {"width": self.width, "height": self.height}}
+        if self.scale != 1:
+            options["device_scale_factor"] = self.scale
+        return options
+
+
+VIEWPORTS: Dict[str, Viewport] = {
+    "desktop": Viewport(1920, 1080),
+    "mobile": Viewport(375, 812),
+}
+
+
+def parse_view(spec: str) -> Tuple[str, Viewport]:
+    """
+    Interpreta um viewport nomeado ou ``custom:LARGURAxALTURA[@ESCALAx]``.
+
+    Returns:
+        Tuple[str, Viewport]: Nome canônico (usado na chave de cache) e viewport;
+        ``custom:1440x900@2x`` e ``custom:1440x900@2`` têm o mesmo nome
+
+    Raises:
+        ValueError: Se o viewport for desconhecido ou estiver fora dos limites
+    """
+    spec = spec.strip().lower()
+    if spec in VIEWPORTS:
+        return spec, VIEWPORTS[spec]
+    match = _CUSTOM.match(spec)
+    if not match:
+        raise ValueError(
+            f"Visualização inválida: '{spec}'. Use {', '.join(VIEWPORTS)} ou custom:LARGURAxALTURA[@ESCALAx]"
+        )
+    width, height = int(match.group(1)), int(match.group(2))
+    scale = float(match.group(3) or 1)
+    if not (MIN_DIMENSION <= width <= MAX_DIMENSION and MIN_DIMENSION <= height <= MAX_DIMENSION):
+        raise ValueError(f"Viewport deve ter entre {MIN_DIMENSION} e {MAX_DIMENSION} pixels por lado")
+    if not 0 < scale <= MAX_SCALE:
+        raise ValueError(f"Escala do viewport deve estar entre 0 e {MAX_SCALE:g}")
+    name = f"custom:{width}x{height}" + (f"@{scale:g}" if scale != 1 else "")
+    return name, Viewport(width, height, scale)
+
+
+def parse_views(specs: str, max_views: int) -> List[Tuple[str, Viewport]]:
+    """
+    Interpreta a lista separada por vírgulas do parâmetro ``views``.
+
+    Repetições são ignoradas e a ordem pedida é mantida.
+
+    Raises:
+        ValueError: Se algum viewport for inválido, a lista estiver vazia ou
+            passar de ``max_views``
+    """
+    views: Dict[str, Viewport] = {}
+    for spec in specs.split(","):
+        if spec.strip():
+            name, viewport = parse_view(spec)
+            views.setdefault(name, viewport)
+    if not views:
+        raise ValueError("Informe ao menos uma visualização em views")
+    if len(views) > max_views:
+        raise ValueError(f"No máximo {max_views} visualizações por requisição")
+    return list(views.items())
+
+
+def group_by_scale(views: List[Tuple[str, Viewport]]) -> List[List[Tuple[str, Viewport]]]:
+    """
+    Agrupa os viewports pela densidade de pixels.
+
+    A densidade é fixada na criação do contexto do navegador, então cada
+    grupo usa uma navegação; dentro do grupo só o tamanho da janela muda.
+    """
+    groups: Dict[float, List[Tuple[str, Viewport]]] = {}
+    for name, viewport in views:
+        groups.setdefault(viewport.scale, []).append((name, viewport))
+    return list(groups.values())